@@ -0,0 +1,165 @@
+"""HTTP API for partner integrations, alongside the Streamlit app.
+
+    python api.py --workers 4 --port 8000
+
+Endpoints (JSON bodies follow the UserData schema; see /docs). Profiles are validated once, by
+profile_record.build_profile; invalid fields are answered with 422:
+
+    POST /recommendations        one profile -> recommendations, risk score, explanations, health risk
+    POST /recommendations/batch  {"profiles": [...], "skip_llm": false} -> one result per profile
+    POST /risk                   one profile -> risk score, explanations, health risk; never calls the LLM
+    GET  /history                stored answers, newest first, by customer_id and time range (paginated)
+    GET  /health                 liveness plus cache, LLM backend and rate limiter state
+
+Pass ?customer_id=... to /recommendations (or "customer_ids" in a batch) to file answers under a
+customer in the recommendation store (RECOMMENDATION_STORE_PATH); /history needs the store configured.
+
+Each uvicorn worker is a separate process with its own in-memory cache; running with more than one
+worker turns on the SQLite cache tier (RECOMMENDATION_CACHE_DB_PATH) so workers share answers.
+"""
+import argparse
+import os
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field
+
+from async_llm_client import AsyncRecommendationClient
+from batch_recommend import process_chunk
+from batch_scoring import decode_explanations, score_batch
+from config.llm_config import clients
+from controller import handle_profile
+from data_models import UserData
+from llm_controller import MODEL_NAME, llm_rate_limiter, recommendation_cache
+from logger import log_info
+from profile_record import ProfileValidationError, build_profile
+from recommendation_store import default_store
+
+DEFAULT_SHARED_CACHE_PATH = os.path.join("cache", "recommendations.sqlite")
+MAX_BATCH_SIZE = int(os.environ.get("API_MAX_BATCH_SIZE", "500"))
+
+
+# The body is parsed by build_profile rather than pydantic, so the UserData schema is documented by hand
+PROFILE_BODY = {"requestBody": {"required": True, "content": {"application/json": {"schema": UserData.model_json_schema()}}}}
+
+
+class BatchRequest(BaseModel):
+    # UserData objects; each is validated by process_chunk, and an invalid one gets an error result
+    profiles: List[Dict[str, Any]] = Field(..., max_length=MAX_BATCH_SIZE)
+    skip_llm: bool = False
+    # Optional, aligned with `profiles`; answers are filed under these ids in the recommendation store
+    customer_ids: Optional[List[Optional[str]]] = None
+
+
+async def _profile(request: Request):
+    """The request body validated into a ProfileRecord; 422 when it is not a valid profile."""
+    try:
+        body = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=422, detail=[{"loc": ["body"], "msg": "Body must be JSON."}])
+    if not isinstance(body, dict):
+        raise HTTPException(status_code=422, detail=[{"loc": ["body"], "msg": "Body must be a JSON object."}])
+    try:
+        return build_profile(**body)
+    except ProfileValidationError as e:
+        raise HTTPException(status_code=422, detail=[{"loc": ["body", e.field], "msg": str(e)}])
+    except TypeError as e:
+        # A required field is missing
+        raise HTTPException(status_code=422, detail=[{"loc": ["body"], "msg": str(e)}])
+
+
+@asynccontextmanager
+async def lifespan(app):
+    app.state.llm = AsyncRecommendationClient()
+    log_info("API worker %d started.", os.getpid())
+    try:
+        yield
+    finally:
+        await app.state.llm.aclose()
+
+
+app = FastAPI(title="Personalized Insurance Recommendations", lifespan=lifespan)
+
+
+@app.post("/recommendations", openapi_extra=PROFILE_BODY)
+async def recommendations(request: Request, customer_id: Optional[str] = None):
+    profile = await _profile(request)
+    # The controller is synchronous (router, hedging, caches); run it off the event loop
+    result = await run_in_threadpool(handle_profile, profile, customer_id)
+    if "error" in result:
+        raise HTTPException(status_code=500, detail=result["error"])
+    return result
+
+
+@app.post("/recommendations/batch")
+async def recommendations_batch(batch: BatchRequest):
+    rows = [dict(profile) for profile in batch.profiles]
+    if batch.customer_ids is not None:
+        if len(batch.customer_ids) != len(rows):
+            raise HTTPException(status_code=422, detail=[{"loc": ["body", "customer_ids"], "msg": "Must have one entry per profile."}])
+        for row, customer_id in zip(rows, batch.customer_ids):
+            row["customer_id"] = customer_id
+    client = None if batch.skip_llm else app.state.llm
+    return {"results": await process_chunk(rows, 0, client, default_store())}
+
+
+@app.post("/risk", openapi_extra=PROFILE_BODY)
+async def risk(request: Request):
+    scores = score_batch([await _profile(request)])
+    return {
+        "risk_score": int(scores["risk_score"][0]),
+        "explanations": decode_explanations(scores["explanation_codes"][0]),
+        "health_risk_prediction": float(scores["health_risk"][0]),
+    }
+
+
+@app.get("/history")
+async def history(
+    customer_id: Optional[str] = None,
+    since: Optional[float] = Query(None, description="Unix timestamp, inclusive"),
+    until: Optional[float] = Query(None, description="Unix timestamp, exclusive"),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+):
+    store = default_store()
+    if store is None:
+        raise HTTPException(status_code=503, detail="Recommendation store is not configured (RECOMMENDATION_STORE_PATH).")
+    try:
+        page = await run_in_threadpool(store.history, customer_id, None, since, until, limit, cursor)
+    except ValueError:
+        raise HTTPException(status_code=422, detail=[{"loc": ["query", "cursor"], "msg": "Invalid cursor."}])
+    return {"records": [record._asdict() for record in page.records], "next_cursor": page.next_cursor}
+
+
+@app.get("/health")
+async def health():
+    router = clients[MODEL_NAME]
+    return {
+        "status": "ok",
+        "pid": os.getpid(),
+        "cache": recommendation_cache.stats() if recommendation_cache is not None else None,
+        "llm_backends": router.stats() if hasattr(router, "stats") else None,
+        "rate_limiter": llm_rate_limiter.stats() if llm_rate_limiter.enabled else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the recommendation API with uvicorn.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    if args.workers > 1:
+        # Workers inherit the environment, so they all open the same on-disk cache tier
+        os.environ.setdefault("RECOMMENDATION_CACHE_DB_PATH", DEFAULT_SHARED_CACHE_PATH)
+
+    import uvicorn
+
+    uvicorn.run("api:app", host=args.host, port=args.port, workers=args.workers, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
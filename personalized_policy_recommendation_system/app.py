@@ -1,14 +1,20 @@
 import streamlit as st
-from fpdf import FPDF
-from data_models import UserData
-from llm_controller import get_recommendations
-from utils.input_validation import validate_age, validate_health_status
-from controller import calculate_risk_score
-import os
+from profile_record import ProfileValidationError, build_profile
+
+# Streamlit re-runs this script on every widget interaction, so heavy dependencies (groq, numpy,
+# fpdf) are imported inside the handlers that need them.
+
+@st.cache_resource
+def start_metrics_endpoint():
+    """Starts the Prometheus /metrics endpoint once per process when METRICS_PORT is set."""
+    from metrics import METRICS_PORT, start_metrics_server
+    return start_metrics_server(METRICS_PORT) if METRICS_PORT else None
 
 # Set up page configuration
 st.set_page_config(page_title="Personalized Insurance Recommendations", layout="wide", page_icon="🛡️")
 
+start_metrics_endpoint()
+
 # Header with title and subtitle
 st.title("Personalized Insurance Policy Recommendations")
 st.write("A professional solution to find tailored insurance policies based on your unique profile.")
@@ -33,10 +39,25 @@ if 'recommendations' not in st.session_state:
     st.session_state['recommendations'] = ""
 if 'risk_score' not in st.session_state:
     st.session_state['risk_score'] = 0
+if 'explanations' not in st.session_state:
+    st.session_state['explanations'] = []
 
 # Main layout columns for user input and recommendations display
 col1, col2 = st.columns([1, 2])
 
+# The risk assessment appears as soon as it is scored; recommendations stream in below it
+with col2:
+    st.subheader("Recommended Policies")
+    risk_placeholder = st.empty()
+    recommendations_placeholder = st.empty()
+
+
+def show_risk(placeholder, risk_score, explanations):
+    with placeholder.container():
+        st.write(f"**Risk Score:** {risk_score}")
+        for explanation in explanations:
+            st.caption(explanation)
+
 with col1:
     st.subheader("Enter Your Details")
     
@@ -55,99 +76,85 @@ with col1:
     
     # Generate Recommendations
     if st.button("Get Recommendations"):
-        if validate_age(age) and validate_health_status(health_status):
-            user_data = UserData(
-                age=age,
-                gender=gender,
-                marital_status=marital_status,
-                smoking_status=smoking_status,
-                drinking_status=drinking_status,
-                chronic_conditions=chronic_conditions,
-                annual_income=income,
-                occupation=occupation,
-                dependents=dependents,
-                health_status=health_status,
-                family_health_history=family_history
-            )
-            
-            # Fetch recommendations and risk score
-            recommendations = get_recommendations(user_data)
-            risk_score = calculate_risk_score(user_data)
-            
-            # Store in session state for later use
-            st.session_state['recommendations'] = recommendations
-            st.session_state['risk_score'] = risk_score
-        else:
-            st.error("Please enter valid data.")
+        from metrics import timed
+
+        try:
+            with timed("validation"):
+                user_data = build_profile(
+                    age=age,
+                    gender=gender,
+                    marital_status=marital_status,
+                    smoking_status=smoking_status,
+                    drinking_status=drinking_status,
+                    chronic_conditions=chronic_conditions,
+                    annual_income=income,
+                    occupation=occupation,
+                    dependents=dependents,
+                    health_status=health_status,
+                    family_health_history=family_history
+                )
+        except ProfileValidationError as e:
+            user_data = None
+            st.error(f"Please enter valid data. {e}")
+
+        if user_data is not None:
+            from llm_controller import RecommendationStreamError, stream_recommendations
+            from controller import start_pipeline, store_result
+
+            # The LLM call starts first and runs in the background while the local stages score the
+            # profile, so the risk assessment is shown before the first token arrives
+            stream = stream_recommendations(user_data)
+            run = start_pipeline(user_data, only=("risk", "health_risk"))
+            risk_score, explanations = run.result("risk")
+            show_risk(risk_placeholder, risk_score, explanations)
+            try:
+                with recommendations_placeholder.container(), timed("recommendations"):
+                    recommendations = st.write_stream(stream)
+            except RecommendationStreamError as e:
+                # Replaces the partial answer streamed so far; nothing is kept or stored
+                recommendations = None
+                recommendations_placeholder.error(str(e))
+
+            if recommendations is not None:
+                # Store in session state for later use
+                st.session_state['recommendations'] = recommendations
+                st.session_state['risk_score'] = risk_score
+                st.session_state['explanations'] = explanations
+                # Kept across sessions when RECOMMENDATION_STORE_PATH is set
+                store_result(user_data, {
+                    "recommendations": recommendations,
+                    "risk_score": risk_score,
+                    "explanations": explanations,
+                    "health_risk_prediction": run.result("health_risk"),
+                })
 
 # Display recommendations and save options
 with col2:
-    st.subheader("Recommended Policies")
     if st.session_state['recommendations']:
-        st.write(st.session_state['recommendations'])
-        st.write(f"**Risk Score:** {st.session_state['risk_score']}")
+        show_risk(risk_placeholder, st.session_state['risk_score'], st.session_state['explanations'])
+        recommendations_placeholder.write(st.session_state['recommendations'])
         
-        # Save as Text File
+        # Reports are rendered in memory and handed straight to the download button
         if st.button("Save as Text"):
-            try:
-                with open("recommendations.txt", "w", encoding="utf-8") as file:
-                    file.write(st.session_state['recommendations'])
-                    file.write(f"\nRisk Score: {st.session_state['risk_score']}")
-                st.success("Recommendations saved as 'recommendations.txt'.")
-                # Provide download link
-                with open("recommendations.txt", "rb") as file:
-                    st.download_button(
-                        label="Download Text File",
-                        data=file,
-                        file_name="personalized_recommendations.txt",
-                        mime="text/plain"
-                    )
-            except UnicodeEncodeError as e:
-                st.error(f"Error saving recommendations: {e}")
-        
-        # Save as PDF with font handling and adjusted layout
+            from report_export import render_text
+            st.download_button(
+                label="Download Text File",
+                data=render_text(st.session_state['recommendations'], st.session_state['risk_score']),
+                file_name="personalized_recommendations.txt",
+                mime="text/plain"
+            )
+
         if st.button("Save as PDF"):
             try:
-                font_path = os.path.join(os.getcwd(), "DejaVuSans.ttf")
-                
-                pdf = FPDF()
-                pdf.add_page()
-                
-                # Check for custom font and apply, or default to Arial
-                if os.path.exists(font_path):
-                    pdf.add_font("DejaVu", "", font_path, uni=True)
-                    pdf.set_font("DejaVu", "", 12)
-                else:
-                    pdf.set_font("Arial", "", 12)
+                from report_export import font_available, render_pdf
+                if not font_available():
                     st.warning("DejaVuSans.ttf font not found. Using default font.")
-                
-                # Adjust margins and ensure maximum width is used
-                pdf.set_left_margin(5)
-                pdf.set_right_margin(5)
-                pdf.set_auto_page_break(auto=True, margin=10)
-                
-                # Add recommendations text with adjusted width
-                recommendations = st.session_state['recommendations']
-                for line in recommendations.splitlines():
-                    if len(line) > 0:
-                        pdf.cell(190, 10, line, ln=True)
-
-                # Add risk score separately
-                pdf.cell(190, 10, f"Risk Score: {st.session_state['risk_score']}", ln=True)
-                
-                pdf_output = "recommendations.pdf"
-                pdf.output(pdf_output)
-                st.success("Recommendations saved as 'recommendations.pdf'.")
-                
-                # Provide download link
-                with open(pdf_output, "rb") as file:
-                    st.download_button(
-                        label="Download PDF File",
-                        data=file,
-                        file_name="personalized_recommendations.pdf",
-                        mime="application/pdf"
-                    )
-                    
+                st.download_button(
+                    label="Download PDF File",
+                    data=render_pdf(st.session_state['recommendations'], st.session_state['risk_score']),
+                    file_name="personalized_recommendations.pdf",
+                    mime="application/pdf"
+                )
             except Exception as e:
                 st.error(f"Error generating PDF: {e}")
 
@@ -163,9 +170,9 @@ drinking_status_hypothetical = st.sidebar.selectbox("Do you drink alcohol?", ["Y
 chronic_conditions_hypothetical = st.sidebar.text_area("List chronic conditions (comma-separated):", chronic_conditions, key="chronic_conditions_hypothetical", help="Mention any long-term health conditions.")
 health_status_hypothetical = st.sidebar.selectbox("Select your health status:", ["good", "fair", "poor"], key="health_status_hypothetical", help="Choose the option that best describes your current health status.")
 
-# Display updated risk profile based on hypothetical scenario
-if st.sidebar.button("Calculate Hypothetical Risk", key="calculate_hypothetical_risk"):
-    hypothetical_data = UserData(
+# Risk updates on every widget change: rescoring uses precomputed per-factor contributions
+try:
+    hypothetical_data = build_profile(
         age=age_hypothetical,
         gender=gender,
         marital_status=marital_status_hypothetical,
@@ -178,6 +185,15 @@ if st.sidebar.button("Calculate Hypothetical Risk", key="calculate_hypothetical_
         health_status=health_status_hypothetical,
         family_health_history=family_history
     )
-    hypothetical_risk_score = calculate_risk_score(hypothetical_data)
+except ProfileValidationError as e:
+    st.sidebar.error(f"Please enter valid data. {e}")
+else:
+    from what_if import sensitivity
+
+    analysis = sensitivity(hypothetical_data)
     st.sidebar.subheader("Hypothetical Risk Score")
-    st.sidebar.write(f"Risk Score: {hypothetical_risk_score}")
+    st.sidebar.write(f"Risk Score: {analysis.base_score}")
+    st.sidebar.caption("Risk score at each age, other answers unchanged")
+    st.sidebar.line_chart({"Age": analysis.ages, "Risk Score": analysis.age_scores}, x="Age", y="Risk Score", height=200)
+    st.sidebar.caption("Change in risk score from a single change")
+    st.sidebar.bar_chart({"Change": analysis.changes, "Risk Delta": analysis.deltas}, x="Change", y="Risk Delta", horizontal=True, height=250)
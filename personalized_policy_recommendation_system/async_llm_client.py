@@ -0,0 +1,230 @@
+import asyncio
+import random
+import time
+
+import httpx
+
+from config.llm_config import (
+    LLM_API_BASE_URL,
+    LLM_API_KEY,
+    LLM_MAX_CONCURRENCY,
+    LLM_REQUEST_TIMEOUT,
+    LLM_MAX_RETRIES,
+)
+from llm_controller import (
+    MODEL_NAME,
+    llm_rate_limiter,
+    lookup_similar,
+    lookup_stored,
+    recommendation_cache,
+    refund_unused_tokens,
+    similar_recommendations,
+)
+from utils.prompt_template import DEFAULT_TIER, build_request, parse_policies
+from utils.rate_limiter import RateLimitExceeded
+from utils.response_cache import make_cache_key
+from utils.single_flight import AsyncSingleFlight
+from logger import log_info, log_warning
+from metrics import CACHE_LOOKUPS, LLM_REQUESTS, LLM_REQUEST_SECONDS, record_llm_usage
+
+# Provider responses worth retrying: rate limiting and transient server errors
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class LLMRequestError(Exception):
+    """Raised when a recommendation request fails after all retries."""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class AsyncRecommendationClient:
+    """Asyncio client for an OpenAI-compatible chat completions endpoint.
+
+    One pooled httpx connection pool is shared by all requests; a semaphore caps
+    requests in flight, and 429/5xx responses are retried with jittered backoff.
+    A 429 pauses every request on the client until the provider's Retry-After passes.
+    Each logical request passes the process-wide rate limiter once, however many attempts it
+    takes, and concurrent requests for the same profile share one call. Cache, store and
+    similarity lookups run in a worker thread so SQLite I/O never blocks the event loop.
+    """
+
+    def __init__(self, base_url=LLM_API_BASE_URL, api_key=LLM_API_KEY, model=MODEL_NAME,
+                 max_concurrency=LLM_MAX_CONCURRENCY, timeout=LLM_REQUEST_TIMEOUT,
+                 max_retries=LLM_MAX_RETRIES, backoff_base=0.5, backoff_max=20.0,
+                 max_tokens=None, tier=DEFAULT_TIER, cache=None, similar=None):
+        self.model = model
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        # Overrides the tier's completion budget when set
+        self.max_tokens = max_tokens
+        self.tier = tier
+        self.cache = cache if cache is not None else recommendation_cache
+        self.similar = similar if similar is not None else similar_recommendations
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._paused_until = 0.0
+        self._in_flight = AsyncSingleFlight()
+        self._http = httpx.AsyncClient(
+            base_url=base_url.rstrip("/"),
+            headers={"Authorization": f"Bearer {api_key}"} if api_key else {},
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency),
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        """Close the pooled HTTP connections."""
+        await self._http.aclose()
+
+    def _backoff(self, attempt, retry_after=None):
+        """Full-jitter exponential backoff, never shorter than the provider's Retry-After."""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    async def _wait_for_rate_limit(self):
+        delay = self._paused_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def create_completion(self, messages, max_tokens=None, response_format=None, prompt_tokens=0):
+        """POST a chat completion, retrying transient failures, and return the decoded JSON.
+
+        Raises LLMRequestError with status 429 when the local rate limiter sheds the call.
+        """
+        payload = {"model": self.model, "messages": messages}
+        if self.max_tokens or max_tokens:
+            payload["max_tokens"] = self.max_tokens or max_tokens
+        reserved = payload.get("max_tokens") or 0
+        if response_format is not None:
+            payload["response_format"] = response_format
+        # One limiter share per logical request; retries are paced by backoff and Retry-After
+        try:
+            await llm_rate_limiter.acquire_async(prompt_tokens + reserved)
+        except RateLimitExceeded as e:
+            raise LLMRequestError(f"Shed by the local rate limiter: {e}", status_code=429) from e
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            await self._wait_for_rate_limit()
+            retry_after = None
+            try:
+                async with self._semaphore:
+                    response = await self._http.post("/chat/completions", json=payload, timeout=self.timeout)
+            except (httpx.TimeoutException, httpx.TransportError) as e:
+                last_error = LLMRequestError(f"Request failed: {e!r}")
+            else:
+                if response.status_code == 200:
+                    completion = response.json()
+                    refund_unused_tokens(reserved, completion.get("usage"))
+                    return completion
+                last_error = LLMRequestError(
+                    f"Provider returned HTTP {response.status_code}: {response.text[:200]}",
+                    status_code=response.status_code,
+                )
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    raise last_error
+                if response.status_code == 429:
+                    retry_after = _parse_retry_after(response.headers.get("Retry-After"))
+                    pause = retry_after if retry_after is not None else self._backoff(attempt)
+                    self._paused_until = max(self._paused_until, time.monotonic() + pause)
+
+            if attempt < self.max_retries:
+                delay = self._backoff(attempt, retry_after)
+                log_warning("LLM request attempt %d failed (%s); retrying in %.2fs.", attempt + 1, last_error, delay)
+                await asyncio.sleep(delay)
+        raise last_error
+
+    async def get_recommendations(self, user_data, json_output=False):
+        """Fetch recommendations for one profile, consulting the shared cache, store and similarity index first.
+
+        With json_output the answer is parsed into a list of Policy records (PolicyParseError when it
+        strays from the schema).
+        """
+        text = await self.recommendation_text(user_data, json_output)
+        return parse_policies(text) if json_output else text
+
+    async def recommendation_text(self, user_data, json_output=False):
+        """The model's answer for get_recommendations as text."""
+        request = build_request(user_data, self.tier, json_output)
+        scope = f"{self.model}/{request.cache_scope}"
+        key = make_cache_key(user_data, self.model, request.cache_scope)
+        recommendations = await asyncio.to_thread(self._lookup, user_data, request, key, scope)
+        if recommendations is not None:
+            return recommendations
+        return await self._in_flight.do(key, lambda: self._fetch(user_data, request, key, scope))
+
+    def _lookup(self, user_data, request, key, scope):
+        """An earlier answer from the cache, store or similarity index, or None; blocking."""
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                CACHE_LOOKUPS.inc(result="hit")
+                return cached
+            CACHE_LOOKUPS.inc(result="miss")
+
+        recommendations = lookup_stored(user_data, self.model, request.cache_scope)
+        if recommendations is None:
+            recommendations = lookup_similar(user_data, scope, self.similar)
+        if recommendations is not None and self.cache is not None:
+            self.cache.set(key, recommendations)
+        return recommendations
+
+    def _remember(self, user_data, key, scope, recommendations):
+        """Adds a fresh answer to the cache and similarity index; blocking."""
+        if self.cache is not None:
+            self.cache.set(key, recommendations)
+        if self.similar is not None:
+            self.similar.add(user_data, scope, recommendations)
+
+    async def _fetch(self, user_data, request, key, scope):
+        try:
+            with LLM_REQUEST_SECONDS.time(mode="async"):
+                completion = await self.create_completion(
+                    request.messages, request.max_tokens, request.response_format, request.prompt_tokens)
+            recommendations = completion["choices"][0]["message"]["content"]
+        except (KeyError, IndexError, TypeError) as e:
+            LLM_REQUESTS.inc(mode="async", outcome="error")
+            raise LLMRequestError(f"Unexpected response structure: {e!r}")
+        except LLMRequestError as e:
+            shed = isinstance(e.__cause__, RateLimitExceeded)
+            LLM_REQUESTS.inc(mode="async", outcome="shed" if shed else "error")
+            raise
+        LLM_REQUESTS.inc(mode="async", outcome="ok")
+        record_llm_usage(completion.get("usage"))
+
+        if recommendations:
+            await asyncio.to_thread(self._remember, user_data, key, scope, recommendations)
+        return recommendations
+
+    async def get_recommendations_many(self, profiles, return_exceptions=True):
+        """Fan out over many profiles concurrently; results keep the input order.
+
+        With return_exceptions=True a failed profile yields its exception in place
+        of the recommendation text instead of failing the whole batch.
+        """
+        log_info("Requesting recommendations for %d profiles.", len(profiles))
+        tasks = [self.get_recommendations(profile) for profile in profiles]
+        return await asyncio.gather(*tasks, return_exceptions=return_exceptions)
+
+
+def _parse_retry_after(value):
+    """Parse a Retry-After header given in seconds; HTTP-date values are ignored."""
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+async def get_recommendations_many(profiles, **client_options):
+    """Fetch recommendations for many profiles with a short-lived pooled client."""
+    async with AsyncRecommendationClient(**client_options) as client:
+        return await client.get_recommendations_many(profiles)
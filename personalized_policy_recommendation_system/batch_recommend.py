@@ -0,0 +1,245 @@
+"""Batch recommendations for a file of customer profiles.
+
+    python batch_recommend.py profiles.csv results.jsonl --chunk-size 500 --concurrency 16
+
+Reads CSV, JSONL or Parquet one chunk at a time, validates each row into a ProfileRecord, scores
+the chunk, fetches recommendations concurrently and appends one JSON line per input row to the
+output file.
+With --store (or RECOMMENDATION_STORE_PATH) each chunk's results are also written to the
+recommendation store in one transaction.
+Progress is checkpointed after every chunk, so re-running the same command after a crash resumes
+where it stopped. Rows that cannot be parsed (a malformed JSONL line or CSV record), fail validation
+or fail the LLM call are written with status "error" instead of aborting the run.
+"""
+import argparse
+import asyncio
+import csv
+import itertools
+import json
+import os
+from typing import NamedTuple
+
+from async_llm_client import AsyncRecommendationClient
+from batch_scoring import score_batch, decode_explanations
+from config.llm_config import LLM_MAX_CONCURRENCY
+from llm_controller import MODEL_NAME
+from profile_record import ProfileValidationError, build_profile
+from logger import log_info, log_exception
+from recommendation_store import RecommendationStore, default_store, scoring_model_version
+from utils.prompt_template import prompt_version
+
+
+class InvalidRow(NamedTuple):
+    """Stands in for an input row that could not be parsed, so it still gets its output line."""
+    error: str
+
+
+def iter_rows(path, parquet_batch_size=10_000):
+    """Yield input rows as dicts without loading the whole file; unparseable rows yield InvalidRow."""
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=parquet_batch_size):
+            yield from batch.to_pylist()
+    elif path.endswith((".jsonl", ".ndjson")):
+        # Lines are decoded one at a time, so a bad byte sequence only spoils its own line
+        with open(path, "rb") as file:
+            for number, line in enumerate(file, 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as e:
+                    yield InvalidRow(f"Invalid JSON on line {number}: {e}")
+                    continue
+                yield row if isinstance(row, dict) else InvalidRow(f"Line {number} is not a JSON object.")
+    else:
+        with open(path, newline="", encoding="utf-8") as file:
+            yield from _csv_rows(csv.DictReader(file))
+
+
+def _csv_rows(reader):
+    error_line = None
+    while True:
+        try:
+            yield next(reader)
+        except StopIteration:
+            return
+        except csv.Error as e:
+            if reader.line_num == error_line:
+                # The reader is not advancing past the bad input
+                raise
+            error_line = reader.line_num
+            yield InvalidRow(f"Invalid CSV record near line {reader.line_num}: {e}")
+
+
+def iter_chunks(rows, size):
+    """Group an iterator of rows into lists of at most `size`."""
+    while True:
+        chunk = list(itertools.islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class Checkpoint:
+    """Rows completed and output size, written atomically after each chunk."""
+
+    def __init__(self, path, input_path):
+        self.path = path
+        self.input_path = os.path.abspath(input_path)
+        self.rows_done = 0
+        self.output_bytes = 0
+        self.errors = 0
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return self
+        with open(self.path, encoding="utf-8") as file:
+            state = json.load(file)
+        if state["input"] != self.input_path:
+            raise ValueError(f"Checkpoint {self.path} belongs to {state['input']}, not {self.input_path}.")
+        self.rows_done = state["rows_done"]
+        self.output_bytes = state["output_bytes"]
+        self.errors = state.get("errors", 0)
+        return self
+
+    def save(self):
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as file:
+            json.dump({"input": self.input_path, "rows_done": self.rows_done, "output_bytes": self.output_bytes,
+                       "errors": self.errors}, file)
+        os.replace(temporary, self.path)
+
+
+def parse_row(row):
+    """Validate a raw input row; return (ProfileRecord, None) or (None, error message)."""
+    try:
+        return build_profile(**row), None
+    except ProfileValidationError as e:
+        return None, f"Invalid profile: {e}"
+    except TypeError as e:
+        return None, f"Invalid profile: {e}"
+
+
+def store_chunk(store, valid):
+    """Bulk-insert the scored rows of a chunk; rows whose LLM call failed are stored without recommendations."""
+    model_version = scoring_model_version()
+    scope = prompt_version()
+    store.record_many(
+        (user_data, {
+            "risk_score": result["risk_score"],
+            "health_risk": result["health_risk_prediction"],
+            "explanations": result["explanations"],
+            "recommendations": result.get("recommendations"),
+            "customer_id": result.get("customer_id"),
+            "model": MODEL_NAME if "recommendations" in result else None,
+            "model_version": model_version,
+            "prompt_scope": scope if "recommendations" in result else None,
+        })
+        for result, user_data in valid
+    )
+
+
+async def process_chunk(chunk, first_row, client, store=None):
+    """Validate, score and fetch recommendations for one chunk; return one result dict per row."""
+    results = [{"row": first_row + offset} for offset in range(len(chunk))]
+    valid = []
+    for result, row in zip(results, chunk):
+        if isinstance(row, InvalidRow):
+            result.update(status="error", error=row.error)
+            continue
+        if "customer_id" in row:
+            # Optional input column, carried through to the results and the store
+            row = dict(row)
+            customer_id = row.pop("customer_id")
+            if customer_id not in (None, ""):
+                result["customer_id"] = str(customer_id)
+        user_data, error = parse_row(row)
+        if error:
+            result.update(status="error", error=error)
+        else:
+            valid.append((result, user_data))
+
+    if not valid:
+        return results
+
+    profiles = [user_data for _, user_data in valid]
+    scores = score_batch(profiles)
+    for index, (result, _) in enumerate(valid):
+        result.update(
+            status="ok",
+            risk_score=int(scores["risk_score"][index]),
+            health_risk_prediction=float(scores["health_risk"][index]),
+            explanations=decode_explanations(scores["explanation_codes"][index]),
+        )
+
+    if client is not None:
+        recommendations = await client.get_recommendations_many(profiles)
+        for (result, _), recommendation in zip(valid, recommendations):
+            if isinstance(recommendation, Exception):
+                result.update(status="error", error=f"Recommendation request failed: {recommendation}")
+            else:
+                result["recommendations"] = recommendation
+    if store is not None:
+        # SQLite writes block; keep them off the event loop the API shares with other requests
+        await asyncio.to_thread(store_chunk, store, valid)
+    return results
+
+
+async def run(input_path, output_path, chunk_size=500, concurrency=LLM_MAX_CONCURRENCY, skip_llm=False, store=None):
+    """Process input_path into output_path, resuming from the checkpoint if one exists."""
+    checkpoint = Checkpoint(f"{output_path}.checkpoint", input_path).load()
+    if checkpoint.rows_done:
+        log_info("Resuming batch run at row %d.", checkpoint.rows_done)
+
+    rows = itertools.islice(iter_rows(input_path), checkpoint.rows_done, None)
+    client = None if skip_llm else AsyncRecommendationClient(max_concurrency=concurrency)
+    try:
+        with open(output_path, "ab") as output:
+            # Drop any rows written after the last checkpoint; they are reprocessed below
+            output.truncate(checkpoint.output_bytes)
+            output.seek(checkpoint.output_bytes)
+            for chunk in iter_chunks(rows, chunk_size):
+                results = await process_chunk(chunk, checkpoint.rows_done, client, store)
+                output.write("".join(json.dumps(result) + "\n" for result in results).encode("utf-8"))
+                output.flush()
+                os.fsync(output.fileno())
+
+                errors = sum(result["status"] == "error" for result in results)
+                checkpoint.rows_done += len(chunk)
+                checkpoint.output_bytes = output.tell()
+                checkpoint.errors += errors
+                checkpoint.save()
+                log_info("Batch run: %d rows done (%d errors in last chunk, %d in all).",
+                         checkpoint.rows_done, errors, checkpoint.errors)
+    finally:
+        if client is not None:
+            await client.aclose()
+    return checkpoint.rows_done
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate recommendations for a CSV, JSONL or Parquet file of profiles.")
+    parser.add_argument("input", help="profiles file (.csv, .jsonl or .parquet)")
+    parser.add_argument("output", help="JSONL results file; appended to when resuming")
+    parser.add_argument("--chunk-size", type=int, default=500, help="rows held in memory and checkpointed together")
+    parser.add_argument("--concurrency", type=int, default=LLM_MAX_CONCURRENCY, help="LLM requests in flight")
+    parser.add_argument("--skip-llm", action="store_true", help="only validate and score, without recommendations")
+    parser.add_argument("--store", help="recommendation store to record results in (default: RECOMMENDATION_STORE_PATH)")
+    args = parser.parse_args()
+
+    store = RecommendationStore(args.store) if args.store else default_store()
+    try:
+        rows = asyncio.run(run(args.input, args.output, args.chunk_size, args.concurrency, args.skip_llm, store))
+    except KeyboardInterrupt:
+        print("Interrupted; re-run the same command to resume.")
+        raise SystemExit(130)
+    except Exception:
+        log_exception("Batch run failed; re-run the same command to resume from the last checkpoint.")
+        raise
+    print(f"Processed {rows} rows into {args.output}.")
+
+
+if __name__ == "__main__":
+    main()
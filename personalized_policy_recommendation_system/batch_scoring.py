@@ -0,0 +1,98 @@
+import functools
+
+import numpy as np
+
+from logger import log_warning
+from profile_record import ProfileRecord
+from risk_model import COUNT_COLUMNS, MODEL_DIR, MODEL_FIELDS, load_default_model
+from risk_rules import active_rules
+
+# Probability reported when no trained health-risk model artifact is available
+PLACEHOLDER_HEALTH_RISK = 0.65
+
+
+def scoring_fields():
+    """Columns the active risk rules read."""
+    return active_rules().fields
+
+
+def to_columns(profiles, fields=None):
+    """Convert profiles into a dict of NumPy columns (by default, those the risk rules read).
+
+    Accepts a pandas DataFrame, a NumPy structured array, a dict of columns, or a
+    sequence of UserData-like objects. For ProfileRecords the comma-separated fields
+    become item-count columns taken from their pre-tokenized lists.
+    """
+    if fields is None:
+        fields = scoring_fields()
+    if isinstance(profiles, dict):
+        return {field: np.asarray(profiles[field]) for field in fields}
+    if isinstance(profiles, np.ndarray):
+        return {field: np.asarray(profiles[field]) for field in fields}
+    if hasattr(profiles, "columns") and hasattr(profiles, "to_numpy"):
+        return {field: profiles[field].to_numpy() for field in fields}
+    if profiles and isinstance(profiles[0], ProfileRecord):
+        return _record_columns(profiles, fields)
+    return {field: np.asarray([getattr(profile, field) for profile in profiles]) for field in fields}
+
+
+def _record_columns(records, fields):
+    columns = {}
+    for field in fields:
+        if field == "chronic_conditions":
+            columns[COUNT_COLUMNS[field]] = np.fromiter(
+                (len(record.chronic_condition_list) for record in records), np.int64, len(records))
+        elif field == "family_health_history":
+            columns[COUNT_COLUMNS[field]] = np.fromiter(
+                (len(record.family_history_list) for record in records), np.int64, len(records))
+        else:
+            columns[field] = np.asarray([getattr(record, field) for record in records])
+    return columns
+
+
+def rule_scores(columns):
+    """Risk scores and explanation bitmasks from the active rules, in one pass."""
+    return active_rules().evaluate(columns)
+
+
+def health_risk_fields():
+    """Columns health_risks needs: the model's inputs, or none beyond age for the placeholder."""
+    return MODEL_FIELDS if load_default_model() is not None else ("age",)
+
+
+@functools.lru_cache(maxsize=1)
+def warn_placeholder():
+    """Log, once per process, that health risks are the placeholder rather than a model's."""
+    log_warning("No health-risk model artifact found in %s; serving the %.2f placeholder for every profile. "
+                "Train one with train_risk_model.py.", MODEL_DIR, PLACEHOLDER_HEALTH_RISK)
+
+
+def health_risks(columns):
+    """Health-risk probability per row from the trained model, or the placeholder without one."""
+    model = load_default_model()
+    if model is None:
+        warn_placeholder()
+        return np.full(len(columns["age"]), PLACEHOLDER_HEALTH_RISK, dtype=np.float64)
+    return model.predict_batch(columns)
+
+
+def decode_explanations(code):
+    """Turn an explanation bitmask from the active rules back into its explanation sentences."""
+    return active_rules().decode(code)
+
+
+def score_batch(profiles):
+    """Score a whole batch of profiles at once.
+
+    Returns a dict with "risk_score", "health_risk" and "explanation_codes" arrays,
+    one entry per input row.
+    """
+    rules = active_rules()
+    fields = tuple(dict.fromkeys(rules.fields + health_risk_fields()))
+    columns = to_columns(profiles, fields)
+    scores, codes = rules.evaluate(columns)
+    return {
+        "risk_score": scores,
+        "health_risk": health_risks(columns),
+        "explanation_codes": codes,
+    }
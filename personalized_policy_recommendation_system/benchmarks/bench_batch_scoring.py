@@ -0,0 +1,61 @@
+"""Throughput benchmark for the vectorized batch risk-scoring engine.
+
+Run from the package directory:
+
+    python -m benchmarks.bench_batch_scoring [--sizes 10000 100000 1000000]
+"""
+import argparse
+import logging
+import time
+
+from batch_scoring import score_batch
+from benchmarks.synthetic import generate_dataframe
+
+
+def bench_batch(size: int, repeats: int) -> float:
+    """Best-of-N wall time, in seconds, to score `size` profiles in one batch."""
+    frame = generate_dataframe(size)
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        score_batch(frame)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_scalar(size: int) -> float:
+    """Wall time, in seconds, to score `size` profiles one UserData at a time."""
+    from controller import calculate_risk_score, generate_explanations, predict_health_risk
+    from data_models import UserData
+
+    profiles = [UserData(**row) for row in generate_dataframe(size).to_dict("records")]
+    start = time.perf_counter()
+    for profile in profiles:
+        calculate_risk_score(profile)
+        generate_explanations(profile)
+        predict_health_risk(profile)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--scalar-size", type=int, default=2_000, help="rows for the row-by-row baseline (0 to skip)")
+    args = parser.parse_args()
+
+    # Per-row INFO logging would dominate the scalar baseline; measure the scoring itself
+    logging.disable(logging.INFO)
+
+    print(f"{'rows':>10} {'seconds':>10} {'rows/s':>14}")
+    for size in args.sizes:
+        seconds = bench_batch(size, args.repeats)
+        print(f"{size:>10} {seconds:>10.4f} {size / seconds:>14,.0f}")
+
+    if args.scalar_size:
+        seconds = bench_scalar(args.scalar_size)
+        print(f"{'scalar':>10} {seconds:>10.4f} {args.scalar_size / seconds:>14,.0f}  (rows={args.scalar_size})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Import-time guard for the app's entry modules, based on `python -X importtime`.
+
+Run from the package directory:
+
+    python -m benchmarks.bench_import_time [--baseline import_times.json] [--save-baseline import_times.json]
+
+Fails (exit code 1) when a module pulls in a dependency it should load lazily, or when its
+cumulative import time regresses past the baseline by more than the allowed tolerance.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# Entry module -> heavy dependencies it must not import eagerly
+LAZY_DEPENDENCIES = {
+    "config.llm_config": ("groq", "openai", "httpx"),
+    "llm_controller": ("groq", "openai", "pydantic", "sklearn"),
+    "controller": ("groq", "fpdf", "pydantic", "sklearn"),
+    "batch_scoring": ("groq", "pydantic", "sklearn"),
+    # The sidebar's what-if charts render on every run and need numpy through streamlit anyway
+    "app": ("groq", "fpdf", "pydantic", "sklearn"),
+}
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure(module: str):
+    """Import `module` in a fresh interpreter; return (cumulative microseconds, loaded heavy deps)."""
+    forbidden = LAZY_DEPENDENCIES[module]
+    code = (
+        f"import sys, json; import {module}; "
+        f"print(json.dumps([m for m in {list(forbidden)!r} if m in sys.modules]))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=PACKAGE_DIR, capture_output=True, text=True, check=True,
+    )
+    cumulative = None
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, total, name = line[len("import time:"):].split("|")
+        # Nested imports are indented; the entry module is the unindented line with its name
+        if name.strip() == module and not name[1:].startswith(" "):
+            cumulative = int(total)
+    loaded = json.loads(result.stdout.strip().splitlines()[-1])
+    return cumulative, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per module (best run is kept)")
+    parser.add_argument("--baseline", help="JSON file of module -> microseconds to compare against")
+    parser.add_argument("--save-baseline", help="write the measured times to this JSON file")
+    parser.add_argument("--tolerance", type=float, default=1.5, help="allowed slowdown factor versus the baseline")
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)
+
+    failures = []
+    measured = {}
+    print(f"{'module':20} {'import ms':>10} {'baseline ms':>12}  eager heavy deps")
+    for module in LAZY_DEPENDENCIES:
+        runs = [measure(module) for _ in range(args.runs)]
+        micros = min(run[0] for run in runs)
+        loaded = runs[0][1]
+        measured[module] = micros
+
+        reference = baseline.get(module)
+        print(f"{module:20} {micros / 1e3:>10.1f} {reference / 1e3 if reference else float('nan'):>12.1f}  {', '.join(loaded) or '-'}")
+        if loaded:
+            failures.append(f"{module} eagerly imports {', '.join(loaded)}")
+        if reference and micros > reference * args.tolerance:
+            failures.append(f"{module} import time {micros / 1e3:.1f} ms exceeds {args.tolerance}x baseline {reference / 1e3:.1f} ms")
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as file:
+            json.dump(measured, file, indent=2)
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
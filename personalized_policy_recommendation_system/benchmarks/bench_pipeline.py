@@ -0,0 +1,242 @@
+"""Per-stage benchmark of the recommendation pipeline over a synthetic population.
+
+Run from the package directory:
+
+    python -m benchmarks.bench_pipeline --profiles 5000 --save-baseline pipeline_baseline.json
+    python -m benchmarks.bench_pipeline --profiles 5000 --baseline pipeline_baseline.json
+
+Times validation, risk scoring, explanations, health risk, prompt building, the LLM call (against
+a local StubLLMServer with a fixed latency and reply, caches off) and PDF export one profile at a
+time, and reports throughput, p50/p99 latency and peak traced memory per stage. The population is
+generated from --seed, so runs on different commits score the same profiles.
+
+--profile DIR writes one cProfile file per stage (view with `snakeviz DIR/risk_score.prof` or turn
+into a flamegraph with `flameprof`); for a sampling flamegraph run the whole script under
+`py-spy record -o flame.svg -- python -m benchmarks.bench_pipeline`.
+
+Each stage is timed --repeats times and reported as the median of the passes, which keeps one
+noisy pass (a GC pause, another process on the machine) out of the numbers. With --baseline the
+run is compared against a saved JSON file and exits with code 1 when a stage's median p50 is more
+than --tolerance times the baseline and also slower by more than --min-regression-ms, so
+microsecond stages do not fail on timer jitter.
+"""
+import argparse
+import cProfile
+import json
+import logging
+import os
+import platform
+import pstats
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from benchmarks.synthetic import generate_dataframe
+from utils.stub_llm_server import StubLLMServer
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STAGES = ("validation", "risk_score", "explanations", "health_risk", "prompt", "llm", "pdf_export")
+
+
+def configure_stub(stub):
+    """Point the LLM clients at the stub and turn the caches off; must run before llm_controller is imported."""
+    os.environ.update(
+        GROQ_BASE_URL=stub.base_url[:-len("/v1")],
+        # A placeholder key, so a real GROQ_API_KEY is never sent to the stub
+        GROQ_API_KEY="stub",
+        LLM_API_BASE_URL=stub.base_url,
+        LLM_API_KEY="stub",
+        LLM_BACKENDS="[]",
+        RECOMMENDATION_CACHE_ENABLED="0",
+        RECOMMENDATION_SIMILARITY_ENABLED="0",
+    )
+
+
+def stage_functions():
+    """Stage name -> (function, name of the stage whose outputs it takes as input, or "rows")."""
+    from controller import calculate_risk_score, generate_explanations, predict_health_risk
+    from llm_controller import get_recommendations
+    from profile_record import build_profile
+    from report_export import render_pdf
+    from utils.prompt_template import build_request
+
+    return {
+        "validation": (lambda row: build_profile(**row), "rows"),
+        "risk_score": (calculate_risk_score, "validation"),
+        "explanations": (generate_explanations, "validation"),
+        "health_risk": (predict_health_risk, "validation"),
+        "prompt": (build_request, "validation"),
+        "llm": (get_recommendations, "validation"),
+        "pdf_export": (lambda recommendations: render_pdf(recommendations, 5), "llm"),
+    }
+
+
+def time_stage(function, items):
+    """Per-item latencies in seconds, the outputs, and the wall time of the whole pass."""
+    latencies = np.empty(len(items))
+    outputs = []
+    start = time.perf_counter()
+    for index, item in enumerate(items):
+        item_start = time.perf_counter()
+        outputs.append(function(item))
+        latencies[index] = time.perf_counter() - item_start
+    return latencies, outputs, time.perf_counter() - start
+
+
+def time_stage_repeated(function, items, repeats):
+    """Median p50 and p99 in ms and median throughput over `repeats` passes, plus the last pass's outputs."""
+    p50s, p99s, throughputs = [], [], []
+    for _ in range(repeats):
+        latencies, outputs, elapsed = time_stage(function, items)
+        p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+        p50s.append(p50)
+        p99s.append(p99)
+        throughputs.append(len(items) / elapsed)
+    return float(np.median(p50s)), float(np.median(p99s)), float(np.median(throughputs)), outputs
+
+
+def peak_memory(function, items):
+    """Peak traced allocation in bytes while running the stage over `items` (a separate, slower pass)."""
+    tracemalloc.start()
+    try:
+        for item in items:
+            function(item)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def profile_stage(function, items, path):
+    profiler = cProfile.Profile()
+    profiler.enable()
+    for item in items:
+        function(item)
+    profiler.disable()
+    profiler.dump_stats(path)
+    pstats.Stats(profiler).sort_stats("cumulative").print_stats(10)
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PACKAGE_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, tolerance, min_regression_ms):
+    """Print each stage's change versus the baseline; return the stages that regressed past both limits."""
+    failures = []
+    print(f"\n{'stage':14} {'p50 ms':>10} {'baseline':>10} {'change':>8}")
+    for name, result in results.items():
+        reference = baseline["stages"].get(name)
+        if reference is None:
+            continue
+        ratio = result["p50_ms"] / reference["p50_ms"] if reference["p50_ms"] else float("nan")
+        print(f"{name:14} {result['p50_ms']:>10.3f} {reference['p50_ms']:>10.3f} {ratio:>7.2f}x")
+        if ratio > tolerance and result["p50_ms"] - reference["p50_ms"] > min_regression_ms:
+            failures.append(f"{name} p50 {result['p50_ms']:.3f} ms exceeds {tolerance}x baseline {reference['p50_ms']:.3f} ms")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profiles", type=int, default=2_000, help="synthetic profiles for the local stages")
+    parser.add_argument("--llm-profiles", type=int, default=200, help="profiles sent through the LLM and PDF stages")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="stub LLM response time in seconds")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--profile", metavar="DIR", help="write a cProfile file per stage to DIR")
+    parser.add_argument("--baseline", help="JSON file from --save-baseline to compare against")
+    parser.add_argument("--save-baseline", help="write the results to this JSON file")
+    parser.add_argument("--repeats", type=int, default=3, help="timed passes per stage; the median is reported")
+    parser.add_argument("--tolerance", type=float, default=1.5, help="allowed p50 slowdown factor versus the baseline")
+    parser.add_argument("--min-regression-ms", type=float, default=0.05,
+                        help="p50 slowdowns smaller than this many ms never fail the comparison")
+    args = parser.parse_args()
+
+    # Per-profile INFO logging would dominate the local stages; measure the work itself
+    logging.disable(logging.INFO)
+
+    rows = generate_dataframe(args.profiles, args.seed).to_dict("records")
+    # Plain Python scalars, as the Streamlit widgets and CSV readers hand them over
+    rows = [{key: value.item() if hasattr(value, "item") else value for key, value in row.items()} for row in rows]
+
+    stub = StubLLMServer(latency=args.llm_latency).start()
+    configure_stub(stub)
+    functions = stage_functions()
+    if args.profile:
+        os.makedirs(args.profile, exist_ok=True)
+
+    # Every stage runs on its input stage's outputs, so dependencies are computed even when not selected
+    needed = set(args.stages)
+    for name in reversed(STAGES):
+        if name in needed and functions[name][1] != "rows":
+            needed.add(functions[name][1])
+
+    outputs = {"rows": rows}
+    results = {}
+    try:
+        print(f"{'stage':14} {'items':>7} {'items/s':>12} {'p50 ms':>10} {'p99 ms':>10} {'peak KiB':>10}")
+        for name in STAGES:
+            if name not in needed:
+                continue
+            function, source = functions[name]
+            items = outputs[source]
+            if name in ("llm", "pdf_export"):
+                items = items[:args.llm_profiles]
+            function(items[0])  # warm up lazy imports and parsed fonts outside the timed pass
+            if name not in args.stages:
+                # Only needed as input to a selected stage; one pass is enough
+                outputs[name] = [function(item) for item in items]
+                continue
+
+            p50, p99, throughput, outputs[name] = time_stage_repeated(function, items, args.repeats)
+            peak = None if args.no_memory else peak_memory(function, items)
+            results[name] = {
+                "items": len(items),
+                "throughput": throughput,
+                "p50_ms": p50,
+                "p99_ms": p99,
+                "peak_kib": None if peak is None else peak / 1024,
+            }
+            peak_text = "-" if peak is None else f"{peak / 1024:.1f}"
+            print(f"{name:14} {len(items):>7} {throughput:>12,.1f} {p50:>10.3f} {p99:>10.3f} {peak_text:>10}")
+            if args.profile:
+                profile_stage(function, items, os.path.join(args.profile, f"{name}.prof"))
+    finally:
+        stub.stop()
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as file:
+            json.dump({
+                "meta": {
+                    "commit": git_commit(),
+                    "python": platform.python_version(),
+                    "profiles": args.profiles,
+                    "llm_profiles": args.llm_profiles,
+                    "seed": args.seed,
+                    "llm_latency": args.llm_latency,
+                    "repeats": args.repeats,
+                },
+                "stages": results,
+            }, file, indent=2)
+
+    failures = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)
+        print(f"Baseline: commit {baseline['meta'].get('commit')}, {baseline['meta'].get('profiles')} profiles")
+        failures = compare(results, baseline, args.tolerance, args.min_regression_ms)
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
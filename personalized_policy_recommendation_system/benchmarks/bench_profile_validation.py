@@ -0,0 +1,58 @@
+"""Per-profile construction and validation cost: UserData plus input_validation versus build_profile.
+
+Run from the package directory:
+
+    python -m benchmarks.bench_profile_validation [--profiles 20000]
+"""
+import argparse
+import time
+
+from benchmarks.synthetic import generate_dataframe
+from data_models import UserData
+from profile_record import build_profile
+from utils.input_validation import validate_user_data
+
+
+def old_path(row):
+    """What app.py and controller.py did before: pydantic model, then the validator functions."""
+    user_data = UserData(**row)
+    validate_user_data(user_data)
+    return user_data
+
+
+def new_path(row):
+    return build_profile(**row)
+
+
+def bench(function, rows, repeats):
+    """Best-of-N mean microseconds per profile."""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for row in rows:
+            function(row)
+        best = min(best, (time.perf_counter() - start) / len(rows))
+    return best * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profiles", type=int, default=20_000)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    rows = generate_dataframe(args.profiles).to_dict("records")
+    # Plain Python scalars, as the Streamlit widgets and CSV readers hand them over
+    rows = [{key: value.item() if hasattr(value, "item") else value for key, value in row.items()} for row in rows]
+    old_path(rows[0])
+
+    old = bench(old_path, rows, args.repeats)
+    new = bench(new_path, rows, args.repeats)
+    print(f"{'path':36} {'us/profile':>12}")
+    print(f"{'UserData + validate_user_data':36} {old:>12.2f}")
+    print(f"{'build_profile':36} {new:>12.2f}")
+    print(f"speedup: {old / new:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
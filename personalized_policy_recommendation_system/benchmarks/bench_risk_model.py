@@ -0,0 +1,93 @@
+"""Cold-start and per-prediction latency of the NumPy health-risk scorer versus scikit-learn.
+
+Run from the package directory:
+
+    python -m benchmarks.bench_risk_model [--rows 100000]
+"""
+import argparse
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic import generate_columns, generate_labels
+from risk_model import MODEL_FIELDS, HealthRiskModel, featurize
+from train_risk_model import export, train
+
+SKLEARN_COLD_START = (
+    "import time; start = time.perf_counter()\n"
+    "import pickle, sklearn.linear_model, sklearn.preprocessing\n"
+    "with open({path!r}, 'rb') as f: pickle.load(f)\n"
+    "print(time.perf_counter() - start)"
+)
+NUMPY_COLD_START = (
+    "import time; start = time.perf_counter()\n"
+    "from risk_model import HealthRiskModel\n"
+    "HealthRiskModel.load({path!r})\n"
+    "print(time.perf_counter() - start)"
+)
+
+
+def cold_start(code: str, runs: int) -> float:
+    """Best-of-N seconds for a fresh interpreter to import and load a model."""
+    cwd = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    timings = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", code], cwd=cwd, capture_output=True, text=True, check=True)
+        timings.append(float(output.stdout.strip().splitlines()[-1]))
+    return min(timings)
+
+
+def per_call(function, calls: int) -> float:
+    """Mean seconds per call."""
+    start = time.perf_counter()
+    for _ in range(calls):
+        function()
+    return (time.perf_counter() - start) / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000, help="rows for training and batch scoring")
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per cold-start measurement")
+    parser.add_argument("--calls", type=int, default=2_000, help="single-profile predictions to time")
+    args = parser.parse_args()
+
+    columns = generate_columns(args.rows)
+    frame = pd.DataFrame(columns)
+    frame["high_risk"] = generate_labels(columns)
+
+    with tempfile.TemporaryDirectory() as model_dir:
+        classifier, scaler, metrics = train(frame, "high_risk")
+        artifact = export(classifier, scaler, metrics, "synthetic", model_dir)
+        model = HealthRiskModel.load(artifact)
+        pickle_path = os.path.join(model_dir, "sklearn_model.pkl")
+        with open(pickle_path, "wb") as file:
+            pickle.dump((scaler, classifier), file)
+
+        sklearn_cold = cold_start(SKLEARN_COLD_START.format(path=pickle_path), args.runs)
+        numpy_cold = cold_start(NUMPY_COLD_START.format(path=artifact), args.runs)
+
+    single = {field: columns[field][:1] for field in MODEL_FIELDS}
+    profile = type("Profile", (), {field: columns[field][0] for field in MODEL_FIELDS})()
+    sklearn_single = per_call(lambda: classifier.predict_proba(scaler.transform(featurize(single)))[:, 1], args.calls)
+    numpy_single = per_call(lambda: model.predict(profile), args.calls)
+    sklearn_batch = per_call(lambda: classifier.predict_proba(scaler.transform(featurize(columns)))[:, 1], 3)
+    numpy_batch = per_call(lambda: model.predict_batch(columns), 3)
+
+    expected = classifier.predict_proba(scaler.transform(featurize(columns)))[:, 1]
+    max_difference = abs(model.predict_batch(columns) - expected).max()
+
+    print(f"holdout ROC AUC {metrics['roc_auc']:.3f}; max |numpy - sklearn| = {max_difference:.2e}")
+    print(f"{'':24} {'sklearn':>12} {'numpy':>12}")
+    print(f"{'cold start (ms)':24} {sklearn_cold * 1e3:>12.1f} {numpy_cold * 1e3:>12.1f}")
+    print(f"{'single predict (us)':24} {sklearn_single * 1e6:>12.1f} {numpy_single * 1e6:>12.1f}")
+    print(f"{f'batch of {args.rows} (ms)':24} {sklearn_batch * 1e3:>12.1f} {numpy_batch * 1e3:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Per-profile cost of the compiled risk rules versus the original hand-written if-chains.
+
+Run from the package directory:
+
+    python -m benchmarks.bench_risk_rules [--profiles 100000]
+
+Compares, per profile: the if-chains calculate_risk_score and generate_explanations used to run,
+RuleSet.assess_record (one profile at a time, as the app and API score), and
+RuleSet.evaluate over a whole batch. Also reports how long compiling the rule file takes, which
+is what a hot reload costs.
+"""
+import argparse
+import time
+
+from benchmarks.synthetic import generate_columns, generate_dataframe
+from profile_record import build_profile
+from risk_rules import RISK_RULES_PATH, active_rules, load_rules
+
+
+def if_chain(user_data):
+    """The rule logic as it was hard-coded in controller.py, for reference."""
+    score = 0
+    if user_data.age > 50:
+        score += 2
+    elif user_data.age > 30:
+        score += 1
+    if user_data.smoking_status == "Yes":
+        score += 3
+    if user_data.drinking_status == "Yes":
+        score += 2
+    if user_data.marital_status == "Single":
+        score += 1
+    if user_data.chronic_conditions:
+        score += len(user_data.chronic_conditions.split(", ")) * 2
+
+    explanations = []
+    if user_data.age > 50:
+        explanations.append("Age over 50 increases risk for certain health conditions.")
+    if user_data.smoking_status == "Yes":
+        explanations.append("Smoking status adds significant health risks, increasing premium.")
+    if user_data.drinking_status == "Yes":
+        explanations.append("Alcohol consumption may increase health risks.")
+    if user_data.marital_status == "Single":
+        explanations.append("Being single may affect insurance needs and coverage options.")
+    if user_data.chronic_conditions:
+        explanations.append("Chronic conditions add to health risk and can affect insurance eligibility.")
+    return score, explanations
+
+
+def compiled(user_data):
+    return active_rules().assess_record(user_data)
+
+
+def bench(functions, profiles, repeats):
+    """Best-of-N mean microseconds per profile for each function.
+
+    The functions take turns within every repeat, so a slow patch on a shared machine hits all of
+    them instead of skewing the comparison.
+    """
+    best = dict.fromkeys(functions, float("inf"))
+    for _ in range(repeats):
+        for name, function in functions.items():
+            start = time.perf_counter()
+            for profile in profiles:
+                function(profile)
+            best[name] = min(best[name], (time.perf_counter() - start) / len(profiles))
+    return {name: seconds * 1e6 for name, seconds in best.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profiles", type=int, default=100_000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = generate_dataframe(args.profiles).to_dict("records")
+    rows = [{key: value.item() if hasattr(value, "item") else value for key, value in row.items()} for row in rows]
+    profiles = [build_profile(**row) for row in rows]
+    mismatches = sum(if_chain(profile) != compiled(profile) for profile in profiles)
+
+    rules = active_rules()
+    columns = generate_columns(args.profiles)
+    batch = min(
+        _timed(lambda: rules.evaluate(columns)) for _ in range(args.repeats)
+    ) / args.profiles * 1e6
+    compile_ms = min(_timed(lambda: load_rules(RISK_RULES_PATH)) for _ in range(args.repeats)) * 1e3
+
+    print(f"rules version {rules.version}: {len(rules.rules)} rules on {len(rules.fields)} fields, "
+          f"{mismatches} mismatches against the if-chains")
+    timings = bench({"if-chains": if_chain, "assess_record": compiled}, profiles, args.repeats)
+    for name, microseconds in timings.items():
+        print(f"{name:28} {microseconds:8.3f} us/profile")
+    print(f"{'evaluate (batch)':28} {batch:8.3f} us/profile  ({args.profiles} rows)")
+    print(f"{'compile rule file':28} {compile_ms:8.3f} ms")
+
+
+def _timed(function):
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    main()
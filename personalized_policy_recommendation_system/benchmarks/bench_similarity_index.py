@@ -0,0 +1,132 @@
+"""Similarity index: lookup latency at scale and hit rate on a replayed workload.
+
+Run from the package directory:
+
+    python -m benchmarks.bench_similarity_index [--stored 1000000] [--customers 20000] [--requests 100000]
+
+The replay draws repeat visits from a fixed set of customers, each visit with a few hundred
+dollars of income drift and occupation/condition spelling noise, and compares how many requests
+the exact cache and the similarity index would answer without calling the model. "Cross-customer
+reuses" counts hits that returned another customer's recommendations.
+"""
+import argparse
+import random
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+from benchmarks.synthetic import generate_columns
+from config.cache_config import SIMILARITY_MAX_DISTANCE
+from utils.response_cache import make_cache_key
+from utils.similarity_index import SimilarityIndex, profile_vector
+
+
+def profiles_from_columns(columns):
+    fields = list(columns)
+    return [SimpleNamespace(**dict(zip(fields, values))) for values in zip(*(columns[field].tolist() for field in fields))]
+
+
+def misspell(text, rng):
+    """Drop, double or recase one character, or add stray whitespace."""
+    if not text:
+        return text
+    position = rng.randrange(len(text))
+    edit = rng.randrange(4)
+    if edit == 0:
+        return text[:position] + text[position + 1:]
+    if edit == 1:
+        return text[:position] + text[position] + text[position:]
+    if edit == 2:
+        return text.swapcase()
+    return f" {text}  "
+
+
+def revisit(profile, rng):
+    """The same customer on a later visit: income drift and spelling noise."""
+    visit = SimpleNamespace(**vars(profile))
+    visit.annual_income = round(profile.annual_income + rng.uniform(-500, 500), 2)
+    if rng.random() < 0.3:
+        visit.occupation = misspell(profile.occupation, rng)
+    if rng.random() < 0.2 and profile.chronic_conditions:
+        items = profile.chronic_conditions.split(", ")
+        rng.shuffle(items)
+        visit.chronic_conditions = ", ".join(items)
+    return visit
+
+
+def bench_latency(stored, queries, max_distance):
+    print(f"Embedding {len(stored):,} stored profiles...")
+    start = time.perf_counter()
+    vectors = np.stack([profile_vector(profile) for profile in stored])
+    print(f"  {time.perf_counter() - start:.1f}s")
+
+    index = SimilarityIndex(max_distance, max_entries=len(stored))
+    start = time.perf_counter()
+    index.add_many(vectors, range(len(stored)))
+    print(f"Indexed in {time.perf_counter() - start:.1f}s")
+
+    print(f"{'queries':24} {'p50 us':>10} {'p99 us':>10} {'hit rate':>10}")
+    for name, batch in queries.items():
+        timings, hits = [], 0
+        for profile in batch:
+            start = time.perf_counter()
+            hits += index.query(profile_vector(profile)) is not None
+            timings.append(time.perf_counter() - start)
+        p50, p99 = np.percentile(timings, [50, 99]) * 1e6
+        print(f"{name:24} {p50:>10.1f} {p99:>10.1f} {hits / len(batch):>10.1%}")
+
+
+def bench_replay(customers, requests, max_distance, seed):
+    rng = random.Random(seed)
+    index = SimilarityIndex(max_distance, max_entries=len(customers) * 2)
+    exact = set()
+    exact_hits = similar_hits = cross_customer = 0
+    for _ in range(requests):
+        customer = rng.randrange(len(customers))
+        visit = revisit(customers[customer], rng)
+        key = make_cache_key(visit, "model", "prompt")
+        if key in exact:
+            exact_hits += 1
+            continue
+        vector = profile_vector(visit)
+        match = index.query(vector)
+        if match is not None:
+            similar_hits += 1
+            cross_customer += match[0] != customer
+        else:
+            index.add(vector, customer)
+        exact.add(key)
+
+    print(f"Replayed {requests:,} visits from {len(customers):,} customers (max distance {max_distance}):")
+    print(f"  exact cache hits        {exact_hits / requests:>8.1%}")
+    print(f"  similarity hits         {similar_hits / requests:>8.1%}")
+    print(f"  model calls             {(requests - exact_hits - similar_hits) / requests:>8.1%}")
+    print(f"  cross-customer reuses   {cross_customer / requests:>8.2%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--stored", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=2_000)
+    parser.add_argument("--customers", type=int, default=20_000)
+    parser.add_argument("--requests", type=int, default=100_000)
+    parser.add_argument("--max-distance", type=float, default=SIMILARITY_MAX_DISTANCE)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    stored = profiles_from_columns(generate_columns(args.stored, seed=args.seed))
+    queries = {
+        "revisits of stored": [revisit(rng.choice(stored), rng) for _ in range(args.queries)],
+        "new profiles": profiles_from_columns(generate_columns(args.queries, seed=args.seed + 1)),
+    }
+    bench_latency(stored, queries, args.max_distance)
+    del stored
+
+    customers = profiles_from_columns(generate_columns(args.customers, seed=args.seed + 2))
+    bench_replay(customers, args.requests, args.max_distance, args.seed)
+
+
+if __name__ == "__main__":
+    main()
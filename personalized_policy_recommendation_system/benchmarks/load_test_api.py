@@ -0,0 +1,123 @@
+"""Load test for api.py: requests per second and tail latency against a stubbed LLM.
+
+Run from the package directory:
+
+    python -m benchmarks.load_test_api --endpoint recommendations --requests 2000 --concurrency 64 --workers 2
+
+Starts a StubLLMServer and `python api.py` pointed at it (or pass --url to target a running
+server), fires requests from an asyncio client and prints throughput and latency percentiles.
+Caches are off by default so every /recommendations request reaches the stubbed LLM.
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+import numpy as np
+
+from benchmarks.synthetic import generate_dataframe
+from utils.stub_llm_server import StubLLMServer
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PATHS = {"recommendations": "/recommendations", "risk": "/risk", "batch": "/recommendations/batch"}
+
+
+def request_bodies(endpoint, count, batch_size):
+    rows = generate_dataframe(count * (batch_size if endpoint == "batch" else 1)).to_dict("records")
+    rows = [{key: value.item() if hasattr(value, "item") else value for key, value in row.items()} for row in rows]
+    if endpoint == "batch":
+        return [{"profiles": rows[start:start + batch_size]} for start in range(0, len(rows), batch_size)]
+    return rows
+
+
+def start_server(port, workers, llm_url, use_cache):
+    # A placeholder key, so a real GROQ_API_KEY is never sent to the stub
+    env = dict(os.environ, GROQ_BASE_URL=llm_url[:-len("/v1")], GROQ_API_KEY="stub", LLM_API_BASE_URL=llm_url,
+               LLM_API_KEY="stub", LOG_LEVEL="WARNING")
+    if not use_cache:
+        env.update(RECOMMENDATION_CACHE_ENABLED="0", RECOMMENDATION_SIMILARITY_ENABLED="0")
+    process = subprocess.Popen(
+        [sys.executable, "api.py", "--port", str(port), "--workers", str(workers)],
+        cwd=PACKAGE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{url}/health", timeout=1).status_code == 200:
+                return process, url
+        except httpx.TransportError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("API server did not start within 60s.")
+
+
+async def run_load(url, path, bodies, concurrency):
+    latencies, errors = [], 0
+    queue = asyncio.Queue()
+    for body in bodies:
+        queue.put_nowait(body)
+
+    async def worker(client):
+        nonlocal errors
+        while not queue.empty():
+            body = queue.get_nowait()
+            start = time.perf_counter()
+            try:
+                response = await client.post(path, json=body)
+                ok = response.status_code == 200
+            except httpx.HTTPError:
+                ok = False
+            latencies.append(time.perf_counter() - start)
+            errors += not ok
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=120) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return np.array(latencies), errors, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--endpoint", choices=sorted(PATHS), default="recommendations")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--batch-size", type=int, default=20, help="profiles per request for --endpoint batch")
+    parser.add_argument("--url", help="target an already running API instead of starting one")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="stub LLM response time in seconds")
+    parser.add_argument("--use-cache", action="store_true", help="leave the recommendation caches on")
+    args = parser.parse_args()
+
+    bodies = request_bodies(args.endpoint, args.requests, args.batch_size)
+    stub = process = None
+    url = args.url
+    if url is None:
+        stub = StubLLMServer(latency=args.llm_latency).start()
+        process, url = start_server(args.port, args.workers, stub.base_url, args.use_cache)
+    try:
+        latencies, errors, elapsed = asyncio.run(run_load(url, PATHS[args.endpoint], bodies, args.concurrency))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+        if stub is not None:
+            stub.stop()
+
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+    print(f"{args.endpoint}: {len(latencies)} requests, concurrency {args.concurrency}, {args.workers} worker(s)")
+    print(f"  throughput  {len(latencies) / elapsed:10.1f} req/s")
+    print(f"  latency     p50 {p50:.1f} ms   p95 {p95:.1f} ms   p99 {p99:.1f} ms   max {latencies.max() * 1000:.1f} ms")
+    print(f"  errors      {errors}")
+    if stub is not None:
+        print(f"  LLM calls   {stub.requests}")
+
+
+if __name__ == "__main__":
+    main()
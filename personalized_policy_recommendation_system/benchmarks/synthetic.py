@@ -0,0 +1,45 @@
+import numpy as np
+
+GENDERS = np.array(["Male", "Female", "Other"])
+MARITAL_STATUSES = np.array(["Single", "Married", "Divorced", "Widowed"])
+YES_NO = np.array(["Yes", "No"])
+HEALTH_STATUSES = np.array(["good", "fair", "poor"])
+CONDITIONS = np.array(["", "diabetes", "hypertension", "asthma", "diabetes, hypertension", "asthma, arthritis, copd"])
+OCCUPATIONS = np.array(["Engineer", "Teacher", "Nurse", "Driver", "Accountant", "Farmer"])
+FAMILY_HISTORY = np.array(["", "heart disease", "diabetes", "heart disease, diabetes"])
+
+
+def generate_columns(size: int, seed: int = 0) -> dict:
+    """Generate a reproducible synthetic population of UserData-shaped columns."""
+    rng = np.random.default_rng(seed)
+    return {
+        "age": rng.integers(18, 121, size),
+        "gender": rng.choice(GENDERS, size),
+        "marital_status": rng.choice(MARITAL_STATUSES, size),
+        "smoking_status": rng.choice(YES_NO, size),
+        "drinking_status": rng.choice(YES_NO, size),
+        "chronic_conditions": rng.choice(CONDITIONS, size),
+        "annual_income": rng.uniform(10_000, 250_000, size).round(2),
+        "occupation": rng.choice(OCCUPATIONS, size),
+        "dependents": rng.integers(0, 6, size),
+        "health_status": rng.choice(HEALTH_STATUSES, size),
+        "family_health_history": rng.choice(FAMILY_HISTORY, size),
+    }
+
+
+def generate_dataframe(size: int, seed: int = 0):
+    """Same population as generate_columns, as a pandas DataFrame."""
+    import pandas as pd
+
+    return pd.DataFrame(generate_columns(size, seed))
+
+
+def generate_labels(columns: dict, seed: int = 0):
+    """Synthetic high-risk labels drawn from a known logistic relationship with the profile."""
+    from risk_model import featurize
+
+    rng = np.random.default_rng(seed + 1)
+    features = featurize(columns)
+    true_weights = np.array([0.05, 1.2, 0.6, 0.5, 0.4, 1.0, 0.3, 0.05])
+    logits = features @ true_weights - 4.0
+    return (rng.random(len(logits)) < 1.0 / (1.0 + np.exp(-logits))).astype(int)
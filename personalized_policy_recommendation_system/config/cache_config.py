@@ -0,0 +1,25 @@
+import os
+
+# Recommendation cache settings; set RECOMMENDATION_CACHE_ENABLED=0 to always call the model.
+CACHE_ENABLED = os.environ.get("RECOMMENDATION_CACHE_ENABLED", "1") != "0"
+CACHE_MAX_ENTRIES = int(os.environ.get("RECOMMENDATION_CACHE_MAX_ENTRIES", "1024"))
+CACHE_TTL_SECONDS = float(os.environ.get("RECOMMENDATION_CACHE_TTL_SECONDS", "3600"))
+
+# Optional SQLite tier that survives restarts; leave unset to keep the cache in memory only.
+CACHE_DB_PATH = os.environ.get("RECOMMENDATION_CACHE_DB_PATH", "")
+CACHE_DB_TTL_SECONDS = float(os.environ.get("RECOMMENDATION_CACHE_DB_TTL_SECONDS", "86400"))
+CACHE_DB_MAX_ENTRIES = int(os.environ.get("RECOMMENDATION_CACHE_DB_MAX_ENTRIES", "100000"))
+
+# Reuse the recommendations of a near-identical earlier profile (see utils/similarity_index.py).
+# Distance is roughly: 0.05 per year of age, 0.1 per 10% of income, ~0.1 for a misspelt occupation;
+# any change in gender, marital, smoking, drinking or health status, or dependents, is at least 1.0.
+# Matches never cross a risk-rule threshold. Off by default: set RECOMMENDATION_SIMILARITY_ENABLED=1.
+SIMILARITY_ENABLED = os.environ.get("RECOMMENDATION_SIMILARITY_ENABLED", "0") != "0"
+SIMILARITY_MAX_DISTANCE = float(os.environ.get("RECOMMENDATION_SIMILARITY_MAX_DISTANCE", "0.15"))
+SIMILARITY_MAX_ENTRIES = int(os.environ.get("RECOMMENDATION_SIMILARITY_MAX_ENTRIES", "100000"))
+
+# Persistent history of every answered profile (see recommendation_store.py); leave unset to keep
+# results in the session only.
+STORE_PATH = os.environ.get("RECOMMENDATION_STORE_PATH", "")
+# Stored answers younger than this are served again for an equivalent profile; 0 only records them.
+STORE_REUSE_SECONDS = float(os.environ.get("RECOMMENDATION_STORE_REUSE_SECONDS", "86400"))
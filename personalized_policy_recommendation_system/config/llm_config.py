@@ -1,10 +1,109 @@
+import functools
+import json
 import os
-from groq import Groq
+import threading
+from collections.abc import Mapping
 
-# Initialize Groq client
-groq_client = Groq(api_key=os.environ.get("GROQ_API_KEY", "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"))
+# Credentials come from the environment only; Groq calls fail until GROQ_API_KEY is set
+GROQ_API_KEY = os.environ.get("GROQ_API_KEY", "")
+GROQ_API_BASE_URL = "https://api.groq.com/openai/v1"
 
-# Associate the model name with Groq client
-clients = {
-    'llama3-70b-8192': groq_client
-}
+# OpenAI-compatible endpoint used by the async client; point it at a local stub server for testing
+LLM_API_BASE_URL = os.environ.get("LLM_API_BASE_URL", GROQ_API_BASE_URL)
+# Key sent to LLM_API_BASE_URL; the Groq key is only used when that is Groq's endpoint
+LLM_API_KEY = os.environ.get("LLM_API_KEY", GROQ_API_KEY if LLM_API_BASE_URL == GROQ_API_BASE_URL else "")
+
+# Async client limits
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", "8"))
+LLM_REQUEST_TIMEOUT = float(os.environ.get("LLM_REQUEST_TIMEOUT", "60"))
+LLM_MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", "4"))
+# handle_user_input returns the local scores without recommendations once the LLM stage runs this long
+LLM_STAGE_TIMEOUT = float(os.environ.get("LLM_STAGE_TIMEOUT", "90"))
+# Process-wide limits applied before calling the provider (0 disables); see utils/rate_limiter.py
+LLM_RATE_LIMIT_RPM = float(os.environ.get("LLM_RATE_LIMIT_RPM", "0"))
+LLM_RATE_LIMIT_TPM = float(os.environ.get("LLM_RATE_LIMIT_TPM", "0"))
+# Calls allowed to wait for the limiter, and the longest wait before a call is shed instead
+LLM_RATE_LIMIT_MAX_QUEUE = int(os.environ.get("LLM_RATE_LIMIT_MAX_QUEUE", "100"))
+LLM_RATE_LIMIT_MAX_WAIT = float(os.environ.get("LLM_RATE_LIMIT_MAX_WAIT", "30"))
+
+# Completion budget tier for requests that don't pick one (brief, standard or detailed; see utils/prompt_template.py)
+LLM_RESPONSE_TIER = os.environ.get("LLM_RESPONSE_TIER", "detailed")
+# Prompt plus completion tokens the model accepts
+LLM_CONTEXT_WINDOW = int(os.environ.get("LLM_CONTEXT_WINDOW", "8192"))
+
+# Extra OpenAI-compatible backends the router may use besides Groq, as a JSON list, e.g.
+# [{"name": "local", "base_url": "http://127.0.0.1:8001/v1", "model": "llama3", "api_key": "none"}]
+LLM_BACKENDS = json.loads(os.environ.get("LLM_BACKENDS", "[]"))
+# Seconds before a slow call is hedged on a second backend; "p95" follows each backend's rolling p95, "off" disables
+LLM_HEDGE_AFTER = os.environ.get("LLM_HEDGE_AFTER", "p95")
+# Consecutive failures that take a backend out of rotation, and for how long
+LLM_BREAKER_FAILURES = int(os.environ.get("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_COOLDOWN = float(os.environ.get("LLM_BREAKER_COOLDOWN", "30"))
+# Threads the router runs (and hedges) synchronous calls on; bounds concurrent calls through it
+LLM_ROUTER_THREADS = int(os.environ.get("LLM_ROUTER_THREADS", "64"))
+
+def create_groq_client(max_retries=2):
+    """Initialize the Groq client; groq is imported here so it only loads when a model is called."""
+    from groq import Groq
+    if not GROQ_API_KEY:
+        raise RuntimeError("GROQ_API_KEY is not set.")
+    return Groq(api_key=GROQ_API_KEY, max_retries=max_retries)
+
+def create_openai_client(base_url, api_key="none"):
+    """Client for any OpenAI-compatible server; retries are left to the router.
+
+    Only the key configured for that backend is sent ("none" when it needs no key).
+    """
+    from openai import OpenAI
+    return OpenAI(base_url=base_url, api_key=api_key, max_retries=0, timeout=LLM_REQUEST_TIMEOUT)
+
+def create_router():
+    """Route calls across Groq and the LLM_BACKENDS servers; see utils/llm_router.py."""
+    from llm_controller import llm_rate_limiter
+    from utils.llm_router import Backend, LLMRouter
+
+    # With somewhere to fail over to, the router retries instead of the client
+    groq_retries = 0 if LLM_BACKENDS else 2
+    backends = [Backend("groq", functools.partial(create_groq_client, groq_retries),
+                        failure_threshold=LLM_BREAKER_FAILURES, cooldown=LLM_BREAKER_COOLDOWN)]
+    for backend in LLM_BACKENDS:
+        backends.append(Backend(
+            backend["name"],
+            functools.partial(create_openai_client, backend["base_url"], backend.get("api_key", "none")),
+            model=backend.get("model"),
+            failure_threshold=LLM_BREAKER_FAILURES,
+            cooldown=LLM_BREAKER_COOLDOWN,
+        ))
+    hedge_after = None if LLM_HEDGE_AFTER == "off" else LLM_HEDGE_AFTER
+    # Hedged second requests count against the same limits as every other call
+    return LLMRouter(backends, hedge_after=hedge_after, max_workers=LLM_ROUTER_THREADS, rate_limiter=llm_rate_limiter)
+
+
+class LazyClients(Mapping):
+    """Model name -> client registry that builds each client once, on first lookup."""
+
+    def __init__(self, factories):
+        self._factories = dict(factories)
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name):
+        client = self._clients.get(name)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(name)
+                if client is None:
+                    client = self._clients[name] = self._factories[name]()
+        return client
+
+    def __iter__(self):
+        return iter(self._factories)
+
+    def __len__(self):
+        return len(self._factories)
+
+
+# Associate the model name with its router over Groq and any configured fallback backends
+clients = LazyClients({
+    'llama3-70b-8192': create_router
+})
@@ -1,30 +1,20 @@
-from llm_controller import get_recommendations
-from data_models import UserData
-from sklearn.linear_model import LogisticRegression
-from logger import log_info, log_error, log_exception
-
-# Placeholder logistic model setup for health risk prediction
-model = LogisticRegression()
+from config.llm_config import LLM_STAGE_TIMEOUT
+from llm_controller import MODEL_NAME, get_recommendations, is_error_response
+from logger import log_info, log_error, log_exception, log_throttled, log_warning
+from pipeline import Stage, StageGraph, StageTimeoutError, shared_executors
+from profile_record import build_profile
+from recommendation_store import default_store, scoring_model_version
+from utils.prompt_template import prompt_version
+from metrics import timed
+from batch_scoring import to_columns, health_risks, health_risk_fields
+from risk_rules import active_rules
 
 def calculate_risk_score(user_data):
     """Calculate a risk score based on user data."""
     try:
-        score = 0
-        if user_data.age > 50:
-            score += 2
-        elif user_data.age > 30:
-            score += 1
-        
-        if user_data.smoking_status == "Yes":
-            score += 3
-        if user_data.drinking_status == "Yes":
-            score += 2
-        if user_data.marital_status == "Single":
-            score += 1  # Example adjustment: single users may have different coverage needs
-        if user_data.chronic_conditions:
-            score += len(user_data.chronic_conditions.split(", ")) * 2
-        
-        log_info(f"Calculated risk score: {score}")
+        score = active_rules().evaluate_record(user_data)[0]
+
+        log_throttled("Calculated risk score: %s", score)
         return score
     except Exception as e:
         log_exception("Error calculating risk score.")
@@ -32,81 +22,131 @@ def calculate_risk_score(user_data):
 
 def generate_explanations(user_data):
     """Generate simple explanations based on risk factors in user data."""
-    explanations = []
     try:
-        if user_data.age > 50:
-            explanations.append("Age over 50 increases risk for certain health conditions.")
-        if user_data.smoking_status == "Yes":
-            explanations.append("Smoking status adds significant health risks, increasing premium.")
-        if user_data.drinking_status == "Yes":
-            explanations.append("Alcohol consumption may increase health risks.")
-        if user_data.marital_status == "Single":
-            explanations.append("Being single may affect insurance needs and coverage options.")
-        if user_data.chronic_conditions:
-            explanations.append("Chronic conditions add to health risk and can affect insurance eligibility.")
-
-        log_info("Generated explanations for user data.")
+        rules = active_rules()
+        explanations = rules.decode(rules.evaluate_record(user_data)[1])
+
+        log_throttled("Generated explanations for user data.")
         return explanations
 
     except Exception as e:
         log_exception("Error generating explanations.")
         raise e
 
+def assess_risk(user_data):
+    """Risk score and explanations from a single evaluation of the risk rules."""
+    try:
+        score, explanations = active_rules().assess_record(user_data)
+
+        log_throttled("Calculated risk score: %s", score)
+        return score, explanations
+
+    except Exception as e:
+        log_exception("Error assessing risk.")
+        raise e
+
 def predict_health_risk(user_data):
-    """Predict health risk using a placeholder logistic regression model."""
+    """Predict health risk using the trained logistic regression model (see risk_model.py)."""
     try:
-        # Placeholder feature array for logistic regression model
-        features = [
-            user_data.age,
-            int(user_data.smoking_status == "Yes"),
-            int(user_data.drinking_status == "Yes"),
-            len(user_data.chronic_conditions.split(", "))
-        ]
-        # Mock prediction (normally, you would train and use a real model)
-        prediction = 0.65  # Example: 65% risk as a placeholder
-
-        log_info(f"Predicted health risk: {prediction}")
+        prediction = float(health_risks(to_columns([user_data], health_risk_fields()))[0])
+
+        log_throttled("Predicted health risk: %s", prediction)
         return prediction
 
     except Exception as e:
         log_exception("Error predicting health risk.")
         raise e
 
-def handle_user_input(age, gender, marital_status, smoking_status, drinking_status, chronic_conditions, income, occupation, dependents, health_status, family_history):
-    """Process user input and generate insurance recommendations, risk score, explanations, and health risk prediction."""
+# The LLM stage is listed first so it starts before the local scoring stages, which run while it is in flight
+# on their own pool
+RECOMMENDATION_PIPELINE = StageGraph([
+    Stage("recommendations", get_recommendations, ("user_data",), timeout=LLM_STAGE_TIMEOUT, pool="io"),
+    Stage("risk", assess_risk, ("user_data",)),
+    Stage("health_risk", predict_health_risk, ("user_data",)),
+])
+
+def start_pipeline(user_data, only=None):
+    """Start the recommendation pipeline for a validated profile; returns a PipelineRun to read stage results from."""
+    return RECOMMENDATION_PIPELINE.start({"user_data": user_data}, shared_executors(), only=only)
+
+def store_result(user_data, result, customer_id=None, store=None):
+    """Record a handle_user_input result in the recommendation store, if one is configured."""
+    store = store if store is not None else default_store()
+    if store is None:
+        return None
+    recommendations = result["recommendations"]
+    # Error messages are not answers; they would otherwise be served again from the store
+    if recommendations is not None and is_error_response(recommendations):
+        recommendations = None
     try:
-        # Create UserData instance
-        user_data = UserData(
-            age=age,
-            gender=gender,
-            marital_status=marital_status,
-            smoking_status=smoking_status,
-            drinking_status=drinking_status,
-            chronic_conditions=chronic_conditions,
-            annual_income=income,
-            occupation=occupation,
-            dependents=dependents,
-            health_status=health_status,
-            family_health_history=family_history
+        return store.record(
+            user_data,
+            customer_id=customer_id,
+            risk_score=result["risk_score"],
+            health_risk=result["health_risk_prediction"],
+            explanations=result["explanations"],
+            recommendations=recommendations,
+            model=MODEL_NAME,
+            model_version=scoring_model_version(),
+            prompt_scope=prompt_version(),
         )
+    except Exception:
+        # History is best-effort; the customer still gets their answer
+        log_exception("Failed to store recommendations.")
+        return None
+
+def handle_user_input(age, gender, marital_status, smoking_status, drinking_status, chronic_conditions, income, occupation, dependents, health_status, family_history, customer_id=None):
+    """Process user input and generate insurance recommendations, risk score, explanations, and health risk prediction."""
+    try:
+        # Validate and normalize the raw input into an immutable profile record
+        with timed("validation"):
+            user_data = build_profile(
+                age=age,
+                gender=gender,
+                marital_status=marital_status,
+                smoking_status=smoking_status,
+                drinking_status=drinking_status,
+                chronic_conditions=chronic_conditions,
+                annual_income=income,
+                occupation=occupation,
+                dependents=dependents,
+                health_status=health_status,
+                family_health_history=family_history
+            )
 
-        log_info("Created UserData instance with validated user input.")
+        log_info("Created profile record from validated user input.")
 
-        # Calculate risk score and generate explanations
-        risk_score = calculate_risk_score(user_data)
-        explanations = generate_explanations(user_data)
-        health_risk_prediction = predict_health_risk(user_data)
+    except Exception as e:
+        log_exception("An error occurred while handling user input.")
+        return {"error": f"An unexpected error occurred: {e}"}
+
+    return handle_profile(user_data, customer_id)
+
+def handle_profile(user_data, customer_id=None):
+    """handle_user_input for a ProfileRecord that has already been validated (e.g. by the API)."""
+    try:
+        # The AI model call and the local scoring stages run concurrently
+        run = start_pipeline(user_data)
+        risk_score, explanations = run.result("risk")
+        health_risk_prediction = run.result("health_risk")
 
-        # Get recommendations from the AI model
-        recommendations = get_recommendations(user_data)
-        log_info("Received recommendations from the AI model.")
+        timed_out = False
+        try:
+            recommendations = run.result("recommendations")
+            log_info("Received recommendations from the AI model.")
+        except StageTimeoutError as e:
+            log_warning("%s Returning the risk assessment without recommendations.", e)
+            recommendations = f"Recommendations are taking longer than {e.timeout:g}s; please try again."
+            timed_out = True
 
-        return {
+        result = {
             "recommendations": recommendations,
             "risk_score": risk_score,
             "explanations": explanations,
             "health_risk_prediction": health_risk_prediction
         }
+        store_result(user_data, dict(result, recommendations=None) if timed_out else result, customer_id)
+        return result
 
     except Exception as e:
         log_exception("An error occurred while handling user input.")
@@ -1,59 +1,325 @@
-from config.llm_config import clients
-from logger import log_info, log_error, log_exception
+from config.llm_config import (
+    clients,
+    LLM_RATE_LIMIT_RPM,
+    LLM_RATE_LIMIT_TPM,
+    LLM_RATE_LIMIT_MAX_QUEUE,
+    LLM_RATE_LIMIT_MAX_WAIT,
+)
+from config.cache_config import (
+    CACHE_ENABLED,
+    CACHE_MAX_ENTRIES,
+    CACHE_TTL_SECONDS,
+    CACHE_DB_PATH,
+    CACHE_DB_TTL_SECONDS,
+    CACHE_DB_MAX_ENTRIES,
+    STORE_REUSE_SECONDS,
+    SIMILARITY_ENABLED,
+    SIMILARITY_MAX_DISTANCE,
+    SIMILARITY_MAX_ENTRIES,
+)
+from utils.response_cache import MemoryCache, SQLiteCache, RecommendationCache, make_cache_key
+from utils.similarity_index import SimilarRecommendations
+from recommendation_store import default_store
+from utils.rate_limiter import LLMRateLimiter, RateLimitExceeded
+from utils.single_flight import SharedStreams, SingleFlight
+from utils.prompt_template import DEFAULT_TIER, build_request, parse_policies
+from logger import log_debug, log_info, log_warning, log_error, log_exception
+from metrics import CACHE_LOOKUPS, LLM_REQUESTS, LLM_REQUEST_SECONDS, LLM_TIME_TO_FIRST_TOKEN_SECONDS, record_llm_usage
+import time
 
-def get_recommendations(user_data):
-    """Fetches insurance recommendations based on user data using the Groq API."""
-    client = clients['llama3-70b-8192']
-    
-    # Construct prompt for the recommendation engine
-    prompt = (
-        f"User details:\n"
-        f"- Age: {user_data.age}\n"
-        f"- Gender: {user_data.gender}\n"
-        f"- Marital Status: {user_data.marital_status}\n"
-        f"- Smoking Status: {user_data.smoking_status}\n"
-        f"- Drinking Status: {user_data.drinking_status}\n"
-        f"- Chronic Conditions: {user_data.chronic_conditions}\n"
-        f"- Annual Income: {user_data.annual_income}\n"
-        f"- Occupation: {user_data.occupation}\n"
-        f"- Number of Dependents: {user_data.dependents}\n"
-        f"- Health Status: {user_data.health_status}\n"
-        f"- Family Health History: {user_data.family_health_history}\n\n"
-        f"Provide personalized insurance policy recommendations based on this data."
-    )
+MODEL_NAME = 'llama3-70b-8192'
+
+def completion_options(request):
+    """Keyword arguments for chat.completions.create derived from a PromptRequest."""
+    options = {"max_tokens": request.max_tokens}
+    if request.response_format is not None:
+        options["response_format"] = request.response_format
+    return options
+
+def build_cache():
+    """Builds the recommendation cache from config: memory LRU first, then the optional SQLite tier."""
+    tiers = [MemoryCache(maxsize=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS)]
+    if CACHE_DB_PATH:
+        tiers.append(SQLiteCache(CACHE_DB_PATH, ttl=CACHE_DB_TTL_SECONDS, maxsize=CACHE_DB_MAX_ENTRIES))
+    return RecommendationCache(tiers)
+
+# Process-wide cache shared by every caller of get_recommendations
+recommendation_cache = build_cache() if CACHE_ENABLED else None
+
+# Process-wide index of answered profiles, consulted when the exact cache misses
+similar_recommendations = (
+    SimilarRecommendations(SIMILARITY_MAX_DISTANCE, SIMILARITY_MAX_ENTRIES) if SIMILARITY_ENABLED else None
+)
+
+# Process-wide request and token limits in front of the provider
+llm_rate_limiter = LLMRateLimiter(
+    LLM_RATE_LIMIT_RPM, LLM_RATE_LIMIT_TPM, LLM_RATE_LIMIT_MAX_QUEUE, LLM_RATE_LIMIT_MAX_WAIT
+)
+
+# Calls in flight, by cache key, that identical concurrent requests wait on instead of repeating
+in_flight_calls = SingleFlight()
+in_flight_streams = SharedStreams()
+
+BUSY_MESSAGE = "The recommendation service is busy right now; please try again in a moment."
+# Failed calls return text starting with one of these instead of raising
+ERROR_PREFIXES = ("API response error:", "API response structure error:", "An unexpected error occurred:", BUSY_MESSAGE)
+
+class RecommendationStreamError(Exception):
+    """Raised by stream_recommendations when the answer could not be completed.
+
+    The message is the text to show instead of the answer; chunks already yielded are an incomplete
+    answer and must not be kept.
+    """
+
+def is_error_response(text):
+    """Whether get_recommendations text is an error message rather than an answer."""
+    return not text or text.startswith(ERROR_PREFIXES)
+
+def refund_unused_tokens(max_tokens, usage):
+    """Gives the rate limiter back the part of max_tokens the completion did not use."""
+    if usage is None:
+        return
+    completion_tokens = usage.get("completion_tokens") if isinstance(usage, dict) else getattr(usage, "completion_tokens", None)
+    if completion_tokens is not None and max_tokens:
+        llm_rate_limiter.refund(max_tokens - completion_tokens)
+
+def lookup_stored(user_data, model, prompt_scope):
+    """Returns a recent answer from the recommendation store for an equivalent profile, model and prompt, or None."""
+    store = default_store()
+    if store is None or not STORE_REUSE_SECONDS:
+        return None
+    try:
+        record = store.latest(user_data, model=model, prompt_scope=prompt_scope, max_age=STORE_REUSE_SECONDS)
+    except Exception:
+        log_exception("Failed to read the recommendation store.")
+        return None
+    if record is None or not record.recommendations:
+        CACHE_LOOKUPS.inc(result="store_miss")
+        return None
+    CACHE_LOOKUPS.inc(result="store_hit")
+    log_info("Serving recommendations stored %.0fs ago.", time.time() - record.created_at)
+    return record.recommendations
+
+def lookup_similar(user_data, model, similar):
+    """Returns the recommendations of a near-identical earlier profile, or None."""
+    if similar is None:
+        return None
+    match = similar.lookup(user_data, model)
+    if match is None:
+        CACHE_LOOKUPS.inc(result="similar_miss")
+        return None
+    recommendations, distance = match
+    CACHE_LOOKUPS.inc(result="similar_hit")
+    log_info("Reusing recommendations of a similar profile (distance %.3f).", distance)
+    return recommendations
+
+def get_recommendations(user_data, cache=None, similar=None, tier=DEFAULT_TIER, json_output=False):
+    """Fetches insurance recommendations based on user data using the Groq API.
+
+    Identical (normalized) profiles are served from the recommendation cache or the recommendation
+    store, and near-identical ones from the similarity index, instead of calling the model. Concurrent identical requests
+    share one in-flight call. `tier` sets the completion budget; with json_output the model
+    answers in the JSON policy schema and a list of Policy records is returned instead of text
+    (PolicyParseError when the call failed or the answer strays from the schema).
+    """
+    text = recommendation_text(user_data, cache, similar, tier, json_output)
+    return parse_policies(text) if json_output else text
+
+
+def recommendation_text(user_data, cache=None, similar=None, tier=DEFAULT_TIER, json_output=False):
+    """The model's answer for get_recommendations as text; failures return an error message."""
+    cache = cache if cache is not None else recommendation_cache
+    similar = similar if similar is not None else similar_recommendations
+    request = build_request(user_data, tier, json_output)
+    # Answers are only reused for requests with the same prompt wording
+    scope = f"{MODEL_NAME}/{request.cache_scope}"
+    key = make_cache_key(user_data, MODEL_NAME, request.cache_scope)
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            CACHE_LOOKUPS.inc(result="hit")
+            log_info("Serving recommendations from cache.")
+            return cached
+        CACHE_LOOKUPS.inc(result="miss")
+
+    recommendations = lookup_stored(user_data, MODEL_NAME, request.cache_scope)
+    if recommendations is None:
+        recommendations = lookup_similar(user_data, scope, similar)
+    if recommendations is not None:
+        if cache is not None:
+            cache.set(key, recommendations)
+        return recommendations
+
+    # A streamed answer for the same request (e.g. from the app) is already on its way
+    if in_flight_streams.in_flight(key):
+        try:
+            return "".join(in_flight_streams.read(key, lambda: fetch_stream(user_data, request, key, cache, similar)))
+        except RecommendationStreamError as e:
+            return str(e)
+    return in_flight_calls.do(key, fetch_recommendations, user_data, request, key, cache, similar)
+
+
+def fetch_recommendations(user_data, request, key, cache, similar):
+    """Calls the model for one request and caches the answer; get_recommendations runs one per key at a time."""
+    # The call this one waited behind may have just answered it
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    scope = f"{MODEL_NAME}/{request.cache_scope}"
+    client = clients[MODEL_NAME]
     
     try:
         log_info("Sending request to Groq API for recommendations.")
+        log_debug("Prompt is about %d tokens; max_tokens=%d.", request.prompt_tokens, request.max_tokens)
+        llm_rate_limiter.acquire(request.prompt_tokens + request.max_tokens)
         
         # Fetch response from the Groq API
-        chat_completion = client.chat.completions.create(
-            model="llama3-70b-8192",
-            messages=[
-                {"role": "system", "content": "Generate personalized insurance policy recommendations."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=1000,
-        )
+        with LLM_REQUEST_SECONDS.time(mode="sync"):
+            chat_completion = client.chat.completions.create(
+                model=MODEL_NAME,
+                messages=request.messages,
+                **completion_options(request),
+            )
+        record_llm_usage(getattr(chat_completion, "usage", None))
+        refund_unused_tokens(request.max_tokens, getattr(chat_completion, "usage", None))
 
-        # Log raw response data for debugging if needed
-        log_info(f"Received response from Groq API: {chat_completion}")
+        # Log a compact summary; the full response object is large and costly to repr
+        log_debug("Received response from Groq API: id=%s usage=%s", getattr(chat_completion, "id", None), getattr(chat_completion, "usage", None))
 
         # Extract recommendations
         recommendations = chat_completion.choices[0].message.content
         log_info("Recommendations successfully extracted from API response.")
-        
+
+        # Only successful responses are cached; the error strings below are not
+        if cache is not None and recommendations:
+            cache.set(key, recommendations)
+        if similar is not None and recommendations:
+            similar.add(user_data, scope, recommendations)
+
+        LLM_REQUESTS.inc(mode="sync", outcome="ok")
         return recommendations
 
+    except RateLimitExceeded as e:
+        LLM_REQUESTS.inc(mode="sync", outcome="shed")
+        log_warning("LLM call shed by the rate limiter: %s", e)
+        return BUSY_MESSAGE
+
     except AttributeError as e:
+        LLM_REQUESTS.inc(mode="sync", outcome="error")
         log_error("AttributeError when accessing API response.")
-        log_exception(f"Error accessing Groq API: {e}")
+        log_exception("Error accessing Groq API: %s", e)
         return f"API response error: {e}"
 
     except TypeError as e:
+        LLM_REQUESTS.inc(mode="sync", outcome="error")
         log_error("TypeError due to unexpected response structure.")
-        log_exception(f"Unexpected response structure from Groq API: {e}")
+        log_exception("Unexpected response structure from Groq API: %s", e)
         return f"API response structure error: {e}"
 
     except Exception as e:
+        LLM_REQUESTS.inc(mode="sync", outcome="error")
         log_exception("An unexpected error occurred while communicating with Groq API.")
         return f"An unexpected error occurred: {e}"
+
+
+def stream_recommendations(user_data, cache=None, similar=None, tier=DEFAULT_TIER):
+    """Returns an iterator of recommendation text deltas as the Groq API streams them.
+
+    The lookups run and the call starts right away, before the first delta is read, so callers can
+    do other work while the model answers. A cache, store or similarity hit is yielded as a single
+    chunk; the assembled text of a completed stream is cached and indexed. The call runs in the
+    background, so it completes (and is cached) even if the reader stops, and a concurrent
+    identical request replays the same stream (or waits for the same blocking call). A failed or
+    shed call raises RecommendationStreamError, possibly after some deltas, in every reader of the
+    stream.
+    """
+    cache = cache if cache is not None else recommendation_cache
+    similar = similar if similar is not None else similar_recommendations
+    request = build_request(user_data, tier)
+    scope = f"{MODEL_NAME}/{request.cache_scope}"
+    key = make_cache_key(user_data, MODEL_NAME, request.cache_scope)
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            CACHE_LOOKUPS.inc(result="hit")
+            log_info("Serving recommendations from cache.")
+            return iter((cached,))
+        CACHE_LOOKUPS.inc(result="miss")
+
+    recommendations = lookup_stored(user_data, MODEL_NAME, request.cache_scope)
+    if recommendations is None:
+        recommendations = lookup_similar(user_data, scope, similar)
+    if recommendations is not None:
+        if cache is not None:
+            cache.set(key, recommendations)
+        return iter((recommendations,))
+
+    # A blocking call for the same request (e.g. from the API) is already on its way; its answer arrives whole
+    if in_flight_calls.in_flight(key):
+        return join_blocking_call(user_data, request, key, cache, similar)
+    return in_flight_streams.read(key, lambda: fetch_stream(user_data, request, key, cache, similar))
+
+
+def join_blocking_call(user_data, request, key, cache, similar):
+    """Yields the answer of the blocking call in flight for key as one chunk."""
+    recommendations = in_flight_calls.do(key, fetch_recommendations, user_data, request, key, cache, similar)
+    if is_error_response(recommendations):
+        raise RecommendationStreamError(recommendations)
+    yield recommendations
+
+
+def fetch_stream(user_data, request, key, cache, similar):
+    """Streams one request from the model and caches the assembled answer; failures raise RecommendationStreamError."""
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+
+    scope = f"{MODEL_NAME}/{request.cache_scope}"
+    client = clients[MODEL_NAME]
+    parts = []
+
+    try:
+        log_info("Sending streaming request to Groq API for recommendations.")
+        llm_rate_limiter.acquire(request.prompt_tokens + request.max_tokens)
+        start = time.perf_counter()
+
+        stream = client.chat.completions.create(
+            model=MODEL_NAME,
+            messages=request.messages,
+            stream=True,
+            **completion_options(request),
+        )
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                if not parts:
+                    LLM_TIME_TO_FIRST_TOKEN_SECONDS.observe(time.perf_counter() - start)
+                parts.append(delta)
+                yield delta
+
+        LLM_REQUEST_SECONDS.observe(time.perf_counter() - start, mode="stream")
+        LLM_REQUESTS.inc(mode="stream", outcome="ok")
+        recommendations = "".join(parts)
+        log_info("Recommendations stream completed.")
+
+        if cache is not None and recommendations:
+            cache.set(key, recommendations)
+        if similar is not None and recommendations:
+            similar.add(user_data, scope, recommendations)
+
+    except RateLimitExceeded as e:
+        LLM_REQUESTS.inc(mode="stream", outcome="shed")
+        log_warning("LLM call shed by the rate limiter: %s", e)
+        raise RecommendationStreamError(BUSY_MESSAGE) from e
+
+    except Exception as e:
+        LLM_REQUESTS.inc(mode="stream", outcome="error")
+        log_exception("An unexpected error occurred while streaming from Groq API.")
+        raise RecommendationStreamError(f"An unexpected error occurred: {e}") from e
+
@@ -1,6 +1,11 @@
+import atexit
+import json
 import logging
 import os
-from logging.handlers import RotatingFileHandler
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
 # Set up the log directory
 LOG_DIR = "logs"
@@ -9,36 +14,138 @@ os.makedirs(LOG_DIR, exist_ok=True)
 # Define log file path
 LOG_FILE_PATH = os.path.join(LOG_DIR, "app.log")
 
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+# HTTP client libraries log every request at DEBUG; keep them quieter unless asked
+THIRD_PARTY_LOG_LEVEL = os.environ.get("THIRD_PARTY_LOG_LEVEL", "WARNING").upper()
+THIRD_PARTY_LOGGERS = ("httpcore", "httpx", "groq", "openai", "urllib3", "asyncio")
+
+# Longer messages are cut down before they reach any handler
+MAX_MESSAGE_CHARS = int(os.environ.get("LOG_MAX_MESSAGE_CHARS", "2000"))
+# Per-template limit for messages logged with log_throttled on hot paths
+HOT_PATH_LOGS_PER_SECOND = float(os.environ.get("LOG_HOT_PATH_PER_SECOND", "5"))
+
+# Attributes every LogRecord has; anything else on a record came from `extra` and is emitted as a field
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+
+def truncate(text: str, limit: int = MAX_MESSAGE_CHARS) -> str:
+    """Cut text to `limit` characters, noting how much was dropped."""
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}... [truncated {len(text) - limit} chars]"
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, including any `extra` fields passed to the log call."""
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": truncate(record.getMessage()),
+            "module": record.module,
+            "line": record.lineno,
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TruncatingFormatter(logging.Formatter):
+    """Plain-text formatter that truncates long messages."""
+
+    def formatMessage(self, record):
+        record.message = truncate(record.message)
+        return super().formatMessage(record)
+
+
+class DeferredQueueHandler(QueueHandler):
+    """Enqueues records with only their message rendered; formatting happens on the listener thread.
+
+    The stock QueueHandler runs the full formatter in the caller's thread to make records
+    picklable; this queue never leaves the process, so the request path only pays for the
+    %-substitution (which must happen now, since the caller may mutate its arguments) and the enqueue.
+    """
+
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+# Background pipeline: callers enqueue, a listener thread does the file and stderr I/O
+_log_queue = queue.SimpleQueue()
+
+_file_handler = RotatingFileHandler(LOG_FILE_PATH, maxBytes=5 * 1024 * 1024, backupCount=3)
+_file_handler.setFormatter(JsonFormatter())
+_stream_handler = logging.StreamHandler()
+_stream_handler.setFormatter(TruncatingFormatter("%(asctime)s - %(levelname)s - %(name)s - %(message)s"))
+
+_listener = QueueListener(_log_queue, _file_handler, _stream_handler, respect_handler_level=True)
+_listener.start()
+atexit.register(_listener.stop)
+
 # Set up logging configuration
-logging.basicConfig(
-    level=logging.DEBUG,
-    format="%(asctime)s - %(levelname)s - %(name)s - %(message)s",
-    handlers=[
-        RotatingFileHandler(LOG_FILE_PATH, maxBytes=5 * 1024 * 1024, backupCount=3),
-        logging.StreamHandler()
-    ]
-)
+logging.basicConfig(level=LOG_LEVEL, handlers=[DeferredQueueHandler(_log_queue)])
+for name in THIRD_PARTY_LOGGERS:
+    logging.getLogger(name).setLevel(THIRD_PARTY_LOG_LEVEL)
 
 # Create a logger object
 logger = logging.getLogger("InsuranceRecommendationApp")
 
-# Log helper functions for different levels
-def log_debug(message: str):
+
+class _Throttle:
+    """Per-template token bucket used by log_throttled."""
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def allow(self, key, per_second):
+        """Return (allowed, messages suppressed since the last allowed one)."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated, suppressed = self._buckets.get(key, (per_second, now, 0))
+            tokens = min(per_second, tokens + (now - updated) * per_second)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now, 0)
+                return True, suppressed
+            self._buckets[key] = (tokens, now, suppressed + 1)
+            return False, suppressed
+
+
+_throttle = _Throttle()
+
+# Log helper functions for different levels. Pass values as arguments
+# (log_info("Scored %s", score)) so formatting only happens if the record is emitted.
+def log_debug(message: str, *args, **kwargs):
     """Logs a debug message."""
-    logger.debug(message)
+    logger.debug(message, *args, stacklevel=2, **kwargs)
 
-def log_info(message: str):
+def log_info(message: str, *args, **kwargs):
     """Logs an informational message."""
-    logger.info(message)
+    logger.info(message, *args, stacklevel=2, **kwargs)
 
-def log_warning(message: str):
+def log_warning(message: str, *args, **kwargs):
     """Logs a warning message."""
-    logger.warning(message)
+    logger.warning(message, *args, stacklevel=2, **kwargs)
 
-def log_error(message: str):
+def log_error(message: str, *args, **kwargs):
     """Logs an error message."""
-    logger.error(message)
+    logger.error(message, *args, stacklevel=2, **kwargs)
 
-def log_exception(message: str):
+def log_exception(message: str, *args, **kwargs):
     """Logs an exception message along with the traceback."""
-    logger.exception(message)
+    logger.exception(message, *args, stacklevel=2, **kwargs)
+
+def log_throttled(message: str, *args, level: int = logging.INFO, per_second: float = HOT_PATH_LOGS_PER_SECOND):
+    """Logs a hot-path message at most `per_second` times per second per message template."""
+    if not logger.isEnabledFor(level):
+        return
+    allowed, suppressed = _throttle.allow(message, per_second)
+    if allowed:
+        logger.log(level, message, *args, extra={"suppressed": suppressed} if suppressed else None, stacklevel=2)
@@ -0,0 +1,284 @@
+"""In-process metrics for the recommendation pipeline.
+
+Counters and histograms are cheap enough to leave on in production (a perf_counter pair, a
+lock and a bisect per observation). They are exposed in Prometheus text format by
+start_metrics_server() and can be written to a JSON file with dump_metrics().
+"""
+import atexit
+import bisect
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") != "0"
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "0"))
+METRICS_DUMP_PATH = os.environ.get("METRICS_DUMP_PATH", "")
+
+# Seconds; spans from sub-millisecond local scoring up to long LLM generations
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+
+
+def _escape_label(value):
+    """Escape a label value as the Prometheus text format requires."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames, key, extra=()):
+    pairs = list(zip(labelnames, key)) + list(extra)
+    if not pairs:
+        return ""
+    rendered = ",".join(f'{name}="{_escape_label(value)}"' for name, value in pairs)
+    return "{" + rendered + "}"
+
+
+class Counter:
+    """Monotonic counter with optional labels."""
+
+    kind = "counter"
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = tuple(labels[name] for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(tuple(labels[name] for name in self.labelnames), 0)
+
+    def render(self):
+        with self._lock:
+            values = dict(self._values)
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in values.items()]
+
+    def snapshot(self):
+        with self._lock:
+            return [{"labels": dict(zip(self.labelnames, key)), "value": value} for key, value in self._values.items()]
+
+
+class Gauge(Counter):
+    """Value that can go up and down, such as a queue depth."""
+
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = tuple(labels[name] for name in self.labelnames)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram:
+    """Fixed-bucket histogram with optional labels."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets=LATENCY_BUCKETS, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self.labelnames = tuple(labelnames)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = tuple(labels[name] for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def time(self, **labels):
+        """Observe the wall time of the with-block, including when it raises."""
+        return _Timer(self, labels)
+
+    def render(self):
+        with self._lock:
+            series = {key: (list(counts), total, count) for key, (counts, total, count) in self._series.items()}
+        lines = []
+        for key, (counts, total, count) in series.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, [('le', bound)])} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+    def snapshot(self):
+        with self._lock:
+            return [
+                {
+                    "labels": dict(zip(self.labelnames, key)),
+                    "buckets": dict(zip([str(bound) for bound in self.buckets] + ["+Inf"], counts)),
+                    "sum": total,
+                    "count": count,
+                }
+                for key, (counts, total, count) in self._series.items()
+            ]
+
+
+class _Timer:
+    """Context manager behind Histogram.time; a plain class is cheaper than @contextmanager."""
+
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+class MetricsRegistry:
+    """Holds every metric; metrics are created once and looked up by name afterwards."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._get_or_create(Counter, name, help_text, labelnames)
+
+    def histogram(self, name, help_text, buckets=LATENCY_BUCKETS, labelnames=()):
+        return self._get_or_create(Histogram, name, help_text, buckets, labelnames)
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self._get_or_create(Gauge, name, help_text, labelnames)
+
+    def render_prometheus(self):
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        """All metrics as plain data, for JSON dumps."""
+        return {
+            metric.name: {"type": metric.kind, "help": metric.help, "series": metric.snapshot()}
+            for metric in list(self._metrics.values())
+        }
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "recommendation_stage_seconds", "Wall time of each recommendation pipeline stage.", labelnames=("stage",))
+LLM_REQUEST_SECONDS = REGISTRY.histogram(
+    "llm_request_seconds", "Wall time of LLM calls.", labelnames=("mode",))
+LLM_TIME_TO_FIRST_TOKEN_SECONDS = REGISTRY.histogram(
+    "llm_time_to_first_token_seconds", "Time until the first streamed token arrives.")
+LLM_TOKENS = REGISTRY.histogram(
+    "llm_tokens", "Prompt and completion tokens per LLM call.", buckets=TOKEN_BUCKETS, labelnames=("kind",))
+LLM_REQUESTS = REGISTRY.counter(
+    "llm_requests_total", "LLM calls by mode and outcome.", labelnames=("mode", "outcome"))
+LLM_BACKEND_REQUESTS = REGISTRY.counter(
+    "llm_backend_requests_total", "Routed LLM calls by backend and outcome.", labelnames=("backend", "outcome"))
+LLM_BACKEND_SECONDS = REGISTRY.histogram(
+    "llm_backend_seconds", "Latency of successful routed LLM calls: full completion, or time to first chunk for streams.",
+    labelnames=("backend", "kind"))
+LLM_HEDGED_REQUESTS = REGISTRY.counter(
+    "llm_hedged_requests_total", "Calls that exceeded the hedge delay, by whether the second request was sent "
+    "or held back by the rate limiter.", labelnames=("outcome",))
+CACHE_LOOKUPS = REGISTRY.counter(
+    "recommendation_cache_lookups_total", "Recommendation cache lookups by result.", labelnames=("result",))
+LLM_COALESCED_REQUESTS = REGISTRY.counter(
+    "llm_coalesced_requests_total", "Requests that joined an identical in-flight LLM call.", labelnames=("mode",))
+LLM_RATE_LIMIT_QUEUE_DEPTH = REGISTRY.gauge(
+    "llm_rate_limit_queue_depth", "LLM calls waiting for the local rate limiter.")
+LLM_RATE_LIMIT_WAIT_SECONDS = REGISTRY.histogram(
+    "llm_rate_limit_wait_seconds", "Time LLM calls waited for the local rate limiter.")
+LLM_RATE_LIMIT_SHED = REGISTRY.counter(
+    "llm_rate_limit_shed_total", "LLM calls rejected by the local rate limiter, by reason.", labelnames=("reason",))
+
+
+def timed(stage):
+    """Context manager timing one pipeline stage into recommendation_stage_seconds."""
+    return STAGE_SECONDS.time(stage=stage)
+
+
+def record_llm_usage(usage):
+    """Record token counts from an OpenAI-style usage object or dict, if present."""
+    if usage is None:
+        return
+    for kind in ("prompt_tokens", "completion_tokens"):
+        tokens = usage.get(kind) if isinstance(usage, dict) else getattr(usage, kind, None)
+        if tokens is not None:
+            LLM_TOKENS.observe(tokens, kind=kind.split("_")[0])
+
+
+def dump_metrics(path=METRICS_DUMP_PATH):
+    """Write a JSON snapshot of every metric for offline analysis."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump({"timestamp": time.time(), "metrics": REGISTRY.snapshot()}, file, indent=2)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = REGISTRY.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port=METRICS_PORT, host="127.0.0.1"):
+    """Serve /metrics from a daemon thread; only the first call starts a server. Returns it."""
+    global _server
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, daemon=True).start()
+        return _server
+
+
+if METRICS_DUMP_PATH:
+    atexit.register(dump_metrics)
@@ -0,0 +1,119 @@
+"""Dependency-aware stage graph for the recommendation pipeline.
+
+Stages run on shared thread pools as soon as their dependencies are done, so the slow LLM call
+starts immediately and the local scoring stages run while it is in flight. Blocking I/O stages and
+CPU-light local stages have separate pools, so local stages never queue behind slow LLM calls.
+Results can be read as each stage finishes; a stage that exceeds its timeout (counted from when the
+run is submitted, so time queued for a thread or behind dependencies counts too) is reported as
+timed out without holding up the others (its thread finishes in the background, since Python
+threads cannot be cancelled).
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Callable, NamedTuple, Optional, Tuple
+
+from metrics import timed
+
+# Threads for stages that block on I/O (the LLM call), and for the local scoring stages
+PIPELINE_THREADS = int(os.environ.get("PIPELINE_THREADS", "32"))
+PIPELINE_LOCAL_THREADS = int(os.environ.get("PIPELINE_LOCAL_THREADS", str(os.cpu_count() or 4)))
+
+
+class Stage(NamedTuple):
+    """A pipeline step: `func` is called with the results of `deps` (inputs or other stages), in order.
+
+    `pool` is "io" for stages that block on the network and "local" for in-process computation.
+    """
+    name: str
+    func: Callable
+    deps: Tuple[str, ...] = ()
+    timeout: Optional[float] = None
+    pool: str = "local"
+
+
+class StageTimeoutError(TimeoutError):
+    """A stage did not finish within its timeout."""
+
+    def __init__(self, stage, timeout):
+        super().__init__(f"Stage '{stage}' did not finish within {timeout:g}s.")
+        self.stage = stage
+        self.timeout = timeout
+
+
+class StageGraph:
+    """A set of stages; start() runs them for one set of inputs."""
+
+    def __init__(self, stages):
+        self.stages = {}
+        names = {stage.name for stage in stages}
+        for stage in stages:
+            for dep in stage.deps:
+                if dep in names and dep not in self.stages:
+                    raise ValueError(f"Stage '{stage.name}' must come after its dependency '{dep}'.")
+            self.stages[stage.name] = stage
+
+    def start(self, inputs, executors, only=None):
+        """Submit every stage (or those named in `only`, plus what they depend on); returns a PipelineRun.
+
+        `executors` maps each stage pool name to the executor its stages are submitted to.
+
+        Stages are submitted in declaration order, so list slow, independent stages first.
+        """
+        wanted = set(self.stages if only is None else only)
+        for name in reversed(list(self.stages)):
+            if name in wanted:
+                wanted.update(dep for dep in self.stages[name].deps if dep in self.stages)
+
+        run = PipelineRun(self)
+        for name, stage in self.stages.items():
+            if name not in wanted:
+                continue
+            futures = {dep: run.futures[dep] for dep in stage.deps if dep in self.stages}
+            values = {dep: inputs[dep] for dep in stage.deps if dep not in self.stages}
+            run.futures[name] = executors[stage.pool].submit(_run_stage, stage, futures, values)
+        return run
+
+
+def _run_stage(stage, futures, values):
+    # Dependencies were submitted earlier, so waiting on them here cannot deadlock unless the pool is full
+    args = [futures[dep].result() if dep in futures else values[dep] for dep in stage.deps]
+    with timed(stage.name):
+        return stage.func(*args)
+
+
+class PipelineRun:
+    """Futures of one pipeline execution, with per-stage timeouts applied when reading results."""
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.futures = {}
+        self.submitted_at = time.monotonic()
+
+    def result(self, name):
+        """The stage's value; raises StageTimeoutError once its timeout has passed since the run was submitted.
+
+        The deadline is the caller's: time a stage spends queued for a thread or waiting on its
+        dependencies counts against it.
+        """
+        timeout = self.graph.stages[name].timeout
+        remaining = None if timeout is None else max(0.0, self.submitted_at + timeout - time.monotonic())
+        try:
+            return self.futures[name].result(timeout=remaining)
+        except FutureTimeout:
+            raise StageTimeoutError(name, timeout) from None
+
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def shared_executors():
+    """The process-wide stage thread pools by pool name, created on first use."""
+    with _executors_lock:
+        if not _executors:
+            _executors["io"] = ThreadPoolExecutor(max_workers=PIPELINE_THREADS, thread_name_prefix="pipeline-io")
+            _executors["local"] = ThreadPoolExecutor(
+                max_workers=PIPELINE_LOCAL_THREADS, thread_name_prefix="pipeline-local")
+        return _executors
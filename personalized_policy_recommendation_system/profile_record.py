@@ -0,0 +1,164 @@
+from enum import StrEnum
+from typing import NamedTuple
+
+
+class Gender(StrEnum):
+    MALE = "Male"
+    FEMALE = "Female"
+    OTHER = "Other"
+
+
+class MaritalStatus(StrEnum):
+    SINGLE = "Single"
+    MARRIED = "Married"
+    DIVORCED = "Divorced"
+    WIDOWED = "Widowed"
+
+
+class YesNo(StrEnum):
+    YES = "Yes"
+    NO = "No"
+
+
+class HealthStatus(StrEnum):
+    GOOD = "good"
+    FAIR = "fair"
+    POOR = "poor"
+
+
+# Label -> member lookups, built once so parsing is a single dict access
+_GENDERS = {member.value: member for member in Gender}
+_MARITAL_STATUSES = {member.value: member for member in MaritalStatus}
+_YES_NO = {member.value: member for member in YesNo}
+_HEALTH_STATUSES = {member.value: member for member in HealthStatus}
+
+MIN_AGE = 18
+MAX_AGE = 120
+
+
+class ProfileValidationError(ValueError):
+    """Raised when a raw profile field fails validation."""
+
+    def __init__(self, field, message):
+        super().__init__(f"{field}: {message}")
+        self.field = field
+
+
+class ProfileRecord(NamedTuple):
+    """Validated, immutable customer profile.
+
+    Field names match UserData so every consumer of UserData accepts a record. Categorical fields
+    are StrEnum members (they compare equal to their labels), and the comma-separated fields are
+    also kept pre-tokenized so downstream code never re-splits them.
+    """
+    age: int
+    gender: Gender
+    marital_status: MaritalStatus
+    smoking_status: YesNo
+    drinking_status: YesNo
+    chronic_conditions: str
+    annual_income: float
+    occupation: str
+    dependents: int
+    health_status: HealthStatus
+    family_health_history: str
+    chronic_condition_list: tuple
+    family_history_list: tuple
+
+
+# Positional constructor that skips NamedTuple keyword handling on the hot path
+_new_record = ProfileRecord._make
+
+
+def _invalid_choice(field, value, options):
+    return ProfileValidationError(field, f"must be one of {', '.join(options)}, got {value!r}.")
+
+
+def _integer(field, value):
+    if type(value) is int:
+        return value
+    if isinstance(value, bool):
+        raise ProfileValidationError(field, "must be an integer.")
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ProfileValidationError(field, f"must be an integer, got {value!r}.")
+    if not number.is_integer():
+        raise ProfileValidationError(field, f"must be an integer, got {value!r}.")
+    return int(number)
+
+
+def _text(field, value):
+    if value is None:
+        return ""
+    if not isinstance(value, str):
+        raise ProfileValidationError(field, "must be a string.")
+    return value
+
+
+def build_profile(age, gender, marital_status, smoking_status, drinking_status, chronic_conditions="",
+                  annual_income=None, occupation="", dependents=0, health_status=None,
+                  family_health_history="", **_ignored):
+    """Validate and normalize raw profile fields into a ProfileRecord in one pass.
+
+    Applies the same rules as UserData and utils.input_validation; unknown keyword
+    arguments (e.g. extra CSV columns) are ignored like UserData does. This runs once per
+    request, so the common case is kept to inline type checks and dict lookups.
+    """
+    if type(age) is not int:
+        age = _integer("age", age)
+    if not MIN_AGE <= age <= MAX_AGE:
+        raise ProfileValidationError("age", f"must be between {MIN_AGE} and {MAX_AGE}, got {age}.")
+
+    if type(annual_income) is not float:
+        try:
+            annual_income = float(annual_income)
+        except (TypeError, ValueError):
+            raise ProfileValidationError("annual_income", f"must be a number, got {annual_income!r}.")
+    if not annual_income > 0:
+        raise ProfileValidationError("annual_income", "must be positive.")
+
+    if type(dependents) is not int:
+        dependents = _integer("dependents", dependents)
+    if dependents < 0:
+        raise ProfileValidationError("dependents", "must not be negative.")
+
+    if type(chronic_conditions) is not str:
+        chronic_conditions = _text("chronic_conditions", chronic_conditions)
+    if type(family_health_history) is not str:
+        family_health_history = _text("family_health_history", family_health_history)
+    if type(occupation) is not str:
+        occupation = _text("occupation", occupation)
+
+    gender_member = _GENDERS.get(gender)
+    if gender_member is None:
+        raise _invalid_choice("gender", gender, _GENDERS)
+    marital_member = _MARITAL_STATUSES.get(marital_status)
+    if marital_member is None:
+        raise _invalid_choice("marital_status", marital_status, _MARITAL_STATUSES)
+    smoking_member = _YES_NO.get(smoking_status)
+    if smoking_member is None:
+        raise _invalid_choice("smoking_status", smoking_status, _YES_NO)
+    drinking_member = _YES_NO.get(drinking_status)
+    if drinking_member is None:
+        raise _invalid_choice("drinking_status", drinking_status, _YES_NO)
+    health_member = _HEALTH_STATUSES.get(health_status)
+    if health_member is None:
+        raise _invalid_choice("health_status", health_status, _HEALTH_STATUSES)
+
+    # Tokenize the comma-separated fields the same way the risk rules count them
+    return _new_record((
+        age,
+        gender_member,
+        marital_member,
+        smoking_member,
+        drinking_member,
+        chronic_conditions,
+        annual_income,
+        occupation,
+        dependents,
+        health_member,
+        family_health_history,
+        tuple(chronic_conditions.split(", ")) if chronic_conditions else (),
+        tuple(family_health_history.split(", ")) if family_health_history else (),
+    ))
@@ -0,0 +1,195 @@
+"""Persistent history of answered profiles: inputs, scores, model versions and LLM responses.
+
+    store = RecommendationStore("data/recommendations.sqlite")
+    store.record(profile, risk_score=6, explanations=[...], recommendations="...", customer_id="c-42")
+    page = store.history(customer_id="c-42", limit=20)
+    store.history(customer_id="c-42", cursor=page.next_cursor)
+
+Rows are indexed by profile hash, customer id and timestamp, so a customer's history, every answer
+for one profile, and time-range scans for analytics are index lookups. History pages use keyset
+pagination (newest first), so fetching page 500 costs the same as page 1. record_many inserts a
+batch run's results in one transaction.
+
+The store is opened from RECOMMENDATION_STORE_PATH by default_store(); other backends can be
+added by implementing the same record / record_many / latest / history methods.
+"""
+import functools
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import NamedTuple, Optional
+
+from config.cache_config import STORE_PATH
+from utils.response_cache import KEY_FIELDS, profile_hash
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS recommendations ("
+    "id INTEGER PRIMARY KEY, created_at REAL NOT NULL, customer_id TEXT, profile_hash TEXT NOT NULL, "
+    "profile TEXT NOT NULL, risk_score INTEGER, health_risk REAL, explanations TEXT, "
+    "model TEXT, model_version TEXT, prompt_scope TEXT, recommendations TEXT)",
+    "CREATE INDEX IF NOT EXISTS recommendations_profile ON recommendations (profile_hash, created_at, id)",
+    "CREATE INDEX IF NOT EXISTS recommendations_customer ON recommendations (customer_id, created_at, id)",
+    "CREATE INDEX IF NOT EXISTS recommendations_created ON recommendations (created_at, id)",
+)
+COLUMNS = (
+    "created_at", "customer_id", "profile_hash", "profile", "risk_score", "health_risk",
+    "explanations", "model", "model_version", "prompt_scope", "recommendations",
+)
+INSERT = f"INSERT INTO recommendations ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+SELECT = f"SELECT id, {', '.join(COLUMNS)} FROM recommendations"
+
+
+class StoredRecommendation(NamedTuple):
+    """One stored answer; `profile` is the dict of UserData fields it was given for."""
+    id: int
+    created_at: float
+    customer_id: Optional[str]
+    profile_hash: str
+    profile: dict
+    risk_score: Optional[int]
+    health_risk: Optional[float]
+    explanations: list
+    model: Optional[str]
+    model_version: Optional[str]
+    prompt_scope: Optional[str]
+    recommendations: Optional[str]
+
+
+class HistoryPage(NamedTuple):
+    """One page of history, newest first; pass next_cursor back for the next page (None at the end)."""
+    records: list
+    next_cursor: Optional[str]
+
+
+def _row(user_data, risk_score=None, explanations=(), recommendations=None, customer_id=None,
+         health_risk=None, model=None, model_version=None, prompt_scope=None, created_at=None):
+    profile = {field: getattr(user_data, field) for field in KEY_FIELDS}
+    return (
+        time.time() if created_at is None else created_at,
+        customer_id,
+        profile_hash(user_data),
+        json.dumps(profile),
+        None if risk_score is None else int(risk_score),
+        None if health_risk is None else float(health_risk),
+        json.dumps(list(explanations)),
+        model,
+        model_version,
+        prompt_scope,
+        recommendations,
+    )
+
+
+def _record(row):
+    values = list(row)
+    values[4] = json.loads(values[4])
+    values[7] = json.loads(values[7]) if values[7] else []
+    return StoredRecommendation(*values)
+
+
+class RecommendationStore:
+    """SQLite-backed store; safe to share between threads."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        for statement in SCHEMA:
+            self._conn.execute(statement)
+
+    def record(self, user_data, **fields) -> int:
+        """Store one answer; `fields` are the StoredRecommendation columns after `profile`. Returns its id."""
+        row = _row(user_data, **fields)
+        with self._lock:
+            return self._conn.execute(INSERT, row).lastrowid
+
+    def record_many(self, entries) -> int:
+        """Store (user_data, fields) pairs in a single transaction; returns how many were written."""
+        rows = [_row(user_data, **fields) for user_data, fields in entries]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(INSERT, rows)
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+        return len(rows)
+
+    def latest(self, user_data, model=None, prompt_scope=None, max_age=None):
+        """Newest stored answer for an equivalent profile (optionally same model and prompt), or None."""
+        clauses, params = ["profile_hash = ?"], [profile_hash(user_data)]
+        if model is not None:
+            clauses.append("model = ?")
+            params.append(model)
+        if prompt_scope is not None:
+            clauses.append("prompt_scope = ?")
+            params.append(prompt_scope)
+        if max_age is not None:
+            clauses.append("created_at >= ?")
+            params.append(time.time() - max_age)
+        query = f"{SELECT} WHERE {' AND '.join(clauses)} ORDER BY created_at DESC, id DESC LIMIT 1"
+        with self._lock:
+            row = self._conn.execute(query, params).fetchone()
+        return _record(row) if row else None
+
+    def history(self, customer_id=None, user_data=None, since=None, until=None, limit=50, cursor=None):
+        """A page of stored answers, newest first, filtered by customer, profile and time range."""
+        clauses, params = [], []
+        if customer_id is not None:
+            clauses.append("customer_id = ?")
+            params.append(customer_id)
+        if user_data is not None:
+            clauses.append("profile_hash = ?")
+            params.append(profile_hash(user_data))
+        if since is not None:
+            clauses.append("created_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("created_at < ?")
+            params.append(until)
+        if cursor is not None:
+            created_at, row_id = cursor.split(":")
+            clauses.append("(created_at, id) < (?, ?)")
+            params.extend((float(created_at), int(row_id)))
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        # One extra row tells whether another page follows
+        query = f"{SELECT}{where} ORDER BY created_at DESC, id DESC LIMIT ?"
+        with self._lock:
+            rows = self._conn.execute(query, params + [limit + 1]).fetchall()
+        records = [_record(row) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            last = records[-1]
+            next_cursor = f"{last.created_at!r}:{last.id}"
+        return HistoryPage(records, next_cursor)
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM recommendations").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+@functools.lru_cache(maxsize=1)
+def default_store():
+    """The process-wide store at RECOMMENDATION_STORE_PATH, or None when it is not configured."""
+    return RecommendationStore(STORE_PATH) if STORE_PATH else None
+
+
+def scoring_model_version():
+    """Version label of the risk rules and health-risk model the scores come from."""
+    from risk_model import load_default_model
+    from risk_rules import active_rules
+
+    model = load_default_model()
+    health = f"health_risk_v{model.version}" if model is not None else "placeholder"
+    return f"rules_v{active_rules().version}+{health}"
@@ -0,0 +1,168 @@
+"""Render recommendation reports to in-memory text and PDF bytes.
+
+Nothing is written to disk: the app hands the bytes straight to st.download_button. The
+DejaVuSans font is parsed once per process and its metrics are reused by every document.
+For mailing runs, render a batch_recommend.py results file into a directory of reports
+across worker processes:
+
+    python report_export.py results.jsonl reports/ --format pdf --workers 8
+"""
+import argparse
+import collections
+import functools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import fpdf
+from fpdf import FPDF
+
+FONT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "DejaVuSans.ttf")
+FONT_FAMILY = "DejaVu"
+FALLBACK_FONT_FAMILY = "Arial"
+FONT_SIZE = 12
+LINE_HEIGHT = 7
+
+# Fonts are parsed once per process below, so fpdf's on-disk .pkl metrics cache is not needed
+fpdf.set_global("FPDF_CACHE_MODE", 1)
+
+
+def font_available() -> bool:
+    """Whether the bundled Unicode font exists; without it PDFs fall back to Arial (Latin-1 only)."""
+    return os.path.exists(FONT_PATH)
+
+
+@functools.lru_cache(maxsize=1)
+def _parsed_font():
+    """Register the TTF font on a scratch document once and keep its parsed entries for reuse."""
+    if not font_available():
+        return None
+    scratch = FPDF()
+    scratch.add_font(FONT_FAMILY, "", FONT_PATH, uni=True)
+    fontkey = FONT_FAMILY.lower()
+    return fontkey, scratch.fonts[fontkey], dict(scratch.font_files)
+
+
+def _new_document():
+    """A blank PDF with the cached font registered and the report layout applied."""
+    pdf = FPDF()
+    parsed = _parsed_font()
+    if parsed:
+        fontkey, font, font_files = parsed
+        # Share the parsed glyph widths; each document tracks its own glyph subset
+        pdf.fonts[fontkey] = dict(font, i=len(pdf.fonts) + 1, subset=list(font["subset"]))
+        pdf.font_files.update(font_files)
+        family = FONT_FAMILY
+    else:
+        family = FALLBACK_FONT_FAMILY
+
+    # Adjust margins and ensure maximum width is used
+    pdf.set_left_margin(5)
+    pdf.set_right_margin(5)
+    pdf.set_auto_page_break(auto=True, margin=10)
+    pdf.add_page()
+    pdf.set_font(family, "", FONT_SIZE)
+    return pdf, parsed is not None
+
+
+def render_text(recommendations: str, risk_score) -> bytes:
+    """Plain-text report as UTF-8 bytes."""
+    return f"{recommendations}\nRisk Score: {risk_score}".encode("utf-8")
+
+
+def render_pdf(recommendations: str, risk_score) -> bytes:
+    """PDF report as bytes; long lines wrap to the page width."""
+    pdf, unicode_font = _new_document()
+    lines = [line for line in recommendations.splitlines() if line.strip()]
+    lines.append(f"Risk Score: {risk_score}")
+    for line in lines:
+        if not unicode_font:
+            # The core fonts only cover Latin-1
+            line = line.encode("latin-1", "replace").decode("latin-1")
+        pdf.multi_cell(0, LINE_HEIGHT, line)
+    # fpdf 1.x returns the document as a Latin-1 str
+    return pdf.output(dest="S").encode("latin-1")
+
+
+RENDERERS = {"pdf": render_pdf, "txt": render_text}
+
+
+def _render_report(args):
+    fmt, recommendations, risk_score = args
+    return RENDERERS[fmt](recommendations, risk_score)
+
+
+def _warm_worker():
+    """Parse the font as each worker starts instead of on its first report."""
+    _parsed_font()
+
+
+def render_many(reports, fmt="pdf", workers=None, chunksize=16):
+    """Render (recommendations, risk_score) pairs in worker processes, yielding bytes in input order.
+
+    Reports are submitted a window at a time, so memory stays bounded for any number of reports.
+    """
+    workers = workers or os.cpu_count() or 1
+    window = workers * chunksize * 4
+    reports = iter(reports)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_warm_worker) as executor:
+        while True:
+            batch = [(fmt, recommendations, risk_score) for recommendations, risk_score in _take(reports, window)]
+            if not batch:
+                return
+            yield from executor.map(_render_report, batch, chunksize=chunksize)
+
+
+def _take(iterator, count):
+    for _ in range(count):
+        try:
+            yield next(iterator)
+        except StopIteration:
+            return
+
+
+def _iter_results(path):
+    """(row, recommendations, risk_score) for each successful row of a batch_recommend.py results file."""
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            result = json.loads(line)
+            if result.get("status") == "ok" and result.get("recommendations"):
+                yield result["row"], result["recommendations"], result["risk_score"]
+
+
+def export_reports(results_path, output_dir, fmt="pdf", workers=None):
+    """Render each successful row of a results file to output_dir/report_<row>.<fmt>; returns the count.
+
+    Every report is written as soon as it is rendered. Only the row ids of reports still in flight
+    are held, so memory stays bounded however long the results file is.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    pending_rows = collections.deque()
+
+    def reports():
+        for row, recommendations, risk_score in _iter_results(results_path):
+            pending_rows.append(row)
+            yield recommendations, risk_score
+
+    count = 0
+    for document in render_many(reports(), fmt, workers):
+        with open(os.path.join(output_dir, f"report_{pending_rows.popleft()}.{fmt}"), "wb") as file:
+            file.write(document)
+        count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render batch recommendation results into report files.")
+    parser.add_argument("results", help="JSONL output of batch_recommend.py")
+    parser.add_argument("output_dir")
+    parser.add_argument("--format", choices=sorted(RENDERERS), default="pdf")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    count = export_reports(args.results, args.output_dir, args.format, args.workers)
+    print(f"Rendered {count} reports into {args.output_dir}.")
+
+
+if __name__ == "__main__":
+    main()
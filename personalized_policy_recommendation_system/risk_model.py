@@ -0,0 +1,157 @@
+import functools
+import glob
+import json
+import os
+import re
+
+import numpy as np
+
+# Versioned model artifacts written by train_risk_model.py
+MODEL_DIR = os.environ.get("HEALTH_RISK_MODEL_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "models"))
+ARTIFACT_PATTERN = "health_risk_v*.json"
+
+# Profile fields the model reads, and the features derived from them
+MODEL_FIELDS = (
+    "age",
+    "smoking_status",
+    "drinking_status",
+    "chronic_conditions",
+    "health_status",
+    "family_health_history",
+    "dependents",
+)
+FEATURE_NAMES = (
+    "age",
+    "smoker",
+    "drinker",
+    "chronic_condition_count",
+    "health_fair",
+    "health_poor",
+    "family_history_count",
+    "dependents",
+)
+
+
+# Comma-separated fields and the precomputed count columns that can stand in for them
+COUNT_COLUMNS = {
+    "chronic_conditions": "chronic_condition_count",
+    "family_health_history": "family_history_count",
+}
+
+
+def count_list_items(text_column):
+    """Number of ", "-separated items per row; empty strings count as none."""
+    text = np.asarray(text_column, dtype=str)
+    counts = np.char.count(text, ", ") + 1
+    return np.where(np.char.str_len(text) > 0, counts, 0)
+
+
+def list_item_counts(columns, field):
+    """Item counts for a comma-separated field, from its count column when one was precomputed."""
+    counts = columns.get(COUNT_COLUMNS[field])
+    return counts if counts is not None else count_list_items(columns[field])
+
+
+def featurize(columns):
+    """Build the (rows, features) float matrix from a dict of profile columns."""
+    health_status = np.asarray(columns["health_status"])
+    return np.column_stack([
+        np.asarray(columns["age"], dtype=np.float64),
+        np.asarray(columns["smoking_status"]) == "Yes",
+        np.asarray(columns["drinking_status"]) == "Yes",
+        list_item_counts(columns, "chronic_conditions"),
+        health_status == "fair",
+        health_status == "poor",
+        list_item_counts(columns, "family_health_history"),
+        np.asarray(columns["dependents"], dtype=np.float64),
+    ]).astype(np.float64)
+
+
+class HealthRiskModel:
+    """Standardized logistic regression evaluated with plain NumPy.
+
+    Holds only the exported coefficients, so loading and scoring never import scikit-learn.
+    """
+
+    def __init__(self, coefficients, intercept, mean, scale, version, feature_names=FEATURE_NAMES, metadata=None):
+        if tuple(feature_names) != FEATURE_NAMES:
+            raise ValueError(f"Model features {tuple(feature_names)} do not match {FEATURE_NAMES}.")
+        # Fold standardization into the weights: w . ((x - mean) / scale) + b == (w / scale) . x + b'
+        coefficients = np.asarray(coefficients, dtype=np.float64)
+        mean = np.asarray(mean, dtype=np.float64)
+        scale = np.asarray(scale, dtype=np.float64)
+        self.weights = coefficients / scale
+        self.bias = float(intercept) - float(np.dot(self.weights, mean))
+        self.coefficients = coefficients
+        self.intercept = float(intercept)
+        self.mean = mean
+        self.scale = scale
+        self.version = version
+        self.feature_names = tuple(feature_names)
+        self.metadata = metadata or {}
+
+    def predict_features(self, features):
+        """Probability of high health risk for each row of a feature matrix."""
+        # Row-wise sum rather than a BLAS matmul, so a row scores identically alone or in a batch
+        logits = (features * self.weights).sum(axis=1) + self.bias
+        return 1.0 / (1.0 + np.exp(-logits))
+
+    def predict_batch(self, columns):
+        """Probabilities for a dict of profile columns."""
+        return self.predict_features(featurize(columns))
+
+    def predict(self, profile):
+        """Probability for a single UserData-like profile."""
+        columns = {field: [getattr(profile, field)] for field in MODEL_FIELDS}
+        return float(self.predict_batch(columns)[0])
+
+    def to_dict(self):
+        return {
+            "version": self.version,
+            "feature_names": list(self.feature_names),
+            "coefficients": self.coefficients.tolist(),
+            "intercept": self.intercept,
+            "mean": self.mean.tolist(),
+            "scale": self.scale.tolist(),
+            "metadata": self.metadata,
+        }
+
+    def save(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.to_dict(), file, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as file:
+            artifact = json.load(file)
+        return cls(
+            coefficients=artifact["coefficients"],
+            intercept=artifact["intercept"],
+            mean=artifact["mean"],
+            scale=artifact["scale"],
+            version=artifact["version"],
+            feature_names=artifact["feature_names"],
+            metadata=artifact.get("metadata"),
+        )
+
+
+def artifact_version(path):
+    """Version number encoded in an artifact file name, e.g. health_risk_v3.json -> 3."""
+    match = re.search(r"_v(\d+)\.json$", path)
+    return int(match.group(1)) if match else -1
+
+
+def latest_artifact(model_dir=MODEL_DIR):
+    """Path of the highest-versioned artifact in model_dir, or None."""
+    paths = glob.glob(os.path.join(model_dir, ARTIFACT_PATTERN))
+    return max(paths, key=artifact_version) if paths else None
+
+
+@functools.lru_cache(maxsize=1)
+def load_default_model():
+    """Load the latest artifact once per process; None when no model has been trained yet."""
+    path = latest_artifact()
+    return HealthRiskModel.load(path) if path else None
@@ -0,0 +1,405 @@
+"""Risk-score rules loaded from a versioned config file and compiled into lookup tables.
+
+Each rule tests one profile field and, when it holds, adds `points` (plus `points_per_item` times
+the field's value, for integer and list fields) to the risk score; rules with an `explanation`
+also set that explanation's bit, in rule order. See config/risk_rules.json.
+
+Because every rule reads a single field, compile_rules folds all rules on a field into one table:
+label fields map each label to (points, explanation bits), integer fields (age, dependents and
+list item counts) index a table over the values that can change a rule's outcome, and income
+rules are evaluated with NumPy comparisons. RuleSet.evaluate returns scores and explanation codes
+for a batch in one pass. For one profile at a time, the rules are also compiled into a single
+generated function of straight-line comparisons, as fast as the hand-written if-chains they
+replaced; RuleSet.evaluate_record and assess_record call it.
+
+active_rules() re-reads RISK_RULES_PATH when its modification time changes (checked at most every
+RISK_RULES_CHECK_INTERVAL seconds), so edited rules apply without a restart. A file that fails to
+load is logged and the previous rules stay in effect.
+"""
+import json
+import operator
+import os
+import threading
+import time
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from logger import log_exception, log_info
+from profile_record import MIN_AGE, Gender, HealthStatus, MaritalStatus, YesNo
+from risk_model import COUNT_COLUMNS, list_item_counts
+
+RISK_RULES_PATH = os.environ.get(
+    "RISK_RULES_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "config", "risk_rules.json")
+)
+RISK_RULES_CHECK_INTERVAL = float(os.environ.get("RISK_RULES_CHECK_INTERVAL", "2"))
+
+OPERATORS = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "==": operator.eq,
+    "!=": operator.ne,
+    "in": lambda value, options: value in options,
+    "not in": lambda value, options: value not in options,
+}
+LABEL_OPERATORS = ("==", "!=", "in", "not in")
+
+# Fields compared by label, with the labels they can take where that set is fixed
+LABEL_FIELDS = {
+    "gender": Gender,
+    "marital_status": MaritalStatus,
+    "smoking_status": YesNo,
+    "drinking_status": YesNo,
+    "health_status": HealthStatus,
+    "occupation": None,
+}
+# Integer fields and their lowest valid value; list fields are compared by item count
+INTEGER_FIELDS = {"age": MIN_AGE, "dependents": 0, "chronic_conditions": 0, "family_health_history": 0}
+NUMERIC_FIELDS = ("annual_income",)
+# ProfileRecord attribute holding the pre-tokenized items of each list field
+LIST_ITEMS = {"chronic_conditions": "chronic_condition_list", "family_health_history": "family_history_list"}
+
+
+class RuleSetError(ValueError):
+    """Raised when a rule file is malformed."""
+
+
+class Rule(NamedTuple):
+    name: str
+    field: str
+    op: str
+    value: object
+    points: int = 0
+    points_per_item: int = 0
+    explanation: Optional[str] = None
+
+    def holds(self, value) -> bool:
+        return OPERATORS[self.op](value, self.value)
+
+
+def _rule_values(rule):
+    return list(rule.value) if rule.op in ("in", "not in") else [rule.value]
+
+
+class _Labels(dict):
+    """Label -> entry dict whose misses return the entry for labels no rule names."""
+
+    def __init__(self, entries, other):
+        super().__init__(entries)
+        self.other = other
+
+    def __missing__(self, label):
+        return self.other
+
+
+class _LabelTable:
+    """Label -> (points, explanation bits), with one entry for labels no rule names."""
+
+    def __init__(self, field, rules, flags):
+        self.field = field
+        labels = {value for rule in rules for value in _rule_values(rule)}
+        if LABEL_FIELDS[field] is not None:
+            labels.update(member.value for member in LABEL_FIELDS[field])
+        self.labels = np.array(sorted(labels))
+        entries = [self._entry(label, rules, flags) for label in sorted(labels)]
+        self.other = self._entry(None, rules, flags)
+        self.table = _Labels(zip(sorted(labels), entries), self.other)
+        self.lookup = self.table.__getitem__
+        self.points = np.array([points for points, _ in entries] + [self.other[0]], dtype=np.int64)
+        self.codes = np.array([code for _, code in entries] + [self.other[1]], dtype=np.int64)
+
+    @staticmethod
+    def _entry(label, rules, flags):
+        hits = [rule for rule in rules if rule.holds(label)]
+        return sum(rule.points for rule in hits), sum(flags[rule.name] for rule in hits)
+
+    def evaluate(self, columns):
+        column = np.asarray(columns[self.field])
+        if column.dtype.kind != "U":
+            column = column.astype(str)
+        index = np.minimum(np.searchsorted(self.labels, column), len(self.labels) - 1)
+        index = np.where(self.labels[index] == column, index, len(self.labels))
+        return self.points[index], self.codes[index]
+
+
+class _IntegerTable:
+    """Points and explanation bits per value, over the range where some rule's outcome can change.
+
+    Values above the largest threshold all behave like the last entry, so they are clipped to it;
+    points_per_item is kept separately and multiplied by the unclipped value.
+    """
+
+    def __init__(self, field, rules, flags):
+        self.field = field
+        self.lowest = INTEGER_FIELDS[field]
+        self.highest = max(self.lowest, max(value for rule in rules for value in _rule_values(rule)) + 1)
+        domain = range(self.lowest, self.highest + 1)
+        hits = [[rule for rule in rules if rule.holds(value)] for value in domain]
+        self.fixed = np.array([sum(rule.points for rule in hit) for hit in hits], dtype=np.int64)
+        self.per_item = np.array([sum(rule.points_per_item for rule in hit) for hit in hits], dtype=np.int64)
+        self.codes = np.array([sum(flags[rule.name] for rule in hit) for hit in hits], dtype=np.int64)
+        self._fixed, self._per_item, self._codes = self.fixed.tolist(), self.per_item.tolist(), self.codes.tolist()
+
+    def evaluate(self, columns):
+        if self.field in COUNT_COLUMNS:
+            values = np.asarray(list_item_counts(columns, self.field), dtype=np.int64)
+        else:
+            values = np.asarray(columns[self.field], dtype=np.int64)
+        index = np.clip(values, self.lowest, self.highest) - self.lowest
+        return self.fixed[index] + values * self.per_item[index], self.codes[index]
+
+    def lookup(self, value):
+        index = min(max(value, self.lowest), self.highest) - self.lowest
+        return self._fixed[index] + value * self._per_item[index], self._codes[index]
+
+
+class _NumericRules:
+    """Rules on a continuous field, evaluated with NumPy comparisons."""
+
+    def __init__(self, field, rules, flags):
+        self.field = field
+        self.rules = [(rule, flags[rule.name]) for rule in rules]
+
+    def evaluate(self, columns):
+        values = np.asarray(columns[self.field], dtype=np.float64)
+        points = np.zeros(len(values), dtype=np.int64)
+        codes = np.zeros(len(values), dtype=np.int64)
+        for rule, flag in self.rules:
+            hit = np.isin(values, rule.value, invert=rule.op == "not in") if rule.op in ("in", "not in") else rule.holds(values)
+            points += rule.points * hit
+            codes |= flag * hit
+        return points, codes
+
+    def lookup(self, value):
+        hits = [(rule, flag) for rule, flag in self.rules if rule.holds(value)]
+        return sum(rule.points for rule, _ in hits), sum(flag for _, flag in hits)
+
+
+def _table_class(field):
+    if field in LABEL_FIELDS:
+        return _LabelTable
+    if field in INTEGER_FIELDS:
+        return _IntegerTable
+    return _NumericRules
+
+
+class RuleSet:
+    """A compiled rule set: one lookup table per field the rules read.
+
+    evaluate_record(profile) gives (risk score, explanation bitmask) and assess_record(profile)
+    (risk score, explanation sentences) for one UserData-like profile.
+    """
+
+    def __init__(self, version, rules):
+        self.version = version
+        self.rules = tuple(rules)
+        explained = [rule for rule in self.rules if rule.explanation]
+        flags = {rule.name: 0 for rule in self.rules}
+        flags.update({rule.name: 1 << bit for bit, rule in enumerate(explained)})
+        self.explanations = tuple((flags[rule.name], rule.explanation) for rule in explained)
+
+        by_field = {}
+        for rule in self.rules:
+            by_field.setdefault(rule.field, []).append(rule)
+        self.tables = {field: _table_class(field)(field, field_rules, flags) for field, field_rules in by_field.items()}
+        # Columns batch_scoring.to_columns must provide
+        self.fields = tuple(self.tables)
+        self._record_lookups = [(_record_getter(field), table.lookup) for field, table in self.tables.items()]
+        # (score, bitmask) and (score, sentences) for one profile, as generated straight-line code
+        self.evaluate_record = _record_function(self.rules, flags)
+        self.assess_record = _record_function(self.rules, flags, explain=True)
+        self._decoded = {}
+
+    def evaluate(self, columns):
+        """Risk scores and explanation bitmasks for a dict of columns, in one pass over the tables."""
+        scores = codes = 0
+        for table in self.tables.values():
+            points, bits = table.evaluate(columns)
+            scores = scores + points
+            codes = codes | bits
+        return np.asarray(scores, dtype=np.int64), np.asarray(codes, dtype=np.int64)
+
+    def signature(self, profile):
+        """Which side of every rule threshold a profile falls on, as (points, bitmask) per field.
+
+        Profiles with equal signatures get the same points from every rule.
+        """
+        return tuple(lookup(get(profile)) for get, lookup in self._record_lookups)
+
+    def field_points(self, field, value) -> int:
+        """Points the rules on `field` give `value` (a label, an integer or an item count)."""
+        table = self.tables.get(field)
+        return table.lookup(value)[0] if table is not None else 0
+
+    def decode(self, code):
+        """Explanation sentences for a bitmask, in rule order."""
+        code = int(code)
+        texts = self._decoded.get(code)
+        if texts is None:
+            texts = self._decoded[code] = tuple(text for flag, text in self.explanations if code & flag)
+        return list(texts)
+
+
+def _record_getter(field):
+    """Function reading a field's rule input (an item count for list fields) from one profile."""
+    if field not in LIST_ITEMS:
+        return operator.attrgetter(field)
+    attribute = LIST_ITEMS[field]
+
+    def count(profile):
+        items = getattr(profile, attribute, None)
+        if items is None:
+            text = getattr(profile, field)
+            items = text.split(", ") if text else ()
+        return len(items)
+    return count
+
+
+def _record_function(rules, flags, explain=False):
+    """Compile the rules into one function of straight-line comparisons for a single profile.
+
+    The function returns (risk score, explanation bitmask), or with `explain` (risk score,
+    explanation sentences). Rules are tested in file order, so sentences come out in the order
+    decode gives them. Field names and operators are the validated ones of _parse_rule and rule
+    values are bound as constants, so no text from the rule file is evaluated. List fields read the
+    pre-tokenized ProfileRecord attribute and fall back to splitting the text (e.g. for UserData).
+    """
+    constants = {}
+    lines = ["def evaluate_record(profile):", "    score = 0", "    explanations = []" if explain else "    code = 0"]
+    field = None
+    for index, rule in enumerate(rules):
+        if rule.field != field:
+            field = rule.field
+            if field in LIST_ITEMS:
+                constants[f"count_{field}"] = _record_getter(field)
+                lines += [
+                    "    try:",
+                    f"        value = len(profile.{LIST_ITEMS[field]})",
+                    "    except AttributeError:",
+                    f"        value = count_{field}(profile)",
+                ]
+            else:
+                lines.append(f"    value = profile.{field}")
+        constants[f"value_{index}"] = frozenset(rule.value) if rule.op in ("in", "not in") else rule.value
+        body = []
+        if rule.points:
+            body.append(f"score += {rule.points}")
+        if rule.points_per_item:
+            body.append(f"score += {rule.points_per_item} * value")
+        if explain and rule.explanation:
+            constants[f"explanation_{index}"] = rule.explanation
+            body.append(f"explanations.append(explanation_{index})")
+        elif not explain and flags[rule.name]:
+            body.append(f"code |= {flags[rule.name]}")
+        if body:
+            lines.append(f"    if value {rule.op} value_{index}:")
+            lines += [f"        {statement}" for statement in body]
+    lines.append("    return score, explanations" if explain else "    return score, code")
+    exec(compile("\n".join(lines), "<risk rules>", "exec"), constants)
+    return constants["evaluate_record"]
+
+
+def _parse_rule(entry):
+    try:
+        rule = Rule(
+            name=str(entry["name"]),
+            field=entry["field"],
+            op=entry["op"],
+            value=entry["value"],
+            points=entry.get("points", 0),
+            points_per_item=entry.get("points_per_item", 0),
+            explanation=entry.get("explanation"),
+        )
+    except (KeyError, TypeError, AttributeError) as e:
+        raise RuleSetError(f"Rule {entry!r} is missing {e}.") from e
+
+    if rule.field not in LABEL_FIELDS and rule.field not in INTEGER_FIELDS and rule.field not in NUMERIC_FIELDS:
+        raise RuleSetError(f"Rule '{rule.name}': unknown field '{rule.field}'.")
+    if rule.op not in OPERATORS:
+        raise RuleSetError(f"Rule '{rule.name}': unknown operator '{rule.op}'; expected one of {', '.join(OPERATORS)}.")
+    if rule.field in LABEL_FIELDS and rule.op not in LABEL_OPERATORS:
+        raise RuleSetError(f"Rule '{rule.name}': {rule.field} is compared with {', '.join(LABEL_OPERATORS)} only.")
+    if rule.op in ("in", "not in") and not (isinstance(rule.value, list) and rule.value):
+        raise RuleSetError(f"Rule '{rule.name}': '{rule.op}' needs a non-empty list value.")
+    if rule.field in INTEGER_FIELDS and not all(type(value) is int for value in _rule_values(rule)):
+        raise RuleSetError(f"Rule '{rule.name}': {rule.field} is compared with integers.")
+    if type(rule.points) is not int or type(rule.points_per_item) is not int:
+        raise RuleSetError(f"Rule '{rule.name}': points must be integers.")
+    if rule.points_per_item and rule.field not in INTEGER_FIELDS:
+        raise RuleSetError(f"Rule '{rule.name}': points_per_item applies to integer and list fields only.")
+    return rule
+
+
+def compile_rules(document) -> RuleSet:
+    """Validate a parsed rule document ({"version": ..., "rules": [...]}) and compile it."""
+    if not isinstance(document, dict) or "version" not in document or not document.get("rules"):
+        raise RuleSetError("A rule file needs a version and a non-empty list of rules.")
+    rules = [_parse_rule(entry) for entry in document["rules"]]
+    names = [rule.name for rule in rules]
+    if len(set(names)) != len(names):
+        raise RuleSetError("Rule names must be unique.")
+    if sum(bool(rule.explanation) for rule in rules) > 62:
+        raise RuleSetError("At most 62 rules can carry an explanation.")
+    return RuleSet(document["version"], rules)
+
+
+def load_rules(path) -> RuleSet:
+    """Read and compile a JSON (or, with PyYAML installed, YAML) rule file."""
+    with open(path, encoding="utf-8") as file:
+        if path.endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                raise RuleSetError("PyYAML is required to read YAML rule files.") from None
+            document = yaml.safe_load(file)
+        else:
+            document = json.load(file)
+    return compile_rules(document)
+
+
+class RuleFile:
+    """The compiled rules of a file, recompiled when the file changes."""
+
+    def __init__(self, path, check_interval=RISK_RULES_CHECK_INTERVAL):
+        self.path = path
+        self.check_interval = check_interval
+        self._rules = None
+        self._stamp = None
+        self._next_check = float("-inf")
+        self._lock = threading.Lock()
+
+    def current(self) -> RuleSet:
+        """The latest rules that loaded successfully; the first load's errors propagate."""
+        if time.monotonic() < self._next_check:
+            return self._rules
+        with self._lock:
+            now = time.monotonic()
+            if now < self._next_check:
+                return self._rules
+            self._next_check = now + self.check_interval
+            try:
+                status = os.stat(self.path)
+                stamp = (status.st_mtime_ns, status.st_size)
+                if stamp != self._stamp:
+                    self._stamp = stamp
+                    rules = load_rules(self.path)
+                    log_info("Loaded risk rules version %s from %s.", rules.version, self.path)
+                    self._rules = rules
+            except Exception:
+                if self._rules is None:
+                    # Nothing to fall back on: retry on the next call
+                    self._stamp = None
+                    self._next_check = float("-inf")
+                    raise
+                log_exception("Failed to reload risk rules from %s; keeping version %s.", self.path, self._rules.version)
+            return self._rules
+
+
+_rule_file = RuleFile(RISK_RULES_PATH)
+
+
+def active_rules() -> RuleSet:
+    """The rule set from RISK_RULES_PATH, reloaded when the file changes."""
+    return _rule_file.current()
@@ -0,0 +1,66 @@
+import os
+import sys
+
+import pytest
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PACKAGE_DIR)
+
+# Settings are read at import time: keep the tests off shared caches, stores and limits
+os.environ["RECOMMENDATION_CACHE_ENABLED"] = "0"
+os.environ["RECOMMENDATION_SIMILARITY_ENABLED"] = "0"
+for name in ("RECOMMENDATION_CACHE_DB_PATH", "RECOMMENDATION_STORE_PATH", "LLM_RATE_LIMIT_RPM",
+             "LLM_RATE_LIMIT_TPM", "LLM_BACKENDS", "RISK_RULES_PATH"):
+    os.environ.pop(name, None)
+
+from utils.stub_llm_server import StubLLMServer  # noqa: E402
+
+
+@pytest.fixture
+def stub_server():
+    """Factory for stub LLM servers that are stopped after the test."""
+    servers = []
+
+    def start(**options):
+        server = StubLLMServer(**options)
+        server.start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+@pytest.fixture
+def stub_llm(stub_server, monkeypatch):
+    """Factory that starts a stub server and points llm_controller's model client at it."""
+    import llm_controller
+    from config.llm_config import create_openai_client
+
+    def start(**options):
+        server = stub_server(**options)
+        client = create_openai_client(server.base_url)
+        monkeypatch.setattr(llm_controller, "clients", {llm_controller.MODEL_NAME: client})
+        return server
+
+    return start
+
+
+@pytest.fixture
+def profile():
+    from profile_record import build_profile
+
+    return build_profile(
+        age=45,
+        gender="Female",
+        marital_status="Married",
+        smoking_status="No",
+        drinking_status="Yes",
+        chronic_conditions="diabetes",
+        annual_income=85_000.0,
+        occupation="Teacher",
+        dependents=2,
+        health_status="fair",
+        family_health_history="heart disease",
+    )
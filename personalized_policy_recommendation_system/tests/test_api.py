@@ -0,0 +1,111 @@
+import functools
+
+import pytest
+
+pytest.importorskip("fastapi")
+from fastapi.testclient import TestClient  # noqa: E402
+
+import api  # noqa: E402
+import controller  # noqa: E402
+from async_llm_client import AsyncRecommendationClient  # noqa: E402
+from recommendation_store import RecommendationStore  # noqa: E402
+from utils.response_cache import MemoryCache  # noqa: E402
+from utils.stub_llm_server import DEFAULT_REPLY  # noqa: E402
+
+PROFILE = {
+    "age": 45, "gender": "Female", "marital_status": "Married", "smoking_status": "No",
+    "drinking_status": "Yes", "chronic_conditions": "diabetes", "annual_income": 85000,
+    "occupation": "Teacher", "dependents": 2, "health_status": "fair", "family_health_history": "heart disease",
+}
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = RecommendationStore(str(tmp_path / "history.db"))
+    monkeypatch.setattr(controller, "default_store", lambda: store)
+    monkeypatch.setattr(api, "default_store", lambda: store)
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def client(stub_llm, monkeypatch):
+    """An API client whose sync and async LLM clients both talk to one stub server."""
+    server = stub_llm()
+    monkeypatch.setattr(api, "AsyncRecommendationClient", functools.partial(
+        AsyncRecommendationClient, base_url=server.base_url, api_key="stub", model="stub",
+        cache=MemoryCache(maxsize=8, ttl=60)))
+    with TestClient(api.app) as client:
+        client.server = server
+        yield client
+
+
+def test_recommendations(client, store):
+    response = client.post("/recommendations", params={"customer_id": "c-1"}, json=PROFILE)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["recommendations"] == DEFAULT_REPLY
+    assert isinstance(body["risk_score"], int) and body["explanations"]
+    assert store.history(customer_id="c-1").records[0].recommendations == DEFAULT_REPLY
+
+
+@pytest.mark.parametrize("path", ["/recommendations", "/risk"])
+@pytest.mark.parametrize("body, field", [
+    (dict(PROFILE, gender="Robot"), "gender"),
+    (dict(PROFILE, age=12), "age"),
+    ({key: value for key, value in PROFILE.items() if key != "gender"}, None),
+    ([PROFILE], None),
+])
+def test_invalid_profiles_are_rejected(client, path, body, field):
+    response = client.post(path, json=body)
+
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == (["body", field] if field else ["body"])
+    assert client.server.requests == 0
+
+
+def test_risk_never_calls_the_llm(client):
+    response = client.post("/risk", json=PROFILE)
+
+    assert response.status_code == 200
+    assert set(response.json()) == {"risk_score", "explanations", "health_risk_prediction"}
+    assert client.server.requests == 0
+
+
+def test_batch_reports_invalid_profiles_per_row(client, store):
+    profiles = [PROFILE, dict(PROFILE, gender="Robot"), dict(PROFILE, age=70)]
+
+    response = client.post("/recommendations/batch", json={"profiles": profiles, "customer_ids": ["a", "b", "c"]})
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [result["status"] for result in results] == ["ok", "error", "ok"]
+    assert results[0]["recommendations"] == DEFAULT_REPLY
+    assert results[1]["error"].startswith("Invalid profile: gender")
+    assert [record.customer_id for record in store.history().records] == ["c", "a"]
+
+
+def test_batch_rejects_misaligned_customer_ids(client):
+    response = client.post("/recommendations/batch", json={"profiles": [PROFILE], "customer_ids": ["a", "b"]})
+
+    assert response.status_code == 422
+
+
+def test_history_pages_through_stored_answers(client, store):
+    for age in (30, 40, 50):
+        client.post("/recommendations/batch", json={"profiles": [dict(PROFILE, age=age)], "customer_ids": ["c-1"],
+                                                    "skip_llm": True})
+
+    first = client.get("/history", params={"customer_id": "c-1", "limit": 2}).json()
+    second = client.get("/history", params={"customer_id": "c-1", "limit": 2, "cursor": first["next_cursor"]}).json()
+
+    assert [record["profile"]["age"] for record in first["records"] + second["records"]] == [50, 40, 30]
+    assert second["next_cursor"] is None
+    assert client.get("/history", params={"cursor": "not a cursor"}).status_code == 422
+
+
+def test_history_needs_the_store(client, monkeypatch):
+    monkeypatch.setattr(api, "default_store", lambda: None)
+
+    assert client.get("/history").status_code == 503
@@ -0,0 +1,50 @@
+import os
+
+import pytest
+
+pytest.importorskip("streamlit")
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+import controller  # noqa: E402
+from recommendation_store import RecommendationStore  # noqa: E402
+from utils.stub_llm_server import DEFAULT_REPLY  # noqa: E402
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = RecommendationStore(str(tmp_path / "history.db"))
+    monkeypatch.setattr(controller, "default_store", lambda: store)
+    yield store
+    store.close()
+
+
+def get_recommendations(occupation):
+    app = AppTest.from_file(APP_PATH, default_timeout=30).run()
+    # A distinct occupation per test keeps answers from one test out of the next
+    app.text_input(key="occupation").set_value(occupation)
+    app.button[0].click().run()
+    assert not app.exception
+    return app
+
+
+def test_streamed_answer_is_stored(stub_llm, store):
+    stub_llm()
+
+    app = get_recommendations("Engineer")
+
+    assert app.session_state["recommendations"].strip() == DEFAULT_REPLY
+    assert len(store) == 1
+    assert store.history().records[0].recommendations.strip() == DEFAULT_REPLY
+
+
+def test_stream_failing_after_first_chunk_is_not_persisted(stub_llm, store):
+    server = stub_llm(stream_error_after=1)
+
+    app = get_recommendations("Pilot")
+
+    assert server.requests == 1
+    assert [error.value for error in app.error] == ["An unexpected error occurred: stub stream error"]
+    assert app.session_state["recommendations"] == ""
+    assert len(store) == 0
@@ -0,0 +1,118 @@
+import asyncio
+import threading
+
+import pytest
+
+from async_llm_client import AsyncRecommendationClient, LLMRequestError
+from utils.response_cache import MemoryCache
+from utils.stub_llm_server import DEFAULT_REPLY
+
+
+def client_for(server, **options):
+    options.setdefault("backoff_base", 0.01)
+    options.setdefault("backoff_max", 0.05)
+    # A fresh cache per client keeps one test's answers out of the next
+    options.setdefault("cache", MemoryCache(maxsize=64, ttl=60))
+    return AsyncRecommendationClient(base_url=server.base_url, api_key="stub", model="stub", **options)
+
+
+async def recommend(client, profile):
+    async with client:
+        return await client.get_recommendations(profile)
+
+
+@pytest.mark.parametrize("failures", [[503], [429, 500], [502, 504, 503]])
+def test_retries_transient_failures(stub_server, profile, failures):
+    server = stub_server(failures=failures)
+
+    assert asyncio.run(recommend(client_for(server, max_retries=4), profile)) == DEFAULT_REPLY
+    assert server.requests == len(failures) + 1
+
+
+def test_gives_up_after_max_retries(stub_server, profile):
+    server = stub_server(error_rate=1.0, error_status=503)
+
+    with pytest.raises(LLMRequestError) as error:
+        asyncio.run(recommend(client_for(server, max_retries=2), profile))
+    assert error.value.status_code == 503
+    assert server.requests == 3
+
+
+def test_does_not_retry_client_errors(stub_server, profile):
+    server = stub_server(failures=[400])
+
+    with pytest.raises(LLMRequestError) as error:
+        asyncio.run(recommend(client_for(server, max_retries=4), profile))
+    assert error.value.status_code == 400
+    assert server.requests == 1
+
+
+def test_backoff_is_capped_and_honours_retry_after(stub_server):
+    client = client_for(stub_server(), backoff_base=1.0, backoff_max=2.0)
+    try:
+        for attempt in range(8):
+            assert 0.0 <= client._backoff(attempt) <= 2.0
+        assert client._backoff(0, retry_after=5.0) == 5.0
+    finally:
+        asyncio.run(client.aclose())
+
+
+def test_rate_limited_response_pauses_client(stub_server, profile):
+    server = stub_server(failures=[429])
+
+    async def run():
+        async with client_for(server) as client:
+            result = await client.get_recommendations(profile)
+            return result, client._paused_until
+
+    result, paused_until = asyncio.run(run())
+    assert result == DEFAULT_REPLY
+    assert paused_until > 0
+
+
+def test_caches_successful_answers(stub_server, profile):
+    server = stub_server()
+
+    async def run():
+        async with client_for(server) as client:
+            return [await client.get_recommendations(profile) for _ in range(3)]
+
+    assert asyncio.run(run()) == [DEFAULT_REPLY] * 3
+    assert server.requests == 1
+
+
+def test_many_keeps_order_and_returns_errors_in_place(stub_server, profile):
+    server = stub_server(failures=[400])
+    other = profile._replace(age=60)
+
+    async def run():
+        async with client_for(server, max_concurrency=1) as client:
+            return await client.get_recommendations_many([profile, other])
+
+    first, second = asyncio.run(run())
+    assert isinstance(first, LLMRequestError) and first.status_code == 400
+    assert second == DEFAULT_REPLY
+
+
+def test_cache_lookups_run_off_the_event_loop(stub_server, profile):
+    server = stub_server()
+    threads = []
+
+    class RecordingCache(MemoryCache):
+        def get(self, key):
+            threads.append(threading.get_ident())
+            return super().get(key)
+
+        def set(self, key, value):
+            threads.append(threading.get_ident())
+            super().set(key, value)
+
+    async def run():
+        async with client_for(server, cache=RecordingCache(maxsize=8, ttl=60)) as client:
+            loop_thread = threading.get_ident()
+            answers = [await client.get_recommendations(profile) for _ in range(2)]
+            return loop_thread, answers
+
+    loop_thread, answers = asyncio.run(run())
+    assert answers == [DEFAULT_REPLY] * 2
+    assert len(threads) == 3 and loop_thread not in threads
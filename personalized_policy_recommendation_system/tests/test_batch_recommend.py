@@ -0,0 +1,125 @@
+import asyncio
+import csv
+import functools
+import json
+
+import pytest
+
+import batch_recommend
+from async_llm_client import AsyncRecommendationClient
+from utils.response_cache import MemoryCache
+from utils.stub_llm_server import DEFAULT_REPLY
+
+ROW = {
+    "age": 45, "gender": "Female", "marital_status": "Married", "smoking_status": "No",
+    "drinking_status": "Yes", "chronic_conditions": "diabetes", "annual_income": 85000,
+    "occupation": "Teacher", "dependents": 2, "health_status": "fair", "family_health_history": "",
+}
+
+
+def write_jsonl(path, lines):
+    path.write_bytes(b"".join(line + b"\n" for line in lines))
+
+
+def read_results(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def run(input_path, output_path, **options):
+    options.setdefault("skip_llm", True)
+    return asyncio.run(batch_recommend.run(str(input_path), str(output_path), **options))
+
+
+def test_bad_jsonl_lines_become_error_rows(tmp_path):
+    source, output = tmp_path / "profiles.jsonl", tmp_path / "results.jsonl"
+    write_jsonl(source, [
+        json.dumps(ROW).encode(),
+        b'{"age": 45, "gender": ',
+        b"[1, 2, 3]",
+        json.dumps(dict(ROW, gender="Robot")).encode(),
+        b'{"age": "\xff\xfe"}',
+        json.dumps(dict(ROW, customer_id="c-42")).encode(),
+    ])
+
+    assert run(source, output, chunk_size=4) == 6
+    results = read_results(output)
+
+    assert [result["row"] for result in results] == list(range(6))
+    assert [result["status"] for result in results] == ["ok", "error", "error", "error", "error", "ok"]
+    assert results[1]["error"].startswith("Invalid JSON on line 2")
+    assert results[2]["error"] == "Line 3 is not a JSON object."
+    assert results[3]["error"].startswith("Invalid profile: gender")
+    assert results[5]["customer_id"] == "c-42"
+    checkpoint = json.loads((tmp_path / "results.jsonl.checkpoint").read_text())
+    assert (checkpoint["rows_done"], checkpoint["errors"]) == (6, 4)
+
+
+def test_bad_csv_record_becomes_an_error_row(tmp_path):
+    source, output = tmp_path / "profiles.csv", tmp_path / "results.jsonl"
+    with open(source, "w", newline="", encoding="utf-8") as file:
+        writer = csv.DictWriter(file, fieldnames=list(ROW))
+        writer.writeheader()
+        writer.writerow(ROW)
+        writer.writerow(dict(ROW, occupation="x" * (csv.field_size_limit() + 1)))
+        writer.writerow(ROW)
+
+    assert run(source, output) == 3
+    results = read_results(output)
+
+    assert [result["status"] for result in results] == ["ok", "error", "ok"]
+    assert "field larger than field limit" in results[1]["error"]
+
+
+def test_resume_after_a_crash_has_no_gaps_or_duplicates(tmp_path, monkeypatch):
+    source, output = tmp_path / "profiles.jsonl", tmp_path / "results.jsonl"
+    write_jsonl(source, [json.dumps(dict(ROW, age=20 + index)).encode() for index in range(25)])
+    process_chunk = batch_recommend.process_chunk
+    calls = []
+
+    async def crash_on_third_chunk(chunk, first_row, client, store=None):
+        calls.append(first_row)
+        if len(calls) == 3:
+            # Simulate rows written after the last checkpoint, then the crash
+            with open(output, "ab") as file:
+                file.write(b'{"row": 10, "status": "ok"}\n{"row": 11')
+            raise KeyboardInterrupt
+        return await process_chunk(chunk, first_row, client, store)
+
+    monkeypatch.setattr(batch_recommend, "process_chunk", crash_on_third_chunk)
+    with pytest.raises(KeyboardInterrupt):
+        run(source, output, chunk_size=5)
+    assert json.loads((tmp_path / "results.jsonl.checkpoint").read_text())["rows_done"] == 10
+
+    monkeypatch.setattr(batch_recommend, "process_chunk", process_chunk)
+    assert run(source, output, chunk_size=5) == 25
+    results = read_results(output)
+
+    assert [result["row"] for result in results] == list(range(25))
+    # A finished run resumes to nothing
+    assert run(source, output, chunk_size=5) == 25
+    assert len(read_results(output)) == 25
+
+
+def test_checkpoint_belongs_to_its_input(tmp_path):
+    first, second, output = tmp_path / "a.jsonl", tmp_path / "b.jsonl", tmp_path / "results.jsonl"
+    write_jsonl(first, [json.dumps(ROW).encode()])
+    write_jsonl(second, [json.dumps(ROW).encode()])
+    run(first, output)
+
+    with pytest.raises(ValueError, match="belongs to"):
+        run(second, output)
+
+
+def test_recommendations_and_llm_errors_are_written_per_row(tmp_path, monkeypatch, stub_server):
+    server = stub_server(failures=[400])
+    monkeypatch.setattr(batch_recommend, "AsyncRecommendationClient", functools.partial(
+        AsyncRecommendationClient, base_url=server.base_url, api_key="stub", model="stub",
+        cache=MemoryCache(maxsize=8, ttl=60)))
+    source, output = tmp_path / "profiles.jsonl", tmp_path / "results.jsonl"
+    write_jsonl(source, [json.dumps(ROW).encode(), json.dumps(dict(ROW, age=70)).encode()])
+
+    assert run(source, output, concurrency=1, skip_llm=False) == 2
+    first, second = read_results(output)
+
+    assert first["status"] == "error" and "HTTP 400" in first["error"]
+    assert second["recommendations"] == DEFAULT_REPLY
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from batch_scoring import decode_explanations, score_batch
+from benchmarks.synthetic import generate_columns, generate_dataframe
+from controller import assess_risk, calculate_risk_score, generate_explanations, predict_health_risk
+from profile_record import build_profile
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_score_batch_matches_scalar_functions(seed):
+    frame = generate_dataframe(500, seed=seed)
+    profiles = [build_profile(**row) for row in frame.to_dict("records")]
+
+    scores = score_batch(profiles)
+
+    assert len(scores["risk_score"]) == len(profiles)
+    for index, profile in enumerate(profiles):
+        assert scores["risk_score"][index] == calculate_risk_score(profile)
+        assert decode_explanations(scores["explanation_codes"][index]) == generate_explanations(profile)
+        assert scores["health_risk"][index] == pytest.approx(predict_health_risk(profile))
+        assert assess_risk(profile) == (calculate_risk_score(profile), generate_explanations(profile))
+
+
+def test_score_batch_accepts_every_input_form():
+    columns = generate_columns(200, seed=3)
+    frame = generate_dataframe(200, seed=3)
+    profiles = [build_profile(**row) for row in frame.to_dict("records")]
+
+    expected = score_batch(profiles)
+    for profiles_form in (frame, columns):
+        scores = score_batch(profiles_form)
+        for name in ("risk_score", "health_risk", "explanation_codes"):
+            np.testing.assert_array_equal(scores[name], expected[name])
+
+
+@pytest.fixture
+def warnings_logged(monkeypatch):
+    import batch_scoring
+
+    logged = []
+    monkeypatch.setattr(batch_scoring, "log_warning", lambda message, *args: logged.append(message % args))
+    batch_scoring.warn_placeholder.cache_clear()
+    yield logged
+    batch_scoring.warn_placeholder.cache_clear()
+
+
+def test_placeholder_health_risk_is_served_with_one_warning(monkeypatch, warnings_logged):
+    import batch_scoring
+
+    monkeypatch.setattr(batch_scoring, "load_default_model", lambda: None)
+    columns = generate_columns(10, seed=1)
+
+    for _ in range(3):
+        assert batch_scoring.health_risks(columns).tolist() == [batch_scoring.PLACEHOLDER_HEALTH_RISK] * 10
+    assert len(warnings_logged) == 1 and "placeholder" in warnings_logged[0]
+
+
+def test_trained_model_replaces_the_placeholder(tmp_path, monkeypatch, warnings_logged):
+    import batch_scoring
+    from risk_model import FEATURE_NAMES, HealthRiskModel
+
+    path = str(tmp_path / "health_risk_v1.json")
+    size = len(FEATURE_NAMES)
+    HealthRiskModel(np.linspace(-1, 1, size), -0.5, np.zeros(size), np.ones(size), version=1).save(path)
+    monkeypatch.setattr(batch_scoring, "load_default_model", lambda: HealthRiskModel.load(path))
+
+    risks = batch_scoring.health_risks(generate_columns(50, seed=2))
+
+    assert ((risks > 0) & (risks < 1)).all() and len(set(risks.tolist())) > 1
+    assert warnings_logged == []
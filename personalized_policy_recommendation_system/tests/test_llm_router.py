@@ -0,0 +1,192 @@
+import time
+
+import pytest
+
+from config.llm_config import create_openai_client
+from metrics import LLM_HEDGED_REQUESTS
+from utils.llm_router import COMPLETION, STREAM, Backend, CircuitBreaker, LLMRouter, NoHealthyBackendError
+from utils.rate_limiter import LLMRateLimiter
+from utils.stub_llm_server import DEFAULT_REPLY
+
+MESSAGES = [{"role": "user", "content": "Recommend a policy."}]
+
+
+def backend(server, name, **options):
+    return Backend(name, lambda: create_openai_client(server.base_url), **options)
+
+
+def complete(router):
+    response = router.chat.completions.create(model="stub", messages=MESSAGES)
+    return response.choices[0].message.content
+
+
+def test_fails_over_to_next_backend(stub_server):
+    failing, healthy = stub_server(error_rate=1.0), stub_server()
+    router = LLMRouter([backend(failing, "failing"), backend(healthy, "healthy")], hedge_after=None)
+
+    assert complete(router) == DEFAULT_REPLY
+    assert (failing.requests, healthy.requests) == (1, 1)
+    assert router.stats()["failing"]["error_rate"] == 1.0
+
+
+def test_raises_last_error_when_every_backend_fails(stub_server):
+    first, second = stub_server(error_rate=1.0), stub_server(error_rate=1.0, error_status=500)
+    router = LLMRouter([backend(first, "first"), backend(second, "second")], hedge_after=None)
+
+    with pytest.raises(Exception) as error:
+        complete(router)
+    assert getattr(error.value, "status_code", None) == 500
+
+
+def test_open_breaker_skips_backend(stub_server):
+    failing, healthy = stub_server(error_rate=1.0), stub_server()
+    router = LLMRouter([backend(failing, "failing", failure_threshold=2, cooldown=60),
+                        backend(healthy, "healthy")], hedge_after=None)
+    # Keep the failing backend first in the ranking so only its breaker can take it out
+    router.ranked = lambda kind=None: [b for b in router.backends if b.breaker.available()]
+
+    for _ in range(4):
+        assert complete(router) == DEFAULT_REPLY
+    assert failing.requests == 2
+    assert healthy.requests == 4
+    assert router.stats()["failing"]["state"] == CircuitBreaker.OPEN
+
+
+def test_every_breaker_open_raises(stub_server):
+    server = stub_server(error_rate=1.0)
+    router = LLMRouter([backend(server, "only", failure_threshold=1, cooldown=60)], hedge_after=None)
+
+    with pytest.raises(Exception):
+        complete(router)
+    with pytest.raises(NoHealthyBackendError):
+        complete(router)
+    assert server.requests == 1
+
+
+def test_ranked_prefers_faster_backend(stub_server):
+    server = stub_server()
+    slow, fast = backend(server, "slow"), backend(server, "fast")
+    slow.record(2.0, ok=True)
+    fast.record(0.5, ok=True)
+
+    assert LLMRouter([slow, fast]).ranked() == [fast, slow]
+
+
+def test_hedges_slow_backend(stub_server):
+    slow, fast = stub_server(latency=1.0), stub_server()
+    router = LLMRouter([backend(slow, "slow"), backend(fast, "fast")], hedge_after=0.1)
+
+    start = time.perf_counter()
+    assert complete(router) == DEFAULT_REPLY
+    assert time.perf_counter() - start < 0.8
+    # The slow backend counts its request only once its latency has passed
+    assert fast.requests == 1
+
+
+def test_no_hedge_before_delay(stub_server):
+    primary, secondary = stub_server(), stub_server()
+    router = LLMRouter([backend(primary, "primary"), backend(secondary, "secondary")], hedge_after=5.0)
+
+    assert complete(router) == DEFAULT_REPLY
+    assert (primary.requests, secondary.requests) == (1, 0)
+
+
+def test_hedge_delay_follows_p95_after_min_samples(stub_server):
+    primary = backend(stub_server(), "primary")
+    router = LLMRouter([primary], default_hedge_after=5.0, min_samples=5)
+
+    assert router._hedge_delay(primary) == 5.0
+    for seconds in (0.1, 0.2, 0.3, 0.4, 0.5):
+        primary.record(seconds, ok=True)
+    assert router._hedge_delay(primary) == 0.5
+
+
+def test_hedge_takes_a_rate_limit_token(stub_server):
+    slow, fast = stub_server(latency=1.0), stub_server()
+    limiter = LLMRateLimiter(requests_per_minute=6)
+    router = LLMRouter([backend(slow, "slow"), backend(fast, "fast")], hedge_after=0.1, rate_limiter=limiter)
+
+    assert complete(router) == DEFAULT_REPLY
+    assert fast.requests == 1
+    assert limiter.stats()["requests"] == pytest.approx(5, abs=0.2)
+
+
+def test_no_hedge_when_the_rate_limit_is_reached(stub_server):
+    slow, fast = stub_server(latency=0.5), stub_server()
+    limiter = LLMRateLimiter(requests_per_minute=60, burst=1 / 60)
+    limiter.acquire()
+    router = LLMRouter([backend(slow, "slow"), backend(fast, "fast")], hedge_after=0.1, rate_limiter=limiter)
+    before = LLM_HEDGED_REQUESTS.value(outcome="rate_limited")
+
+    start = time.perf_counter()
+    assert complete(router) == DEFAULT_REPLY
+    assert time.perf_counter() - start >= 0.5
+    assert (slow.requests, fast.requests) == (1, 0)
+    assert LLM_HEDGED_REQUESTS.value(outcome="rate_limited") == before + 1
+
+
+def test_streams_and_completions_are_tracked_separately(stub_server):
+    primary = backend(stub_server(), "primary")
+    router = LLMRouter([primary], default_hedge_after=5.0, min_samples=5)
+    for _ in range(5):
+        primary.record(0.05, ok=True, kind=STREAM)
+
+    # Time to first chunk must not shrink the hedge delay of full completions
+    assert router._hedge_delay(primary) == 5.0
+    for _ in range(5):
+        primary.record(2.0, ok=True)
+    assert router._hedge_delay(primary) == 2.0
+    assert primary.score(STREAM) == 0.05
+    assert primary.score(COMPLETION) == 2.0
+    assert primary.stats()["stream_first_chunk_p50"] == 0.05
+
+
+def test_stream_records_time_to_first_chunk(stub_server):
+    server = stub_server()
+    primary = backend(server, "primary")
+    router = LLMRouter([primary])
+
+    list(router.chat.completions.create(model="stub", messages=MESSAGES, stream=True))
+
+    assert primary.trackers[STREAM].samples == 1
+    assert primary.trackers[COMPLETION].samples == 0
+
+
+def test_stream_fails_over_before_first_chunk(stub_server):
+    failing, healthy = stub_server(error_rate=1.0), stub_server()
+    router = LLMRouter([backend(failing, "failing"), backend(healthy, "healthy")])
+
+    stream = router.chat.completions.create(model="stub", messages=MESSAGES, stream=True)
+    text = "".join(chunk.choices[0].delta.content or "" for chunk in stream)
+
+    assert text.strip() == DEFAULT_REPLY
+    assert (failing.requests, healthy.requests) == (1, 1)
+
+
+def test_breaker_half_open_after_cooldown():
+    breaker = CircuitBreaker(failure_threshold=2, cooldown=0.05)
+    breaker.record(False)
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.record(False)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # Only one trial call at a time while half-open
+    assert not breaker.allow()
+    breaker.record(True)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+
+
+def test_breaker_reopens_when_trial_fails():
+    breaker = CircuitBreaker(failure_threshold=1, cooldown=0.05)
+    breaker.record(False)
+    time.sleep(0.06)
+    assert breaker.allow()
+
+    breaker.record(False)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.available()
@@ -0,0 +1,59 @@
+import json
+import logging
+import queue
+
+import pytest
+
+from logger import MAX_MESSAGE_CHARS, DeferredQueueHandler, JsonFormatter, TruncatingFormatter
+
+
+@pytest.fixture
+def queued():
+    """A logger feeding a DeferredQueueHandler; returns (logger, queue)."""
+    records = queue.SimpleQueue()
+    test_logger = logging.getLogger("tests.logger")
+    test_logger.propagate = False
+    test_logger.setLevel(logging.DEBUG)
+    handler = DeferredQueueHandler(records)
+    test_logger.addHandler(handler)
+    yield test_logger, records
+    test_logger.removeHandler(handler)
+
+
+def test_message_is_rendered_before_the_arguments_change(queued):
+    test_logger, records = queued
+    scores = [1, 2]
+
+    test_logger.info("Scores: %s", scores)
+    scores.append(3)
+
+    record = records.get_nowait()
+    assert record.getMessage() == "Scores: [1, 2]"
+    assert json.loads(JsonFormatter().format(record))["message"] == "Scores: [1, 2]"
+
+
+def test_json_lines_carry_the_standard_and_extra_fields(queued):
+    test_logger, records = queued
+
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        test_logger.exception("Failed for %s", "c-1", extra={"customer_id": "c-1", "suppressed": 3})
+    entry = json.loads(JsonFormatter().format(records.get_nowait()))
+
+    assert {"time", "level", "logger", "message", "module", "line", "exception"} <= set(entry)
+    assert (entry["level"], entry["logger"], entry["message"]) == ("ERROR", "tests.logger", "Failed for c-1")
+    assert (entry["customer_id"], entry["suppressed"]) == ("c-1", 3)
+    assert entry["module"] == "test_logger" and isinstance(entry["line"], int)
+    assert "ValueError: boom" in entry["exception"]
+
+
+def test_long_messages_are_truncated_by_both_formatters(queued):
+    test_logger, records = queued
+
+    test_logger.info("%s", "x" * (MAX_MESSAGE_CHARS + 40))
+    record = records.get_nowait()
+    expected = "x" * MAX_MESSAGE_CHARS + "... [truncated 40 chars]"
+
+    assert json.loads(JsonFormatter().format(record))["message"] == expected
+    assert TruncatingFormatter("%(message)s").format(record) == expected
@@ -0,0 +1,79 @@
+import json
+import urllib.request
+
+import pytest
+
+import metrics
+from metrics import MetricsRegistry
+
+
+@pytest.fixture
+def registry():
+    return MetricsRegistry()
+
+
+def test_counters_render_help_type_and_labelled_samples(registry):
+    requests = registry.counter("app_requests_total", "Requests handled.", ("mode", "outcome"))
+    requests.inc(mode="sync", outcome="ok")
+    requests.inc(2, mode="async", outcome="error")
+
+    assert registry.render_prometheus().splitlines() == [
+        "# HELP app_requests_total Requests handled.",
+        "# TYPE app_requests_total counter",
+        'app_requests_total{mode="sync",outcome="ok"} 1',
+        'app_requests_total{mode="async",outcome="error"} 2',
+    ]
+    assert requests.value(mode="async", outcome="error") == 2
+    assert registry.counter("app_requests_total", "ignored") is requests
+
+
+def test_histograms_render_cumulative_buckets_sum_and_count(registry):
+    latency = registry.histogram("app_seconds", "Latency.", buckets=(0.1, 1), labelnames=("stage",))
+    for value in (0.05, 0.1, 0.5, 3):
+        latency.observe(value, stage="llm")
+
+    assert registry.render_prometheus().splitlines() == [
+        "# HELP app_seconds Latency.",
+        "# TYPE app_seconds histogram",
+        'app_seconds_bucket{stage="llm",le="0.1"} 2',
+        'app_seconds_bucket{stage="llm",le="1"} 3',
+        'app_seconds_bucket{stage="llm",le="+Inf"} 4',
+        'app_seconds_sum{stage="llm"} 3.65',
+        'app_seconds_count{stage="llm"} 4',
+    ]
+
+
+def test_gauges_and_unlabelled_metrics(registry):
+    depth = registry.gauge("app_queue_depth", "Waiting calls.")
+    depth.set(5)
+    depth.set(3)
+
+    assert registry.render_prometheus().splitlines()[1:] == ["# TYPE app_queue_depth gauge", "app_queue_depth 3"]
+
+
+def test_label_values_are_escaped(registry):
+    registry.counter("app_backend_total", "Calls.", ("backend",)).inc(backend='say "hi"\\n\n')
+
+    assert registry.render_prometheus().splitlines()[-1] == 'app_backend_total{backend="say \\"hi\\"\\\\n\\n"} 1'
+
+
+def test_snapshot_is_json_serializable(registry):
+    registry.histogram("app_seconds", "Latency.", buckets=(1,)).observe(0.5)
+    registry.counter("app_total", "Total.").inc()
+
+    snapshot = json.loads(json.dumps(registry.snapshot()))
+
+    assert snapshot["app_total"] == {"type": "counter", "help": "Total.", "series": [{"labels": {}, "value": 1}]}
+    assert snapshot["app_seconds"]["series"][0]["buckets"] == {"1": 1, "+Inf": 0}
+
+
+def test_metrics_endpoint_serves_the_text_format():
+    metrics.STAGE_SECONDS.observe(0.01, stage="test_metrics")
+    server = metrics.start_metrics_server(port=0)
+    url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+
+    with urllib.request.urlopen(url) as response:
+        body = response.read().decode()
+        assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+    assert f"# TYPE {metrics.STAGE_SECONDS.name} histogram" in body
+    assert 'stage="test_metrics"' in body
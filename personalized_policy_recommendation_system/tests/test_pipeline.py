@@ -0,0 +1,67 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from pipeline import Stage, StageGraph, StageTimeoutError
+
+
+@pytest.fixture
+def executors():
+    pools = {"io": ThreadPoolExecutor(1), "local": ThreadPoolExecutor(2)}
+    yield pools
+    for pool in pools.values():
+        pool.shutdown(wait=True)
+
+
+def test_stages_get_their_dependencies_results(executors):
+    graph = StageGraph([
+        Stage("double", lambda x: x * 2, ("x",)),
+        Stage("total", lambda x, double: x + double, ("x", "double")),
+    ])
+
+    run = graph.start({"x": 3}, executors)
+
+    assert (run.result("double"), run.result("total")) == (6, 9)
+
+
+def test_only_runs_the_named_stages_and_their_dependencies(executors):
+    calls = []
+    graph = StageGraph([
+        Stage("slow", lambda x: calls.append("slow"), ("x",), pool="io"),
+        Stage("double", lambda x: calls.append("double") or x * 2, ("x",)),
+    ])
+
+    run = graph.start({"x": 3}, executors, only=("double",))
+
+    assert run.result("double") == 6
+    assert calls == ["double"] and "slow" not in run.futures
+
+
+def test_deadline_counts_time_queued_for_a_thread(executors):
+    release = threading.Event()
+    executors["io"].submit(release.wait)
+    graph = StageGraph([Stage("llm", lambda x: x, ("x",), timeout=0.2, pool="io")])
+
+    start = time.monotonic()
+    run = graph.start({"x": 1}, executors)
+    with pytest.raises(StageTimeoutError):
+        run.result("llm")
+    elapsed = time.monotonic() - start
+    release.set()
+
+    assert elapsed == pytest.approx(0.2, abs=0.1)
+
+
+def test_failed_dependency_surfaces_before_the_deadline(executors):
+    def fail(x):
+        raise ValueError("bad profile")
+
+    graph = StageGraph([
+        Stage("check", fail, ("x",)),
+        Stage("llm", lambda check: check, ("check",), timeout=5, pool="io"),
+    ])
+
+    with pytest.raises(ValueError, match="bad profile"):
+        graph.start({"x": 1}, executors).result("llm")
@@ -0,0 +1,58 @@
+import pytest
+
+from profile_record import Gender, HealthStatus, ProfileRecord, ProfileValidationError, YesNo, build_profile
+
+FIELDS = dict(
+    age=45, gender="Female", marital_status="Married", smoking_status="No", drinking_status="Yes",
+    chronic_conditions="diabetes, asthma", annual_income=85000, occupation="Teacher", dependents=2,
+    health_status="fair", family_health_history="",
+)
+
+
+def test_valid_fields_become_an_enum_coded_record():
+    record = build_profile(**FIELDS, customer_id="ignored")
+
+    assert isinstance(record, ProfileRecord)
+    assert record.gender is Gender.FEMALE and record.gender == "Female"
+    assert (record.smoking_status, record.health_status) == (YesNo.NO, HealthStatus.FAIR)
+    assert record.annual_income == 85000.0 and isinstance(record.annual_income, float)
+    assert record.chronic_condition_list == ("diabetes", "asthma")
+    assert record.family_history_list == ()
+
+
+@pytest.mark.parametrize("field, value", [
+    ("gender", "female"),
+    ("gender", "Robot"),
+    ("marital_status", "Engaged"),
+    ("smoking_status", "yes"),
+    ("drinking_status", True),
+    ("health_status", "excellent"),
+    ("health_status", None),
+])
+def test_rejects_values_outside_each_enum(field, value):
+    with pytest.raises(ProfileValidationError, match="must be one of") as error:
+        build_profile(**dict(FIELDS, **{field: value}))
+    assert error.value.field == field
+
+
+@pytest.mark.parametrize("field, value", [
+    ("age", 17),
+    ("age", 121),
+    ("age", "forty"),
+    ("age", 40.5),
+    ("age", True),
+    ("annual_income", 0),
+    ("annual_income", "lots"),
+    ("dependents", -1),
+    ("occupation", 7),
+])
+def test_rejects_out_of_range_and_mistyped_values(field, value):
+    with pytest.raises(ProfileValidationError) as error:
+        build_profile(**dict(FIELDS, **{field: value}))
+    assert error.value.field == field
+
+
+def test_numeric_strings_are_accepted():
+    record = build_profile(**dict(FIELDS, age="45", annual_income="85000.5", dependents="2.0"))
+
+    assert (record.age, record.annual_income, record.dependents) == (45, 85000.5, 2)
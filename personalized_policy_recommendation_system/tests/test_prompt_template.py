@@ -0,0 +1,92 @@
+import asyncio
+import json
+
+import pytest
+
+from async_llm_client import AsyncRecommendationClient
+from llm_controller import get_recommendations
+from utils.prompt_template import (
+    JSON_SYSTEM_PROMPT,
+    TIERS,
+    Policy,
+    PolicyParseError,
+    build_request,
+    encode_profile,
+    parse_policies,
+)
+from utils.response_cache import MemoryCache
+
+POLICIES = {"policies": [
+    {"name": "Family Health Plus", "type": "health", "reason": "Covers chronic conditions."},
+    {"name": "Term Life 20", "type": "life"},
+]}
+
+
+def test_parse_policies():
+    assert parse_policies(json.dumps(POLICIES)) == [
+        Policy("Family Health Plus", "health", "Covers chronic conditions."),
+        Policy("Term Life 20", "life", ""),
+    ]
+
+
+@pytest.mark.parametrize("text", [
+    "1. Comprehensive health insurance.",
+    '{"policies": [{"name": "Cut off',
+    '{"recommendations": []}',
+    '{"policies": [{"type": "life"}]}',
+    '{"policies": "health"}',
+    "[]",
+])
+def test_parse_policies_rejects_malformed_payloads(text):
+    with pytest.raises(PolicyParseError, match="not a policy list"):
+        parse_policies(text)
+
+
+def test_encoding_skips_empty_fields(profile):
+    encoded = encode_profile(profile._replace(occupation="", chronic_conditions=""))
+
+    assert "Occupation" not in encoded and "Conditions" not in encoded
+    assert encoded.startswith("Age: 45; Gender: Female")
+
+
+def test_json_request_asks_for_the_schema(profile):
+    request = build_request(profile, "brief", json_output=True)
+
+    assert request.messages[0]["content"] == JSON_SYSTEM_PROMPT
+    assert request.response_format == {"type": "json_object"}
+    assert request.max_tokens == TIERS["brief"].max_tokens
+    assert request.cache_scope != build_request(profile, "brief").cache_scope
+
+
+def test_json_mode_returns_policies(stub_llm, profile):
+    server = stub_llm(reply=json.dumps(POLICIES))
+
+    policies = get_recommendations(profile, json_output=True)
+
+    assert [policy.name for policy in policies] == ["Family Health Plus", "Term Life 20"]
+    assert server.requests == 1
+
+
+def test_json_mode_raises_on_malformed_answer(stub_llm, profile):
+    stub_llm(reply="Sorry, here are some policies: health, life.")
+
+    with pytest.raises(PolicyParseError):
+        get_recommendations(profile, json_output=True)
+
+
+def test_json_mode_raises_when_the_call_fails(stub_llm, profile):
+    stub_llm(error_rate=1.0, error_status=400)
+
+    with pytest.raises(PolicyParseError, match="An unexpected error occurred"):
+        get_recommendations(profile, json_output=True)
+
+
+def test_async_json_mode_returns_policies(stub_server, profile):
+    server = stub_server(reply=json.dumps(POLICIES))
+
+    async def run():
+        async with AsyncRecommendationClient(base_url=server.base_url, api_key="stub", model="stub",
+                                             cache=MemoryCache(maxsize=8, ttl=60)) as client:
+            return await client.get_recommendations(profile, json_output=True)
+
+    assert asyncio.run(run())[0] == Policy("Family Health Plus", "health", "Covers chronic conditions.")
@@ -0,0 +1,157 @@
+import asyncio
+import time
+
+import pytest
+
+import async_llm_client
+import llm_controller
+from async_llm_client import AsyncRecommendationClient, LLMRequestError
+from metrics import LLM_RATE_LIMIT_SHED
+from utils.prompt_template import build_request
+from utils.rate_limiter import LLMRateLimiter, RateLimitExceeded
+from utils.response_cache import MemoryCache
+from utils.stub_llm_server import DEFAULT_REPLY
+
+
+def one_at_a_time(requests_per_minute, **options):
+    """A limiter whose request bucket holds a single call."""
+    return LLMRateLimiter(requests_per_minute, burst=1 / requests_per_minute, **options)
+
+
+async def acquire_all(limiter, count, tokens=0):
+    return await asyncio.gather(*(limiter.acquire_async(tokens) for _ in range(count)), return_exceptions=True)
+
+
+def test_disabled_limiter_never_waits():
+    limiter = LLMRateLimiter()
+
+    assert not limiter.enabled
+    assert limiter.acquire(10_000) == 0.0
+    assert limiter.stats() == {"waiting": 0}
+
+
+def test_waiters_are_queued_in_arrival_order():
+    limiter = one_at_a_time(600)
+
+    start = time.monotonic()
+    waits = asyncio.run(acquire_all(limiter, 3))
+
+    assert waits[0] == 0.0
+    assert waits[1] == pytest.approx(0.1, abs=0.02)
+    assert waits[2] == pytest.approx(0.2, abs=0.02)
+    assert time.monotonic() - start >= 0.19
+    assert limiter.waiting == 0
+
+
+def test_blocking_acquire_waits_for_refill():
+    limiter = one_at_a_time(600)
+
+    limiter.acquire()
+    start = time.monotonic()
+    assert limiter.acquire() > 0
+    assert time.monotonic() - start >= 0.08
+
+
+def test_sheds_call_larger_than_the_limit():
+    limiter = LLMRateLimiter(tokens_per_minute=1000)
+    before = LLM_RATE_LIMIT_SHED.value(reason="too_large")
+
+    with pytest.raises(RateLimitExceeded):
+        limiter.acquire(2000)
+    assert LLM_RATE_LIMIT_SHED.value(reason="too_large") == before + 1
+    assert limiter.stats()["tokens"] == 1000
+
+
+def test_sheds_when_queue_is_full():
+    limiter = one_at_a_time(600, max_queue=1)
+    before = LLM_RATE_LIMIT_SHED.value(reason="queue_full")
+
+    results = asyncio.run(acquire_all(limiter, 3))
+
+    assert results[:2] == [0.0, pytest.approx(0.1, abs=0.02)]
+    assert isinstance(results[2], RateLimitExceeded)
+    assert LLM_RATE_LIMIT_SHED.value(reason="queue_full") == before + 1
+
+
+def test_sheds_when_wait_is_too_long():
+    limiter = one_at_a_time(60, max_wait=0.5)
+    before = LLM_RATE_LIMIT_SHED.value(reason="wait_too_long")
+
+    limiter.acquire()
+    with pytest.raises(RateLimitExceeded) as error:
+        limiter.acquire()
+    assert error.value.wait == pytest.approx(1.0, abs=0.05)
+    assert LLM_RATE_LIMIT_SHED.value(reason="wait_too_long") == before + 1
+    # A shed call reserves nothing
+    assert limiter.stats()["requests"] == pytest.approx(0.0, abs=0.05)
+
+
+def test_try_acquire_never_waits():
+    limiter = one_at_a_time(60)
+
+    assert limiter.try_acquire()
+    assert not limiter.try_acquire()
+    assert limiter.waiting == 0
+    assert LLMRateLimiter().try_acquire(10_000)
+
+
+def test_refund_returns_unused_tokens_up_to_capacity():
+    limiter = LLMRateLimiter(tokens_per_minute=600)
+
+    limiter.acquire(500)
+    assert limiter.stats()["tokens"] == pytest.approx(100, abs=1)
+    limiter.refund(300)
+    assert limiter.stats()["tokens"] == pytest.approx(400, abs=1)
+    limiter.refund(10_000)
+    assert limiter.stats()["tokens"] == 600
+
+
+def client_for(server, **options):
+    return AsyncRecommendationClient(base_url=server.base_url, api_key="stub", model="stub", backoff_base=0.01,
+                                     cache=MemoryCache(maxsize=64, ttl=60), **options)
+
+
+def test_async_client_refunds_unused_completion_budget(stub_server, profile, monkeypatch):
+    limiter = LLMRateLimiter(tokens_per_minute=3000)
+    monkeypatch.setattr(async_llm_client, "llm_rate_limiter", limiter)
+    monkeypatch.setattr(llm_controller, "llm_rate_limiter", limiter)
+    server = stub_server()
+
+    async def run():
+        async with client_for(server, max_tokens=1000) as client:
+            return await client.get_recommendations(profile)
+
+    assert asyncio.run(run()) == DEFAULT_REPLY
+    # The prompt and the completion actually used stay spent; the rest of max_tokens comes back
+    spent = 3000 - limiter.stats()["tokens"]
+    prompt_tokens = build_request(profile).prompt_tokens
+    assert spent == pytest.approx(prompt_tokens + len(DEFAULT_REPLY.split()), abs=10)
+
+
+def test_async_client_takes_one_request_share_however_many_attempts(stub_server, profile, monkeypatch):
+    limiter = LLMRateLimiter(requests_per_minute=6)
+    monkeypatch.setattr(async_llm_client, "llm_rate_limiter", limiter)
+    server = stub_server(failures=[503, 503])
+
+    async def run():
+        async with client_for(server) as client:
+            return await client.get_recommendations(profile)
+
+    assert asyncio.run(run()) == DEFAULT_REPLY
+    assert server.requests == 3
+    assert limiter.stats()["requests"] == pytest.approx(5, abs=0.2)
+
+
+def test_async_client_reports_shed_calls_as_429(stub_server, profile, monkeypatch):
+    monkeypatch.setattr(async_llm_client, "llm_rate_limiter", LLMRateLimiter(tokens_per_minute=10))
+    server = stub_server()
+
+    async def run():
+        async with client_for(server) as client:
+            return await client.get_recommendations(profile)
+
+    with pytest.raises(LLMRequestError) as error:
+        asyncio.run(run())
+    assert error.value.status_code == 429
+    assert isinstance(error.value.__cause__, RateLimitExceeded)
+    assert server.requests == 0
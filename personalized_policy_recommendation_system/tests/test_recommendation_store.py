@@ -0,0 +1,99 @@
+import sqlite3
+
+import pytest
+
+from recommendation_store import RecommendationStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = RecommendationStore(str(tmp_path / "history.db"))
+    yield store
+    store.close()
+
+
+def pages(store, **filters):
+    """Every page of a history query, following next_cursor to the end."""
+    result, cursor = [], None
+    while True:
+        page = store.history(cursor=cursor, **filters)
+        result.append([record.id for record in page.records])
+        cursor = page.next_cursor
+        if cursor is None:
+            return result
+
+
+def test_record_round_trips_every_field(store, profile):
+    row_id = store.record(profile, risk_score=6, health_risk=0.4, explanations=["Age over 50"],
+                          recommendations="answer", customer_id="c-1", model="m", model_version="v", prompt_scope="p")
+
+    record = store.history().records[0]
+    assert record.id == row_id
+    assert record.profile["age"] == 45 and record.profile["gender"] == "Female"
+    assert (record.risk_score, record.health_risk, record.explanations) == (6, 0.4, ["Age over 50"])
+    assert (record.recommendations, record.customer_id, record.model) == ("answer", "c-1", "m")
+
+
+def test_pages_cover_every_row_once_newest_first_despite_equal_timestamps(store, profile):
+    for index in range(23):
+        store.record(profile, customer_id="c-1", created_at=1000.0 + index // 5)
+
+    result = pages(store, customer_id="c-1", limit=4)
+
+    ids = [row_id for page in result for row_id in page]
+    assert [len(page) for page in result] == [4, 4, 4, 4, 4, 3]
+    assert sorted(ids) == list(range(1, 24)) and len(set(ids)) == 23
+    records = store.history(customer_id="c-1", limit=23).records
+    assert [record.id for record in records] == ids
+    assert [record.created_at for record in records] == sorted((record.created_at for record in records), reverse=True)
+
+
+def test_rows_added_while_paging_do_not_shift_later_pages(store, profile):
+    for index in range(10):
+        store.record(profile, created_at=1000.0 + index)
+    first = store.history(limit=5)
+
+    store.record(profile, created_at=2000.0)
+    second = store.history(limit=5, cursor=first.next_cursor)
+
+    assert [record.created_at for record in second.records] == [1004.0, 1003.0, 1002.0, 1001.0, 1000.0]
+
+
+def test_filters_by_customer_profile_and_time_range(store, profile):
+    other = profile._replace(age=70)
+    store.record(profile, customer_id="a", created_at=100.0)
+    store.record(other, customer_id="a", created_at=200.0)
+    store.record(profile, customer_id="b", created_at=300.0)
+
+    assert [r.created_at for r in store.history(customer_id="a").records] == [200.0, 100.0]
+    assert [r.created_at for r in store.history(user_data=profile).records] == [300.0, 100.0]
+    assert [r.created_at for r in store.history(since=100.0, until=300.0).records] == [200.0, 100.0]
+
+
+def test_malformed_cursor_is_a_value_error(store):
+    for cursor in ("garbage", "abc:1", "1.0:x"):
+        with pytest.raises(ValueError):
+            store.history(cursor=cursor)
+
+
+def test_latest_respects_model_prompt_and_age(store, profile):
+    store.record(profile, model="m", prompt_scope="p1", recommendations="old", created_at=100.0)
+    store.record(profile, model="m", prompt_scope="p2", recommendations="new")
+
+    assert store.latest(profile, model="m").recommendations == "new"
+    assert store.latest(profile, model="m", prompt_scope="p1").recommendations == "old"
+    assert store.latest(profile, model="m", prompt_scope="p1", max_age=60) is None
+    assert store.latest(profile, model="other") is None
+
+
+def test_record_many_writes_all_rows_or_none(store, profile):
+    good = [(profile, {"customer_id": f"c-{index}"}) for index in range(5)]
+    # The fourth row cannot be bound, so the insert fails after three rows went in
+    bad = good[:3] + [(profile, {"recommendations": ["not", "text"]})] + good[3:]
+
+    with pytest.raises(sqlite3.Error):
+        store.record_many(bad)
+    assert len(store) == 0
+
+    assert store.record_many(good) == 5
+    assert len(store) == 5
@@ -0,0 +1,74 @@
+import json
+
+import pytest
+
+pytest.importorskip("fpdf")
+import report_export  # noqa: E402
+from report_export import export_reports, render_many, render_pdf, render_text  # noqa: E402
+
+ANSWER = "1. Term life — covers your 2 dependents\n\n2. Critical illness: diabetes ✓"
+
+
+@pytest.fixture
+def without_font(monkeypatch):
+    monkeypatch.setattr(report_export, "font_available", lambda: False)
+    report_export._parsed_font.cache_clear()
+    yield
+    report_export._parsed_font.cache_clear()
+
+
+def test_text_report_is_utf8():
+    assert render_text(ANSWER, 7).decode("utf-8") == f"{ANSWER}\nRisk Score: 7"
+
+
+def test_pdf_report_is_a_complete_document():
+    document = render_pdf(ANSWER, 7)
+
+    assert document.startswith(b"%PDF-")
+    assert document.rstrip().endswith(b"%%EOF")
+
+
+def test_documents_do_not_share_glyph_subsets():
+    first = render_pdf("ascii only", 1)
+    render_pdf("Ωmega ✓ " * 20, 2)
+
+    # Glyphs used by the second document would otherwise be embedded in the third
+    assert len(render_pdf("ascii only", 1)) == len(first)
+
+
+def test_pdf_falls_back_to_a_core_font_without_the_bundled_one(without_font):
+    document = render_pdf(ANSWER, 7)
+
+    assert document.startswith(b"%PDF-")
+    assert b"Helvetica" in document
+
+
+def test_render_many_keeps_input_order():
+    reports = [(f"Answer {index}", index) for index in range(40)]
+
+    documents = list(render_many(reports, fmt="txt", workers=2, chunksize=3))
+
+    assert documents == [render_text(*report) for report in reports]
+
+
+
+def test_export_writes_each_report_as_it_is_rendered(tmp_path, monkeypatch):
+    results, output = tmp_path / "results.jsonl", tmp_path / "reports"
+    rows = [{"row": index, "status": "ok", "recommendations": f"Answer {index}", "risk_score": index}
+            for index in range(30)]
+    rows[4] = {"row": 4, "status": "error", "error": "Invalid profile"}
+    results.write_text("".join(json.dumps(row) + "\n" for row in rows), encoding="utf-8")
+    render = report_export.render_many
+    written_before = []
+
+    def recording_render_many(reports, fmt, workers):
+        for document in render(reports, fmt, workers=1, chunksize=2):
+            written_before.append(len(list(output.iterdir())))
+            yield document
+
+    monkeypatch.setattr(report_export, "render_many", recording_render_many)
+
+    assert export_reports(str(results), str(output), fmt="txt") == 29
+    assert written_before == list(range(29))
+    assert not (output / "report_4.txt").exists()
+    assert (output / "report_17.txt").read_bytes() == render_text("Answer 17", 17)
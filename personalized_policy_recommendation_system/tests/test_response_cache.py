@@ -0,0 +1,117 @@
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+import llm_controller
+from utils import prompt_template
+from utils.response_cache import MemoryCache, RecommendationCache, SQLiteCache, make_cache_key
+from utils.stub_llm_server import DEFAULT_REPLY
+
+
+def test_memory_cache_evicts_the_least_recently_used():
+    cache = MemoryCache(maxsize=2, ttl=60)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache.get("a")
+    cache.set("c", "3")
+
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == ("1", None, "3")
+    assert cache.evictions == 1
+
+
+def test_memory_cache_entries_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    cache = MemoryCache(maxsize=8, ttl=10)
+    cache.set("a", "1")
+
+    now[0] += 9.9
+    assert cache.get("a") == "1"
+    now[0] += 0.2
+    assert cache.get("a") is None
+    assert len(cache) == 0 and cache.evictions == 1
+
+
+def test_sqlite_cache_entries_expire(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    cache = SQLiteCache(str(tmp_path / "cache.sqlite"), ttl=10)
+    cache.set("a", "1")
+
+    now[0] += 11
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_sqlite_cache_trims_the_oldest_writes_past_maxsize(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "cache.sqlite"), maxsize=3, sweep_every=1000)
+    for key in "abcde":
+        cache.set(key, key.upper())
+    cache.set("a", "A2")
+
+    assert len(cache) == 3
+    assert [cache.get(key) for key in "abcde"] == ["A2", None, None, "D", "E"]
+    assert cache.evictions == 3
+
+
+def test_sqlite_sweep_drops_expired_rows_without_reading_them(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    cache = SQLiteCache(str(tmp_path / "cache.sqlite"), ttl=10, sweep_every=3)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    now[0] += 11
+
+    cache.set("c", "3")
+
+    assert len(cache) == 1 and cache.evictions == 2
+
+
+def test_sqlite_tier_is_shared_across_processes(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    writer = (
+        "import sys; sys.path.insert(0, '.');"
+        "from utils.response_cache import SQLiteCache;"
+        f"SQLiteCache({path!r}).set('key', 'from another process')"
+    )
+    subprocess.run([sys.executable, "-c", writer], check=True, cwd=os.path.dirname(llm_controller.__file__))
+
+    memory = MemoryCache(maxsize=8, ttl=60)
+    cache = RecommendationCache([memory, SQLiteCache(path)])
+
+    assert cache.get("key") == "from another process"
+    # Promoted to the memory tier
+    assert memory.get("key") == "from another process"
+    assert cache.stats()["hits"] == 1
+
+
+def test_key_ignores_cosmetic_profile_differences(profile):
+    messy = profile._replace(gender="  female ", chronic_conditions="Diabetes, diabetes,")
+
+    assert make_cache_key(messy, "model", "scope") == make_cache_key(profile, "model", "scope")
+    assert make_cache_key(profile, "model", "other scope") != make_cache_key(profile, "model", "scope")
+
+
+@pytest.fixture
+def fresh_scopes():
+    prompt_template._cache_scope.cache_clear()
+    yield
+    prompt_template._cache_scope.cache_clear()
+
+
+def test_changed_prompt_misses_the_cache(stub_llm, profile, monkeypatch, fresh_scopes):
+    server = stub_llm()
+    cache = MemoryCache(maxsize=8, ttl=60)
+
+    assert llm_controller.get_recommendations(profile, cache=cache) == DEFAULT_REPLY
+    assert llm_controller.get_recommendations(profile, cache=cache) == DEFAULT_REPLY
+    assert server.requests == 1
+
+    monkeypatch.setattr(prompt_template, "SYSTEM_PROMPT", prompt_template.SYSTEM_PROMPT + " Be brief.")
+    prompt_template._cache_scope.cache_clear()
+    assert llm_controller.get_recommendations(profile, cache=cache) == DEFAULT_REPLY
+    assert server.requests == 2
+    assert len(cache) == 2
@@ -0,0 +1,129 @@
+import json
+import os
+
+import pytest
+
+from benchmarks.bench_risk_rules import if_chain
+from benchmarks.synthetic import generate_columns, generate_dataframe
+from data_models import UserData
+from profile_record import build_profile
+from risk_rules import RISK_RULES_PATH, RuleFile, RuleSetError, active_rules, compile_rules, load_rules
+
+
+def random_profiles(size, seed):
+    return [build_profile(**row) for row in generate_dataframe(size, seed=seed).to_dict("records")]
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_shipped_rules_match_the_original_if_chains(seed):
+    rules = load_rules(RISK_RULES_PATH)
+
+    for profile in random_profiles(1000, seed):
+        assert rules.assess_record(profile) == if_chain(profile)
+        score, code = rules.evaluate_record(profile)
+        assert (score, rules.decode(code)) == if_chain(profile)
+
+
+@pytest.mark.parametrize("age", [18, 30, 31, 50, 51, 120])
+def test_shipped_rules_match_if_chains_at_thresholds(profile, age):
+    edge = profile._replace(age=age)
+
+    assert active_rules().assess_record(edge) == if_chain(edge)
+
+
+def test_userdata_is_scored_like_a_profile_record(profile):
+    fields = {field: getattr(profile, field) for field in UserData.model_fields}
+    user_data = UserData(**{field: str(value) if hasattr(value, "value") else value for field, value in fields.items()})
+
+    assert active_rules().assess_record(user_data) == active_rules().assess_record(profile)
+
+
+CUSTOM_RULES = {
+    "version": 7,
+    "rules": [
+        {"name": "senior", "field": "age", "op": ">=", "value": 65, "points": 4, "explanation": "Senior."},
+        {"name": "low_income", "field": "annual_income", "op": "<", "value": 40000, "points": 2,
+         "explanation": "Low income."},
+        {"name": "risky_job", "field": "occupation", "op": "in", "value": ["Driver", "Farmer"], "points": 3,
+         "explanation": "Risky occupation."},
+        {"name": "family", "field": "family_health_history", "op": ">", "value": 0, "points_per_item": 1},
+        {"name": "young", "field": "age", "op": "<", "value": 25, "points": 1, "explanation": "Young."},
+        {"name": "not_good", "field": "health_status", "op": "!=", "value": "good", "points": 2},
+        {"name": "dependents", "field": "dependents", "op": ">=", "value": 3, "points": 1, "points_per_item": 1},
+    ],
+}
+
+
+def test_single_profile_path_matches_the_lookup_tables():
+    rules = compile_rules(CUSTOM_RULES)
+    columns = generate_columns(2000, seed=5)
+    profiles = random_profiles(2000, seed=5)
+
+    scores, codes = rules.evaluate(columns)
+    for index, profile in enumerate(profiles):
+        assert rules.evaluate_record(profile) == (scores[index], codes[index])
+        # Sentences follow file order even though the age rules are not adjacent
+        assert rules.assess_record(profile) == (scores[index], rules.decode(codes[index]))
+
+
+@pytest.mark.parametrize("rule, message", [
+    ({"name": "x", "field": "height", "op": ">", "value": 1}, "unknown field"),
+    ({"name": "x", "field": "age", "op": "=~", "value": 1}, "unknown operator"),
+    ({"name": "x", "field": "gender", "op": ">", "value": "Male"}, "compared with"),
+    ({"name": "x", "field": "age", "op": ">", "value": "50"}, "integers"),
+    ({"name": "x", "field": "occupation", "op": "in", "value": []}, "non-empty list"),
+])
+def test_rejects_malformed_rules(rule, message):
+    with pytest.raises(RuleSetError, match=message):
+        compile_rules({"version": 1, "rules": [rule]})
+
+
+def write_rules(path, document, stamp):
+    path.write_text(json.dumps(document) if isinstance(document, dict) else document, encoding="utf-8")
+    # Distinct modification times even on filesystems with coarse timestamps
+    os.utime(path, ns=(stamp, stamp))
+
+
+def test_rule_file_reloads_when_it_changes(tmp_path):
+    path = tmp_path / "rules.json"
+    write_rules(path, CUSTOM_RULES, 1_000_000_000)
+    rule_file = RuleFile(str(path), check_interval=0)
+    first = rule_file.current()
+
+    assert first.version == 7
+    assert rule_file.current() is first
+
+    write_rules(path, dict(CUSTOM_RULES, version=8), 2_000_000_000)
+    assert rule_file.current().version == 8
+
+
+def test_rule_file_keeps_previous_rules_when_a_reload_fails(tmp_path):
+    path = tmp_path / "rules.json"
+    write_rules(path, CUSTOM_RULES, 1_000_000_000)
+    rule_file = RuleFile(str(path), check_interval=0)
+    rule_file.current()
+
+    write_rules(path, '{"version": 9, "rules": [', 2_000_000_000)
+    assert rule_file.current().version == 7
+
+
+def test_rule_file_waits_for_the_check_interval(tmp_path):
+    path = tmp_path / "rules.json"
+    write_rules(path, CUSTOM_RULES, 1_000_000_000)
+    rule_file = RuleFile(str(path), check_interval=60)
+    rule_file.current()
+
+    write_rules(path, dict(CUSTOM_RULES, version=8), 2_000_000_000)
+    assert rule_file.current().version == 7
+
+
+def test_rule_file_retries_a_failed_first_load(tmp_path):
+    path = tmp_path / "rules.json"
+    write_rules(path, "not json", 1_000_000_000)
+    rule_file = RuleFile(str(path), check_interval=60)
+
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            rule_file.current()
+    write_rules(path, CUSTOM_RULES, 2_000_000_000)
+    assert rule_file.current().version == 7
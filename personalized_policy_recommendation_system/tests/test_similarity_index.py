@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from utils.similarity_index import SimilarRecommendations, SimilarityIndex, profile_vector
+
+
+@pytest.fixture
+def similar():
+    return SimilarRecommendations(max_distance=0.15)
+
+
+def test_cosmetic_and_small_differences_reuse_the_answer(similar, profile):
+    similar.add(profile, "model", "answer")
+
+    assert similar.lookup(profile._replace(gender=" female", chronic_conditions="Diabetes "), "model") == ("answer", 0.0)
+    recommendations, distance = similar.lookup(profile._replace(annual_income=86000.0), "model")
+    assert recommendations == "answer" and 0 < distance < 0.05
+
+
+@pytest.mark.parametrize("change", [
+    {"smoking_status": "Yes"},
+    {"gender": "Male"},
+    {"dependents": 3},
+    {"chronic_conditions": "asthma"},
+])
+def test_material_differences_miss(similar, profile, change):
+    similar.add(profile, "model", "answer")
+
+    assert similar.lookup(profile._replace(**change), "model") is None
+
+
+def test_matches_never_cross_a_risk_rule_threshold(similar, profile):
+    below, above = profile._replace(age=50), profile._replace(age=51)
+    assert np.linalg.norm(profile_vector(below) - profile_vector(above)) < similar.max_distance
+    similar.add(below, "model", "answer")
+
+    assert similar.lookup(below._replace(age=49), "model")[0] == "answer"
+    assert similar.lookup(above, "model") is None
+
+
+def test_answers_are_kept_per_model(similar, profile):
+    similar.add(profile, "model-a", "answer")
+
+    assert similar.lookup(profile, "model-b") is None
+
+
+def test_index_finds_near_neighbours_like_a_brute_force_search():
+    rng = np.random.default_rng(1)
+    stored = rng.uniform(0, 3, (5000, 16)).astype(np.float32)
+    index = SimilarityIndex(max_distance=0.1, dim=16)
+    index.add_many(stored[:4000], list(range(4000)))
+    for row in range(4000, 5000):
+        # Some single adds stay in the unsorted tail
+        index.add(stored[row], row)
+    queries = stored + rng.normal(0, 0.01, stored.shape).astype(np.float32)
+
+    found = [index.query(query) for query in queries]
+
+    assert sum(match is not None and match[0] == row for row, match in enumerate(found)) >= 0.95 * len(stored)
+    assert index.query(np.full(16, 10, dtype=np.float32)) is None
+
+
+def test_oldest_entries_are_dropped_past_max_entries():
+    index = SimilarityIndex(max_distance=0.1, dim=2, max_entries=100)
+    for value in range(150):
+        index.add(np.array([value, 0], dtype=np.float32), value)
+
+    assert len(index) <= 100
+    assert index.query(np.array([0, 0], dtype=np.float32)) is None
+    assert index.query(np.array([149, 0], dtype=np.float32)) == (149, 0.0)
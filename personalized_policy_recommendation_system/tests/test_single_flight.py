@@ -0,0 +1,186 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import llm_controller
+from metrics import LLM_COALESCED_REQUESTS
+from utils.single_flight import AsyncSingleFlight, SharedStreams, SingleFlight
+from utils.stub_llm_server import DEFAULT_REPLY
+
+
+def wait_until(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met in time")
+        time.sleep(0.005)
+
+
+def joined(mode, before, count):
+    return lambda: LLM_COALESCED_REQUESTS.value(mode=mode) >= before + count
+
+
+def test_single_flight_runs_once_per_key():
+    flight, release, calls = SingleFlight(), threading.Event(), []
+
+    def call(value):
+        calls.append(value)
+        release.wait(2)
+        return value * 2
+
+    before = LLM_COALESCED_REQUESTS.value(mode="sync")
+    with ThreadPoolExecutor(5) as pool:
+        leader = pool.submit(flight.do, "key", call, 21)
+        wait_until(lambda: flight.in_flight("key"))
+        followers = [pool.submit(flight.do, "key", call, 99) for _ in range(4)]
+        wait_until(joined("sync", before, 4))
+        release.set()
+        results = [leader.result()] + [follower.result() for follower in followers]
+
+    assert results == [42] * 5
+    assert calls == [21]
+    assert len(flight) == 0
+
+
+def test_single_flight_shares_errors_and_releases_key():
+    flight, release = SingleFlight(), threading.Event()
+
+    def fail():
+        release.wait(2)
+        raise ValueError("provider down")
+
+    before = LLM_COALESCED_REQUESTS.value(mode="sync")
+    with ThreadPoolExecutor(2) as pool:
+        leader = pool.submit(flight.do, "key", fail)
+        wait_until(lambda: flight.in_flight("key"))
+        follower = pool.submit(flight.do, "key", fail)
+        wait_until(joined("sync", before, 1))
+        release.set()
+        for future in (leader, follower):
+            with pytest.raises(ValueError):
+                future.result()
+
+    # A finished call is not reused: the next caller runs its own
+    assert flight.do("key", lambda: "again") == "again"
+
+
+def test_shared_stream_replays_from_first_chunk():
+    streams, release = SharedStreams(), threading.Event()
+
+    def produce():
+        yield "a"
+        release.wait(2)
+        yield "b"
+        yield "c"
+
+    first = streams.read("key", produce)
+    assert next(first) == "a"
+    second = streams.read("key", produce)
+    release.set()
+
+    assert list(first) == ["b", "c"]
+    assert list(second) == ["a", "b", "c"]
+    wait_until(lambda: len(streams) == 0)
+
+
+def test_shared_stream_finishes_without_readers():
+    streams, produced = SharedStreams(), []
+
+    def produce():
+        for chunk in "abc":
+            produced.append(chunk)
+            yield chunk
+
+    reader = streams.read("key", produce)
+    next(reader)
+    reader.close()
+
+    wait_until(lambda: not streams.in_flight("key"))
+    assert produced == ["a", "b", "c"]
+
+
+def test_shared_stream_raises_producer_error_to_every_reader():
+    streams, release = SharedStreams(), threading.Event()
+
+    def produce():
+        yield "a"
+        release.wait(2)
+        raise RuntimeError("stream broke")
+
+    readers = [streams.read("key", produce), streams.read("key", produce)]
+    release.set()
+    for reader in readers:
+        with pytest.raises(RuntimeError):
+            list(reader)
+
+
+def test_async_single_flight_shares_one_task():
+    calls = []
+
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "answer"
+
+    async def run():
+        flight = AsyncSingleFlight()
+        results = await asyncio.gather(*(flight.do("key", call) for _ in range(5)))
+        return results, len(flight)
+
+    results, remaining = asyncio.run(run())
+    assert results == ["answer"] * 5
+    assert calls == [1]
+    assert remaining == 0
+
+
+def test_async_cancelled_caller_does_not_cancel_shared_call():
+    async def call():
+        await asyncio.sleep(0.05)
+        return "answer"
+
+    async def run():
+        flight = AsyncSingleFlight()
+        cancelled = asyncio.ensure_future(flight.do("key", call))
+        follower = asyncio.ensure_future(flight.do("key", call))
+        await asyncio.sleep(0.01)
+        cancelled.cancel()
+        return await follower, cancelled.cancelled()
+
+    assert asyncio.run(run()) == ("answer", True)
+
+
+@pytest.fixture
+def stub_client(stub_llm):
+    return stub_llm(latency=0.2)
+
+
+def test_concurrent_identical_requests_make_one_call(stub_client, profile):
+    with ThreadPoolExecutor(4) as pool:
+        results = list(pool.map(lambda _: llm_controller.get_recommendations(profile), range(4)))
+
+    assert results == [DEFAULT_REPLY] * 4
+    assert stub_client.requests == 1
+
+
+def test_stream_joins_in_flight_blocking_call(stub_client, profile):
+    with ThreadPoolExecutor(1) as pool:
+        blocking = pool.submit(llm_controller.get_recommendations, profile)
+        wait_until(lambda: len(llm_controller.in_flight_calls) == 1)
+        streamed = "".join(llm_controller.stream_recommendations(profile))
+
+    assert streamed == blocking.result() == DEFAULT_REPLY
+    assert stub_client.requests == 1
+
+
+def test_blocking_call_joins_in_flight_stream(stub_client, profile):
+    with ThreadPoolExecutor(1) as pool:
+        streamed = pool.submit(lambda: "".join(llm_controller.stream_recommendations(profile)))
+        wait_until(lambda: len(llm_controller.in_flight_streams) == 1)
+        answer = llm_controller.get_recommendations(profile)
+
+    assert streamed.result() == answer
+    assert answer.strip() == DEFAULT_REPLY
+    assert stub_client.requests == 1
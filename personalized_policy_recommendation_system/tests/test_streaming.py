@@ -0,0 +1,81 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import llm_controller
+from llm_controller import BUSY_MESSAGE, RecommendationStreamError, get_recommendations, stream_recommendations
+from utils.rate_limiter import LLMRateLimiter
+from utils.response_cache import MemoryCache
+from utils.stub_llm_server import DEFAULT_REPLY
+
+
+def test_stream_yields_the_answer_and_caches_it(stub_llm, profile):
+    server = stub_llm()
+    cache = MemoryCache(maxsize=8, ttl=60)
+
+    assert "".join(stream_recommendations(profile, cache=cache)).strip() == DEFAULT_REPLY
+    assert "".join(stream_recommendations(profile, cache=cache)).strip() == DEFAULT_REPLY
+    assert server.requests == 1
+
+
+def test_call_starts_before_the_first_chunk_is_read(stub_llm, profile):
+    server = stub_llm(latency=0.1)
+
+    stream = stream_recommendations(profile)
+    time.sleep(0.3)
+
+    assert server.requests == 1
+    assert "".join(stream).strip() == DEFAULT_REPLY
+
+
+def test_failure_midway_raises_after_the_partial_answer(stub_llm, profile):
+    stub_llm(stream_error_after=2)
+    cache = MemoryCache(maxsize=8, ttl=60)
+    chunks = []
+
+    with pytest.raises(RecommendationStreamError, match="An unexpected error occurred"):
+        for chunk in stream_recommendations(profile, cache=cache):
+            chunks.append(chunk)
+    assert len(chunks) == 2
+    assert len(cache) == 0
+
+
+def test_failure_reaches_every_coalesced_reader(stub_llm, profile):
+    server = stub_llm(latency=0.2, stream_error_after=1)
+
+    def read(_):
+        try:
+            return "".join(stream_recommendations(profile))
+        except RecommendationStreamError as e:
+            return e
+
+    with ThreadPoolExecutor(3) as pool:
+        results = list(pool.map(read, range(3)))
+
+    assert all(isinstance(result, RecommendationStreamError) for result in results)
+    assert server.requests == 1
+
+
+def test_blocking_call_joining_a_failed_stream_returns_error_text(stub_llm, profile):
+    stub_llm(latency=0.2, stream_error_after=1)
+
+    with ThreadPoolExecutor(1) as pool:
+        stream = pool.submit(lambda: list(stream_recommendations(profile)))
+        while not len(llm_controller.in_flight_streams):
+            time.sleep(0.005)
+        answer = get_recommendations(profile)
+
+    assert llm_controller.is_error_response(answer)
+    with pytest.raises(RecommendationStreamError):
+        stream.result()
+
+
+def test_shed_stream_raises_busy_message(stub_llm, profile, monkeypatch):
+    server = stub_llm()
+    monkeypatch.setattr(llm_controller, "llm_rate_limiter", LLMRateLimiter(tokens_per_minute=10))
+
+    with pytest.raises(RecommendationStreamError) as error:
+        list(stream_recommendations(profile))
+    assert str(error.value) == BUSY_MESSAGE
+    assert server.requests == 0
@@ -0,0 +1,58 @@
+import pytest
+
+from benchmarks.synthetic import generate_dataframe
+from controller import calculate_risk_score
+from profile_record import MAX_AGE, MIN_AGE, MaritalStatus, YesNo, build_profile
+from what_if import contributions, rescore, sensitivity
+
+
+def profiles(size=60, seed=5):
+    return [build_profile(**row) for row in generate_dataframe(size, seed=seed).to_dict("records")]
+
+
+def changed(profile, **fields):
+    return build_profile(**{**profile._asdict(), **fields})
+
+
+def expected_change(profile, label):
+    """The profile a sensitivity() change label describes."""
+    conditions = list(profile.chronic_condition_list)
+    if label in ("Quit smoking", "Start smoking"):
+        return changed(profile, smoking_status="No" if label == "Quit smoking" else "Yes")
+    if label in ("Stop drinking", "Start drinking"):
+        return changed(profile, drinking_status="No" if label == "Stop drinking" else "Yes")
+    if label.startswith("Marital status: "):
+        return changed(profile, marital_status=label.split(": ", 1)[1])
+    if label.startswith("Without "):
+        conditions.remove(label[len("Without "):])
+        return changed(profile, chronic_conditions=", ".join(conditions))
+    assert label == "Add a chronic condition"
+    return changed(profile, chronic_conditions=", ".join(conditions + ["new condition"]))
+
+
+@pytest.mark.parametrize("profile", profiles())
+def test_contributions_add_up_to_the_risk_score(profile):
+    assert contributions(profile).total == calculate_risk_score(profile)
+
+
+@pytest.mark.parametrize("profile", profiles(20, seed=6))
+def test_sensitivity_matches_rescoring_each_scenario(profile):
+    analysis = sensitivity(profile)
+
+    assert analysis.base_score == calculate_risk_score(profile)
+    assert list(analysis.ages) == list(range(MIN_AGE, MAX_AGE + 1))
+    assert [int(score) for score in analysis.age_scores] == [
+        calculate_risk_score(changed(profile, age=age)) for age in analysis.ages]
+    for label, delta in zip(analysis.changes, analysis.deltas):
+        assert delta == calculate_risk_score(expected_change(profile, label)) - analysis.base_score, label
+
+
+def test_rescore_changes_several_fields_at_once():
+    for profile in profiles(30, seed=7):
+        base = contributions(profile)
+        target = changed(profile, age=70, smoking_status="Yes", drinking_status="No",
+                         marital_status=MaritalStatus.WIDOWED.value, chronic_conditions="a, b, c")
+
+        assert rescore(base, age=70, smoking_status=YesNo.YES, drinking_status=YesNo.NO,
+                       marital_status=MaritalStatus.WIDOWED, condition_count=3) == calculate_risk_score(target)
+        assert rescore(base) == base.total
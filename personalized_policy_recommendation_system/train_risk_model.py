@@ -0,0 +1,94 @@
+"""Train the health-risk model and export a versioned, sklearn-free artifact.
+
+    python train_risk_model.py --data profiles.csv --label high_risk
+
+The input (CSV or Parquet) needs the UserData columns read by risk_model.MODEL_FIELDS plus a
+0/1 label column. The fitted coefficients are written to models/health_risk_v<N>.json, which
+risk_model.HealthRiskModel scores with NumPy alone.
+"""
+import argparse
+import os
+from datetime import datetime, timezone
+
+import pandas as pd
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score, roc_auc_score
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+
+from risk_model import MODEL_DIR, MODEL_FIELDS, FEATURE_NAMES, HealthRiskModel, artifact_version, featurize, latest_artifact
+from logger import log_info
+
+
+def load_profiles(path):
+    """Read a labelled profile table from CSV or Parquet."""
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    return pd.read_csv(path, keep_default_na=False)
+
+
+def train(frame, label_column, test_size=0.2, seed=0):
+    """Fit a standardized logistic regression and return (sklearn model, scaler, holdout metrics)."""
+    missing = [field for field in MODEL_FIELDS + (label_column,) if field not in frame.columns]
+    if missing:
+        raise ValueError(f"Training data is missing columns: {missing}")
+
+    features = featurize({field: frame[field].to_numpy() for field in MODEL_FIELDS})
+    labels = frame[label_column].to_numpy().astype(int)
+    x_train, x_test, y_train, y_test = train_test_split(
+        features, labels, test_size=test_size, random_state=seed, stratify=labels
+    )
+
+    scaler = StandardScaler().fit(x_train)
+    classifier = LogisticRegression(max_iter=1000).fit(scaler.transform(x_train), y_train)
+
+    probabilities = classifier.predict_proba(scaler.transform(x_test))[:, 1]
+    metrics = {
+        "roc_auc": float(roc_auc_score(y_test, probabilities)),
+        "accuracy": float(accuracy_score(y_test, probabilities >= 0.5)),
+        "train_rows": int(len(y_train)),
+        "test_rows": int(len(y_test)),
+    }
+    return classifier, scaler, metrics
+
+
+def export(classifier, scaler, metrics, source, model_dir=MODEL_DIR):
+    """Write the next artifact version to model_dir and return its path."""
+    latest = latest_artifact(model_dir)
+    version = artifact_version(latest) + 1 if latest else 1
+    model = HealthRiskModel(
+        coefficients=classifier.coef_[0],
+        intercept=classifier.intercept_[0],
+        mean=scaler.mean_,
+        scale=scaler.scale_,
+        version=version,
+        feature_names=FEATURE_NAMES,
+        metadata={
+            "trained_at": datetime.now(timezone.utc).isoformat(),
+            "source": os.path.basename(source),
+            "metrics": metrics,
+        },
+    )
+    path = os.path.join(model_dir, f"health_risk_v{version}.json")
+    model.save(path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the health-risk model.")
+    parser.add_argument("--data", required=True, help="labelled CSV or Parquet file")
+    parser.add_argument("--label", default="high_risk", help="0/1 label column")
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--test-size", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    frame = load_profiles(args.data)
+    classifier, scaler, metrics = train(frame, args.label, args.test_size, args.seed)
+    path = export(classifier, scaler, metrics, args.data, args.model_dir)
+    log_info("Trained health-risk model saved to %s with metrics %s", path, metrics)
+    print(f"Saved {path}: ROC AUC {metrics['roc_auc']:.3f}, accuracy {metrics['accuracy']:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,30 @@
+from profile_record import Gender, MaritalStatus, YesNo, HealthStatus, MIN_AGE, MAX_AGE
+
+# Accepted option sets; frozenset membership is a single hash lookup
+GENDERS = frozenset(Gender)
+MARITAL_STATUSES = frozenset(MaritalStatus)
+YES_NO = frozenset(YesNo)
+HEALTH_STATUSES = frozenset(HealthStatus)
+
 def validate_age(age: int) -> bool:
     """Validate that the age is within the allowed range (18 to 120)."""
-    return 18 <= age <= 120
+    return MIN_AGE <= age <= MAX_AGE
 
 def validate_gender(gender: str) -> bool:
     """Validate that the gender is one of the accepted values."""
-    return gender in ["Male", "Female", "Other"]
+    return gender in GENDERS
 
 def validate_marital_status(marital_status: str) -> bool:
     """Validate that the marital status is one of the accepted values."""
-    return marital_status in ["Single", "Married", "Divorced", "Widowed"]
+    return marital_status in MARITAL_STATUSES
 
 def validate_smoking_status(smoking_status: str) -> bool:
     """Validate that the smoking status is either 'Yes' or 'No'."""
-    return smoking_status in ["Yes", "No"]
+    return smoking_status in YES_NO
 
 def validate_drinking_status(drinking_status: str) -> bool:
     """Validate that the drinking status is either 'Yes' or 'No'."""
-    return drinking_status in ["Yes", "No"]
+    return drinking_status in YES_NO
 
 def validate_chronic_conditions(chronic_conditions: str) -> bool:
     """Check if chronic conditions is a non-empty string. Comma-separated values are allowed."""
@@ -36,7 +44,7 @@ def validate_dependents(dependents: int) -> bool:
 
 def validate_health_status(health_status: str) -> bool:
     """Validate that the health status is one of the accepted values: 'good', 'fair', or 'poor'."""
-    return health_status in ["good", "fair", "poor"]
+    return health_status in HEALTH_STATUSES
 
 def validate_family_health_history(family_health_history: str) -> bool:
     """Check if family health history is a string, comma-separated values allowed."""
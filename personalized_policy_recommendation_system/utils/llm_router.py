@@ -0,0 +1,327 @@
+"""Latency-aware routing of chat completions across several OpenAI-compatible backends.
+
+LLMRouter exposes the same `chat.completions.create(...)` call as the Groq and OpenAI clients, so
+it can stand in the `clients` registry. Each call goes to the healthy backend with the lowest
+rolling median latency (penalized by its error rate). A failed call fails over to the next
+backend; a call still running after the hedge delay gets a second, parallel request to the next
+backend and the first successful response wins. A backend whose calls keep failing is taken out
+of rotation by its circuit breaker until a cooldown passes.
+
+Latency is tracked separately for full completions and for streams (time to first chunk), so the
+two kinds of call are ranked on their own numbers and hedge delays come from completions only.
+A hedged request is an extra provider call, so with a rate limiter it goes out only when the
+limiter has room for it right away.
+"""
+import collections
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from types import SimpleNamespace
+
+from logger import log_info, log_warning
+from metrics import LLM_BACKEND_REQUESTS, LLM_BACKEND_SECONDS, LLM_HEDGED_REQUESTS
+from utils.prompt_template import count_message_tokens
+
+# Latency of full completions, and of streams up to their first chunk
+COMPLETION, STREAM = "completion", "stream"
+
+
+class NoHealthyBackendError(Exception):
+    """Raised when every backend's circuit breaker is open."""
+
+
+class LatencyTracker:
+    """Rolling latency percentiles and error rate over a backend's recent calls.
+
+    Keeps at most `window` calls and forgets calls older than `max_age` seconds, so a backend that
+    was slow or failing earlier gets routed to again once that history expires.
+    """
+
+    def __init__(self, window: int = 200, max_age: float = 300.0):
+        self.max_age = max_age
+        self._calls = collections.deque(maxlen=window)  # (monotonic time, seconds, ok)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, ok: bool):
+        with self._lock:
+            self._calls.append((time.monotonic(), seconds, ok))
+
+    def _recent(self):
+        with self._lock:
+            cutoff = time.monotonic() - self.max_age
+            while self._calls and self._calls[0][0] < cutoff:
+                self._calls.popleft()
+            return list(self._calls)
+
+    def percentile(self, fraction: float):
+        """Latency at `fraction` (0-1) of successful calls, or None without any."""
+        latencies = sorted(seconds for _, seconds, ok in self._recent() if ok)
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))]
+
+    @property
+    def samples(self) -> int:
+        return len(self._recent())
+
+    @property
+    def error_rate(self) -> float:
+        calls = self._recent()
+        return sum(not ok for _, _, ok in calls) / len(calls) if calls else 0.0
+
+
+class CircuitBreaker:
+    """Closed -> open after `failure_threshold` consecutive failures -> half-open after `cooldown`.
+
+    While half-open a single trial call is let through; its success closes the breaker and its
+    failure re-opens it for another cooldown.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int = 5, cooldown: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        """Whether allow() would currently let a call through, without claiming a trial slot."""
+        with self._lock:
+            if self.state == self.OPEN:
+                return time.monotonic() - self._opened_at >= self.cooldown
+            return self.state == self.CLOSED or not self._trial_running
+
+    def allow(self) -> bool:
+        """Permission for one call; in half-open state only the first caller gets it."""
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.cooldown:
+                self.state = self.HALF_OPEN
+                self._trial_running = False
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record(self, ok: bool):
+        with self._lock:
+            if ok:
+                self.state = self.CLOSED
+                self._failures = 0
+            else:
+                self._failures += 1
+                if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                    self.state = self.OPEN
+                    self._opened_at = time.monotonic()
+            self._trial_running = False
+
+
+class Backend:
+    """One provider: a lazily built client plus its latency tracker and circuit breaker.
+
+    `model`, when set, replaces the requested model name (e.g. a local server serving the same
+    model under another name).
+    """
+
+    def __init__(self, name, factory, model=None, failure_threshold=5, cooldown=30.0, window=200):
+        self.name = name
+        self.model = model
+        self.trackers = {COMPLETION: LatencyTracker(window), STREAM: LatencyTracker(window)}
+        self.breaker = CircuitBreaker(failure_threshold, cooldown)
+        self._factory = factory
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._factory()
+        return self._client
+
+    def score(self, kind=COMPLETION) -> float:
+        """Routing cost for a kind of call: median latency inflated by error rate; untried backends cost nothing."""
+        tracker = self.trackers[kind]
+        median = tracker.percentile(0.5)
+        if median is None:
+            return float("inf") if tracker.samples else 0.0
+        return median * (1 + 4 * tracker.error_rate)
+
+    def record(self, seconds: float, ok: bool, kind=COMPLETION):
+        self.trackers[kind].record(seconds, ok)
+        self.breaker.record(ok)
+        LLM_BACKEND_REQUESTS.inc(backend=self.name, outcome="ok" if ok else "error")
+        if ok:
+            LLM_BACKEND_SECONDS.observe(seconds, backend=self.name, kind=kind)
+
+    def create(self, **kwargs):
+        """Call the backend and record the outcome."""
+        if self.model:
+            kwargs["model"] = self.model
+        start = time.perf_counter()
+        try:
+            response = self.client.chat.completions.create(**kwargs)
+        except Exception:
+            self.record(time.perf_counter() - start, ok=False)
+            raise
+        self.record(time.perf_counter() - start, ok=True)
+        return response
+
+    def stats(self) -> dict:
+        completions, streams = self.trackers[COMPLETION], self.trackers[STREAM]
+        return {
+            "state": self.breaker.state,
+            "p50": completions.percentile(0.5),
+            "p95": completions.percentile(0.95),
+            "error_rate": completions.error_rate,
+            "samples": completions.samples,
+            "stream_first_chunk_p50": streams.percentile(0.5),
+            "stream_error_rate": streams.error_rate,
+            "stream_samples": streams.samples,
+        }
+
+
+class LLMRouter:
+    """Drop-in chat client that routes each call across `backends`; see the module docstring.
+
+    hedge_after: seconds before the hedged second request, or "p95" to use the primary backend's
+    rolling p95 (falling back to `default_hedge_after` until it has `min_samples` calls). None
+    disables hedging.
+    rate_limiter: an LLMRateLimiter that hedged requests must pass without waiting, or None.
+    """
+
+    def __init__(self, backends, hedge_after="p95", default_hedge_after=5.0, min_samples=20, max_workers=16,
+                 rate_limiter=None):
+        if not backends:
+            raise ValueError("LLMRouter needs at least one backend.")
+        self.backends = list(backends)
+        self.rate_limiter = rate_limiter
+        self.hedge_after = hedge_after
+        self.default_hedge_after = default_hedge_after
+        self.min_samples = min_samples
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-router")
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def ranked(self, kind=COMPLETION):
+        """Backends whose breakers would allow a call, fastest first for that kind of call."""
+        ranked = sorted(self.backends, key=lambda backend: backend.score(kind))
+        return [backend for backend in ranked if backend.breaker.available()]
+
+    def _hedge_delay(self, backend):
+        if self.hedge_after is None:
+            return None
+        if self.hedge_after == "p95":
+            tracker = backend.trackers[COMPLETION]
+            if tracker.samples < self.min_samples:
+                return self.default_hedge_after
+            return tracker.percentile(0.95) or self.default_hedge_after
+        return float(self.hedge_after)
+
+    def _admit_hedge(self, kwargs) -> bool:
+        """Take the hedged request's share of the rate limit, if it is available right now."""
+        if self.rate_limiter is None:
+            return True
+        tokens = count_message_tokens(kwargs.get("messages", ())) + (kwargs.get("max_tokens") or 0)
+        return self.rate_limiter.try_acquire(tokens)
+
+    def create(self, **kwargs):
+        """chat.completions.create on the best backend, with failover and hedging."""
+        stream = bool(kwargs.get("stream"))
+        candidates = self.ranked(STREAM if stream else COMPLETION)
+        if not candidates:
+            raise NoHealthyBackendError("Every LLM backend's circuit breaker is open.")
+        if stream:
+            return RoutedStream(candidates, kwargs)
+        return self._complete(candidates, kwargs)
+
+    def _complete(self, candidates, kwargs):
+        remaining = collections.deque(candidates)
+        pending = {}
+        last_error = None
+        hedge_delay = self._hedge_delay(remaining[0])
+
+        def launch():
+            # Breaker permission is claimed only for the backend actually called
+            while remaining:
+                backend = remaining.popleft()
+                if backend.breaker.allow():
+                    pending[self._executor.submit(backend.create, **kwargs)] = backend
+                    return
+
+        launch()
+        if not pending:
+            raise NoHealthyBackendError("Every LLM backend's circuit breaker is open.")
+        while pending:
+            # Only the first in-flight request may be hedged; after that, wait for any result
+            timeout = hedge_delay if remaining and len(pending) == 1 and hedge_delay is not None else None
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                slow = list(pending.values())[0].name
+                if not self._admit_hedge(kwargs):
+                    LLM_HEDGED_REQUESTS.inc(outcome="rate_limited")
+                    log_info("LLM backend %s slower than %.2fs; not hedging, the rate limit is reached.", slow, hedge_delay)
+                    hedge_delay = None
+                    continue
+                LLM_HEDGED_REQUESTS.inc(outcome="sent")
+                log_info("LLM backend %s slower than %.2fs; hedging on %s.", slow, hedge_delay, remaining[0].name)
+                launch()
+                continue
+            for future in done:
+                backend = pending.pop(future)
+                try:
+                    return future.result()
+                except Exception as e:
+                    last_error = e
+                    log_warning("LLM backend %s failed: %r", backend.name, e)
+            if not pending and remaining:
+                launch()
+        raise last_error
+
+    def stats(self) -> dict:
+        """Per-backend breaker state, p50/p95 latency, error rate and sample count."""
+        return {backend.name: backend.stats() for backend in self.backends}
+
+
+class RoutedStream:
+    """Iterates a streamed completion, failing over to the next backend until the first chunk arrives.
+
+    Hedging does not apply to streams; the backend's latency is recorded as its time to first chunk.
+    """
+
+    def __init__(self, candidates, kwargs):
+        self._candidates = candidates
+        self._kwargs = kwargs
+
+    def __iter__(self):
+        last_error = NoHealthyBackendError("Every LLM backend's circuit breaker is open.")
+        for backend in self._candidates:
+            if not backend.breaker.allow():
+                continue
+            kwargs = dict(self._kwargs, model=backend.model) if backend.model else self._kwargs
+            start = time.perf_counter()
+            started = False
+            try:
+                for chunk in backend.client.chat.completions.create(**kwargs):
+                    if not started:
+                        started = True
+                        backend.record(time.perf_counter() - start, ok=True, kind=STREAM)
+                    yield chunk
+            except Exception as e:
+                if started:
+                    # Part of the answer was already yielded; switching backends would repeat it
+                    backend.breaker.record(False)
+                    raise
+                backend.record(time.perf_counter() - start, ok=False, kind=STREAM)
+                log_warning("LLM backend %s failed to stream: %r", backend.name, e)
+                last_error = e
+                continue
+            if not started:
+                backend.record(time.perf_counter() - start, ok=True, kind=STREAM)
+            return
+        raise last_error
@@ -0,0 +1,175 @@
+"""Prompt construction and token budgeting for recommendation requests.
+
+Templates are parsed once at import. Profiles are encoded as a single compact line that skips
+empty fields, and each request tier caps the completion length (and tells the model how much to
+write, so answers end inside the budget instead of being cut off). JSON mode asks for a fixed
+schema that parse_policies turns into Policy records.
+"""
+import functools
+import hashlib
+import json
+import math
+import string
+from typing import NamedTuple
+
+from config.llm_config import LLM_CONTEXT_WINDOW, LLM_RESPONSE_TIER
+
+SYSTEM_PROMPT = "Generate personalized insurance policy recommendations."
+JSON_SYSTEM_PROMPT = (
+    f"{SYSTEM_PROMPT} Reply with JSON only, in the form "
+    '{"policies": [{"name": "...", "type": "...", "reason": "..."}]}.'
+)
+
+# Short labels keep the encoded profile a few dozen tokens long
+FIELD_LABELS = (
+    ("age", "Age"),
+    ("gender", "Gender"),
+    ("marital_status", "Marital"),
+    ("smoking_status", "Smoker"),
+    ("drinking_status", "Drinks"),
+    ("chronic_conditions", "Conditions"),
+    ("annual_income", "Income"),
+    ("occupation", "Occupation"),
+    ("dependents", "Dependents"),
+    ("health_status", "Health"),
+    ("family_health_history", "Family history"),
+)
+
+
+class Tier(NamedTuple):
+    """Completion budget and the matching length instruction for one request tier."""
+    max_tokens: int
+    instructions: str
+
+
+TIERS = {
+    "brief": Tier(256, "List up to 3 policies, one line each."),
+    "standard": Tier(512, "Recommend up to 5 policies with one sentence of reasoning each."),
+    "detailed": Tier(1000, "Recommend suitable policies and explain each choice."),
+}
+DEFAULT_TIER = LLM_RESPONSE_TIER
+
+# Used when tiktoken is not installed; close to the average for English prompt text
+CHARS_PER_TOKEN = 4
+
+
+class PromptTemplate:
+    """A str.format template parsed once into literal text and field names."""
+
+    def __init__(self, source: str):
+        self.source = source
+        self._parts = [(literal, field) for literal, field, _, _ in string.Formatter().parse(source)]
+
+    def render(self, **values) -> str:
+        out = []
+        for literal, field in self._parts:
+            out.append(literal)
+            if field is not None:
+                out.append(str(values[field]))
+        return "".join(out)
+
+
+user_prompt = PromptTemplate("Customer: {profile}\n{instructions}")
+
+
+def encode_profile(user_data) -> str:
+    """One-line 'Label: value; ...' encoding of a UserData-like profile, without empty fields."""
+    parts = []
+    for field, label in FIELD_LABELS:
+        value = getattr(user_data, field)
+        if value is None or value == "":
+            continue
+        if field == "annual_income":
+            value = f"{float(value):.0f}"
+        parts.append(f"{label}: {value}")
+    return "; ".join(parts)
+
+
+@functools.lru_cache(maxsize=1)
+def _tiktoken_encoding():
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text: str) -> int:
+    """Token count from tiktoken when installed, otherwise a character-based estimate."""
+    encoding = _tiktoken_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def count_message_tokens(messages) -> int:
+    """Tokens of a chat request, including a few per message for role framing."""
+    return sum(count_tokens(message["content"]) + 4 for message in messages)
+
+
+def budget_max_tokens(tier: str, prompt_tokens: int, context_window: int = LLM_CONTEXT_WINDOW) -> int:
+    """The tier's completion budget, reduced if the prompt leaves less room in the context window."""
+    return max(1, min(TIERS[tier].max_tokens, context_window - prompt_tokens))
+
+
+class PromptRequest(NamedTuple):
+    """Everything needed to send one recommendation request."""
+    messages: list
+    max_tokens: int
+    prompt_tokens: int
+    response_format: dict
+    cache_scope: str
+
+
+@functools.lru_cache(maxsize=None)
+def _cache_scope(tier: str, json_output: bool) -> str:
+    """Stable id of the prompt wording; cached answers are only reused under the same prompt."""
+    system = JSON_SYSTEM_PROMPT if json_output else SYSTEM_PROMPT
+    wording = "\n".join((system, user_prompt.source, TIERS[tier].instructions))
+    return hashlib.sha256(wording.encode("utf-8")).hexdigest()[:16]
+
+
+def prompt_version(tier: str = DEFAULT_TIER, json_output: bool = False) -> str:
+    """Id of the prompt wording a tier is sent with, for recording alongside stored answers."""
+    return _cache_scope(tier, json_output)
+
+
+def build_request(user_data, tier: str = DEFAULT_TIER, json_output: bool = False) -> PromptRequest:
+    """Messages, completion budget and cache scope for a profile."""
+    if tier not in TIERS:
+        raise ValueError(f"Unknown tier {tier!r}; expected one of {', '.join(TIERS)}.")
+    messages = [
+        {"role": "system", "content": JSON_SYSTEM_PROMPT if json_output else SYSTEM_PROMPT},
+        {"role": "user", "content": user_prompt.render(profile=encode_profile(user_data), instructions=TIERS[tier].instructions)},
+    ]
+    prompt_tokens = count_message_tokens(messages)
+    return PromptRequest(
+        messages=messages,
+        max_tokens=budget_max_tokens(tier, prompt_tokens),
+        prompt_tokens=prompt_tokens,
+        response_format={"type": "json_object"} if json_output else None,
+        cache_scope=_cache_scope(tier, json_output),
+    )
+
+
+class Policy(NamedTuple):
+    """One recommended policy from a JSON-mode response."""
+    name: str
+    type: str
+    reason: str
+
+
+class PolicyParseError(ValueError):
+    """Raised when a JSON-mode response does not match the policy schema."""
+
+
+def parse_policies(text: str) -> list:
+    """Parse a JSON-mode response into Policy records."""
+    try:
+        payload = json.loads(text)
+        return [
+            Policy(str(item["name"]), str(item.get("type", "")), str(item.get("reason", "")))
+            for item in payload["policies"]
+        ]
+    except (json.JSONDecodeError, KeyError, TypeError, AttributeError) as e:
+        raise PolicyParseError(f"Response is not a policy list: {e!r}; got {str(text)[:200]!r}") from e
@@ -0,0 +1,152 @@
+"""Process-wide admission control for LLM calls: request and token buckets in front of the provider.
+
+Providers limit both requests per minute and tokens per minute, and answer with 429s once either is
+exceeded. LLMRateLimiter keeps a bucket for each and admits a call only when both have room for
+it, so load is queued (or shed) locally instead of being rejected by the provider.
+
+Admission is by reservation: a call that cannot go now takes its share from the buckets anyway,
+driving them into debt, and sleeps until the debt is repaid. Waiters are therefore served in
+arrival order, and the time a new call would wait is known up front. A call is shed with
+RateLimitExceeded when that wait is longer than `max_wait` or `max_queue` calls are already waiting.
+"""
+import asyncio
+import threading
+import time
+
+from metrics import LLM_RATE_LIMIT_QUEUE_DEPTH, LLM_RATE_LIMIT_SHED, LLM_RATE_LIMIT_WAIT_SECONDS
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a call is shed instead of queued."""
+
+    def __init__(self, message, wait=None):
+        super().__init__(message)
+        self.wait = wait
+
+
+class TokenBucket:
+    """`capacity` units refilled at `rate` per second; the level may go negative to reserve future units."""
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.level = capacity
+        self._updated = time.monotonic()
+
+    def refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_for(self, amount) -> float:
+        """Seconds until `amount` units are available, after the reservations already made."""
+        return max(0.0, (amount - self.level) / self.rate)
+
+
+class LLMRateLimiter:
+    """Requests-per-minute and tokens-per-minute limits shared by every LLM call in the process.
+
+    A limit of 0 turns that bucket off. Buckets start full, so up to a minute's quota can go out at
+    once; `burst` (a fraction of a minute's quota) makes the start smoother.
+    """
+
+    def __init__(self, requests_per_minute=0, tokens_per_minute=0, max_queue=100, max_wait=30.0, burst=1.0):
+        self.buckets = {}
+        if requests_per_minute:
+            self.buckets["requests"] = TokenBucket(max(1.0, requests_per_minute * burst), requests_per_minute / 60)
+        if tokens_per_minute:
+            self.buckets["tokens"] = TokenBucket(max(1.0, tokens_per_minute * burst), tokens_per_minute / 60)
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.waiting = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.buckets)
+
+    def _reserve(self, tokens):
+        """Take the call's share from every bucket; return how long the caller must wait."""
+        amounts = {"requests": 1, "tokens": tokens}
+        with self._lock:
+            now = time.monotonic()
+            wait = 0.0
+            for name, bucket in self.buckets.items():
+                bucket.refill(now)
+                if amounts[name] > bucket.capacity:
+                    LLM_RATE_LIMIT_SHED.inc(reason="too_large")
+                    raise RateLimitExceeded(f"A call of {amounts[name]} {name} exceeds the per-minute limit.")
+                wait = max(wait, bucket.wait_for(amounts[name]))
+            if wait > 0:
+                if self.waiting >= self.max_queue:
+                    LLM_RATE_LIMIT_SHED.inc(reason="queue_full")
+                    raise RateLimitExceeded(f"{self.waiting} LLM calls are already waiting.", wait)
+                if wait > self.max_wait:
+                    LLM_RATE_LIMIT_SHED.inc(reason="wait_too_long")
+                    raise RateLimitExceeded(f"LLM call would wait {wait:.1f}s for the rate limit.", wait)
+                self.waiting += 1
+                LLM_RATE_LIMIT_QUEUE_DEPTH.set(self.waiting)
+            for name, bucket in self.buckets.items():
+                bucket.level -= amounts[name]
+        LLM_RATE_LIMIT_WAIT_SECONDS.observe(wait)
+        return wait
+
+    def _done_waiting(self):
+        with self._lock:
+            self.waiting -= 1
+            LLM_RATE_LIMIT_QUEUE_DEPTH.set(self.waiting)
+
+    def acquire(self, tokens=0) -> float:
+        """Block until a call using `tokens` tokens may go; returns the seconds waited."""
+        if not self.buckets:
+            return 0.0
+        wait = self._reserve(tokens)
+        if wait > 0:
+            try:
+                time.sleep(wait)
+            finally:
+                self._done_waiting()
+        return wait
+
+    async def acquire_async(self, tokens=0) -> float:
+        """acquire() for asyncio callers; sleeps without blocking the event loop."""
+        if not self.buckets:
+            return 0.0
+        wait = self._reserve(tokens)
+        if wait > 0:
+            try:
+                await asyncio.sleep(wait)
+            finally:
+                self._done_waiting()
+        return wait
+
+    def try_acquire(self, tokens=0) -> bool:
+        """Take a call's share only if every bucket has it now; never waits, queues or counts as shed."""
+        if not self.buckets:
+            return True
+        amounts = {"requests": 1, "tokens": tokens}
+        with self._lock:
+            now = time.monotonic()
+            for name, bucket in self.buckets.items():
+                bucket.refill(now)
+                if bucket.level < amounts[name]:
+                    return False
+            for name, bucket in self.buckets.items():
+                bucket.level -= amounts[name]
+        return True
+
+    def refund(self, tokens):
+        """Return tokens reserved but not used, e.g. max_tokens beyond the actual completion."""
+        bucket = self.buckets.get("tokens")
+        if bucket is None or tokens <= 0:
+            return
+        with self._lock:
+            bucket.refill(time.monotonic())
+            bucket.level = min(bucket.capacity, bucket.level + tokens)
+
+    def stats(self) -> dict:
+        """Current queue depth and the units available in each bucket (negative while in debt)."""
+        with self._lock:
+            now = time.monotonic()
+            for bucket in self.buckets.values():
+                bucket.refill(now)
+            return {"waiting": self.waiting, **{name: round(bucket.level, 1) for name, bucket in self.buckets.items()}}
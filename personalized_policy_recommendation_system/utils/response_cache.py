@@ -0,0 +1,244 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Free-text fields that hold comma-separated lists; order and duplicates don't change the meaning.
+LIST_FIELDS = ("chronic_conditions", "family_health_history")
+
+# Every UserData field that ends up in the prompt, in a fixed order.
+KEY_FIELDS = (
+    "age",
+    "gender",
+    "marital_status",
+    "smoking_status",
+    "drinking_status",
+    "chronic_conditions",
+    "annual_income",
+    "occupation",
+    "dependents",
+    "health_status",
+    "family_health_history",
+)
+
+
+def _normalize_text(value: str) -> str:
+    """Collapse whitespace and case so cosmetic differences hash the same."""
+    return " ".join(str(value).split()).casefold()
+
+
+def _normalize_list(value: str) -> list:
+    """Split a comma-separated field into a sorted, de-duplicated list of normalized items."""
+    items = {_normalize_text(item) for item in str(value).split(",")}
+    items.discard("")
+    return sorted(items)
+
+
+def normalize_user_data(user_data) -> dict:
+    """Return the canonical form of a UserData-like object used for cache keys."""
+    normalized = {}
+    for field in KEY_FIELDS:
+        value = getattr(user_data, field)
+        if field in LIST_FIELDS:
+            normalized[field] = _normalize_list(value)
+        elif isinstance(value, str):
+            normalized[field] = _normalize_text(value)
+        elif field == "annual_income":
+            normalized[field] = float(value)
+        else:
+            normalized[field] = int(value)
+    return normalized
+
+
+def profile_hash(user_data) -> str:
+    """Hash of the normalized profile alone; equal for profiles that differ only cosmetically."""
+    canonical = json.dumps(normalize_user_data(user_data), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def make_cache_key(user_data, model: str, system_prompt: str) -> str:
+    """Hash the normalized profile together with the model and system prompt."""
+    payload = {
+        "model": model,
+        "system_prompt": system_prompt,
+        "profile": normalize_user_data(user_data),
+    }
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class MemoryCache:
+    """Thread-safe in-memory LRU cache with a per-entry time to live."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached value, or None when missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                self.evictions += 1
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        """Store a value, evicting the least recently used entries past maxsize."""
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteCache:
+    """On-disk cache tier backed by SQLite so entries survive restarts.
+
+    Expired rows are swept, and the oldest writes trimmed past maxsize, every `sweep_every` writes
+    (or sooner once the table may have outgrown maxsize), so the file stays bounded.
+    """
+
+    def __init__(self, path: str, ttl: float = 86400, maxsize: int = 100_000, sweep_every: int = 256):
+        self.path = path
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.sweep_every = sweep_every
+        self.evictions = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS recommendation_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS recommendation_cache_expires ON recommendation_cache (expires_at)"
+        )
+        # Upper bound on the row count (replacing a key counts as a new row); corrected by each sweep
+        self._size = self._conn.execute("SELECT COUNT(*) FROM recommendation_cache").fetchone()[0]
+        self._writes = 0
+        with self._lock:
+            self._sweep()
+
+    def get(self, key):
+        """Return the cached value, or None when missing or expired."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM recommendation_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, expires_at = row
+            if expires_at is not None and expires_at <= time.time():
+                self._conn.execute("DELETE FROM recommendation_cache WHERE key = ?", (key,))
+                self.evictions += 1
+                return None
+            return value
+
+    def set(self, key, value):
+        """Insert or replace an entry, sweeping expired and excess rows periodically."""
+        expires_at = time.time() + self.ttl if self.ttl else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO recommendation_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, expires_at),
+            )
+            self._writes += 1
+            self._size += 1
+            if self._writes % self.sweep_every == 0 or self._size > self.maxsize:
+                self._sweep()
+
+    def _sweep(self):
+        """Delete expired rows, then the oldest writes beyond maxsize; the caller holds the lock."""
+        removed = self._conn.execute(
+            "DELETE FROM recommendation_cache WHERE expires_at <= ?", (time.time(),)
+        ).rowcount
+        self._size = self._conn.execute("SELECT COUNT(*) FROM recommendation_cache").fetchone()[0]
+        excess = self._size - self.maxsize
+        if excess > 0:
+            # INSERT OR REPLACE gives a rewritten key a new rowid, so the lowest rowids are the oldest writes
+            removed += self._conn.execute(
+                "DELETE FROM recommendation_cache WHERE rowid IN "
+                "(SELECT rowid FROM recommendation_cache ORDER BY rowid LIMIT ?)", (excess,)
+            ).rowcount
+            self._size -= excess
+        self.evictions += removed
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self._conn.execute("DELETE FROM recommendation_cache")
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM recommendation_cache").fetchone()[0]
+
+
+class RecommendationCache:
+    """Tiered recommendation cache; tiers are checked in order and hits are copied to faster tiers."""
+
+    def __init__(self, tiers):
+        self.tiers = list(tiers)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Look the key up in each tier, promoting lower-tier hits."""
+        for index, tier in enumerate(self.tiers):
+            value = tier.get(key)
+            if value is not None:
+                for faster in self.tiers[:index]:
+                    faster.set(key, value)
+                with self._lock:
+                    self.hits += 1
+                return value
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key, value):
+        """Write the value through to every tier."""
+        for tier in self.tiers:
+            tier.set(key, value)
+
+    def clear(self):
+        """Empty every tier."""
+        for tier in self.tiers:
+            tier.clear()
+
+    def stats(self) -> dict:
+        """Return hit/miss/eviction counters for monitoring."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": sum(tier.evictions for tier in self.tiers),
+            "entries": [len(tier) for tier in self.tiers],
+        }
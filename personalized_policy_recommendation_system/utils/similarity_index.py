@@ -0,0 +1,220 @@
+"""Near-duplicate profile lookup for reusing earlier recommendations.
+
+Profiles are embedded into one weighted vector: scaled numeric fields, one-hot categorical fields
+and hashed character-trigram embeddings of the free-text fields (CPU only, no model download).
+Weights are chosen so that Euclidean distance reads as "how different is this customer": a
+different smoking status, gender or dependent count is at least 1.0 away, while a few hundred
+dollars of income or a misspelt occupation is a few hundredths. SimilarityIndex finds the nearest
+stored profile with p-stable LSH (E2LSH) and only returns it within `max_distance`.
+
+SimilarRecommendations also keys its indexes on the risk-rule signature, so a near match never
+crosses a rule threshold (age 49 and 51 are 0.1 apart, but the age > 50 rule scores them apart).
+"""
+import functools
+import math
+import threading
+import zlib
+
+import numpy as np
+
+from profile_record import Gender, HealthStatus, MaritalStatus, YesNo
+from utils.response_cache import LIST_FIELDS, normalize_user_data
+
+CATEGORICAL_FIELDS = {
+    "gender": tuple(member.value.casefold() for member in Gender),
+    "marital_status": tuple(member.value.casefold() for member in MaritalStatus),
+    "smoking_status": tuple(member.value.casefold() for member in YesNo),
+    "drinking_status": tuple(member.value.casefold() for member in YesNo),
+    "health_status": tuple(member.value.casefold() for member in HealthStatus),
+}
+TEXT_FIELDS = ("chronic_conditions", "occupation", "family_health_history")
+
+# Distance contributed per unit of each feature
+AGE_WEIGHT = 1 / 20  # per year
+INCOME_WEIGHT = 1.0  # per unit of log income, i.e. about 0.1 per 10%
+DEPENDENTS_WEIGHT = 1.0  # per dependent
+CATEGORY_WEIGHT = 1.0  # a mismatch moves two one-hot entries, so it costs sqrt(2)
+TEXT_WEIGHTS = {"chronic_conditions": 0.5, "occupation": 0.25, "family_health_history": 0.5}
+
+TEXT_DIM = 32
+NGRAM = 3
+
+VECTOR_DIM = 3 + sum(len(options) for options in CATEGORICAL_FIELDS.values()) + TEXT_DIM * len(TEXT_FIELDS)
+
+
+@functools.lru_cache(maxsize=65536)
+def embed_text(text: str) -> np.ndarray:
+    """Unit-length hashed character-trigram vector of normalized text; zeros for empty text."""
+    vector = np.zeros(TEXT_DIM, dtype=np.float32)
+    padded = f" {text} "
+    for start in range(max(len(padded) - NGRAM + 1, 0)):
+        digest = zlib.crc32(padded[start:start + NGRAM].encode("utf-8"))
+        # The top bit picks a sign so unrelated trigrams tend to cancel instead of pile up
+        vector[digest % TEXT_DIM] += 1.0 if digest & 0x80000000 else -1.0
+    norm = np.linalg.norm(vector)
+    if text and norm:
+        vector /= norm
+    vector.flags.writeable = False
+    return vector
+
+
+def profile_vector(user_data) -> np.ndarray:
+    """Weighted feature vector of a UserData-like profile; see the module docstring."""
+    profile = normalize_user_data(user_data)
+    vector = np.zeros(VECTOR_DIM, dtype=np.float32)
+    vector[0] = profile["age"] * AGE_WEIGHT
+    vector[1] = math.log1p(max(profile["annual_income"], 0.0)) * INCOME_WEIGHT
+    vector[2] = profile["dependents"] * DEPENDENTS_WEIGHT
+    offset = 3
+    for field, options in CATEGORICAL_FIELDS.items():
+        if profile[field] in options:
+            vector[offset + options.index(profile[field])] = CATEGORY_WEIGHT
+        offset += len(options)
+    for field in TEXT_FIELDS:
+        text = ", ".join(profile[field]) if field in LIST_FIELDS else profile[field]
+        vector[offset:offset + TEXT_DIM] = embed_text(text) * TEXT_WEIGHTS[field]
+        offset += TEXT_DIM
+    return vector
+
+
+class SimilarityIndex:
+    """Approximate nearest-neighbour index over profile vectors, using NumPy only.
+
+    Each of `tables` hash tables buckets vectors by `hashes_per_table` quantized random
+    projections (E2LSH), so vectors within max_distance usually share a bucket in at least one
+    table. Candidates from the query's buckets are then checked by exact distance. Buckets are
+    sorted key arrays searched with searchsorted; new vectors go to an unsorted tail that is merged
+    in once it grows past an eighth of the index.
+    """
+
+    def __init__(self, max_distance: float, dim: int = VECTOR_DIM, max_entries: int = 100_000,
+                 tables: int = 8, hashes_per_table: int = 4, seed: int = 0):
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+        rng = np.random.default_rng(seed)
+        # A bucket width of a few max_distances keeps near pairs together with high probability
+        self._width = 4 * max_distance
+        self._projections = rng.standard_normal((dim, tables * hashes_per_table)).astype(np.float32)
+        self._offsets = rng.uniform(0, self._width, tables * hashes_per_table).astype(np.float32)
+        self._mixers = rng.integers(1, 2 ** 62, (hashes_per_table, 1), dtype=np.int64) | 1
+        self._tables = tables
+        self._hashes_per_table = hashes_per_table
+
+        self._vectors = np.empty((0, dim), dtype=np.float32)
+        self._keys = np.empty((0, tables), dtype=np.int64)
+        self._values = []
+        self._size = 0
+        self._sorted_size = 0
+        self._sorted_keys = [np.empty(0, dtype=np.int64) for _ in range(tables)]
+        self._sorted_ids = [np.empty(0, dtype=np.int64) for _ in range(tables)]
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._size
+
+    def _hash(self, vectors):
+        """(rows, tables) bucket keys for a (rows, dim) array."""
+        codes = np.floor((vectors @ self._projections + self._offsets) / self._width).astype(np.int64)
+        codes = codes.reshape(len(vectors), self._tables, self._hashes_per_table)
+        # Integer overflow wraps, which is what mixing the codes into one key needs
+        with np.errstate(over="ignore"):
+            return (codes @ self._mixers)[:, :, 0]
+
+    def add(self, vector, value):
+        self.add_many(np.asarray(vector, dtype=np.float32)[None, :], [value])
+
+    def add_many(self, vectors, values):
+        """Store rows of `vectors` with their values; the oldest entries go once max_entries is reached."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        keys = self._hash(vectors)
+        with self._lock:
+            end = self._size + len(vectors)
+            if end > len(self._vectors):
+                capacity = max(end, 2 * len(self._vectors), 1024)
+                self._vectors = np.resize(self._vectors, (capacity, self._vectors.shape[1]))
+                self._keys = np.resize(self._keys, (capacity, self._tables))
+            self._vectors[self._size:end] = vectors
+            self._keys[self._size:end] = keys
+            self._values.extend(values)
+            self._size = end
+            if self._size > self.max_entries:
+                self._drop_oldest(self._size - self.max_entries + self.max_entries // 4)
+            elif self._size - self._sorted_size > max(4096, self._sorted_size // 8):
+                self._merge_tail()
+
+    def _drop_oldest(self, count):
+        keep = slice(count, self._size)
+        self._vectors[:self._size - count] = self._vectors[keep]
+        self._keys[:self._size - count] = self._keys[keep]
+        del self._values[:count]
+        self._size -= count
+        self._merge_tail()
+
+    def _merge_tail(self):
+        """Re-sort every table's keys so the whole index is searchable with searchsorted."""
+        for table in range(self._tables):
+            keys = self._keys[:self._size, table]
+            order = np.argsort(keys, kind="stable")
+            self._sorted_ids[table] = order
+            self._sorted_keys[table] = keys[order]
+        self._sorted_size = self._size
+
+    def query(self, vector):
+        """Return (value, distance) of the nearest stored vector within max_distance, or None."""
+        vector = np.asarray(vector, dtype=np.float32)
+        keys = self._hash(vector[None, :])[0]
+        with self._lock:
+            if not self._size:
+                return None
+            candidates = []
+            for table, key in enumerate(keys):
+                sorted_keys = self._sorted_keys[table]
+                left = np.searchsorted(sorted_keys, key, side="left")
+                right = np.searchsorted(sorted_keys, key, side="right")
+                candidates.append(self._sorted_ids[table][left:right])
+            tail = self._keys[self._sorted_size:self._size]
+            candidates.append(self._sorted_size + np.flatnonzero((tail == keys).any(axis=1)))
+            candidates = np.unique(np.concatenate(candidates))
+            if not len(candidates):
+                return None
+            distances = np.linalg.norm(self._vectors[candidates] - vector, axis=1)
+            best = int(np.argmin(distances))
+            if distances[best] > self.max_distance:
+                return None
+            return self._values[candidates[best]], float(distances[best])
+
+
+def rule_signature(user_data):
+    """Rule-set version plus the side of each risk-rule threshold the profile falls on."""
+    from risk_rules import active_rules
+
+    rules = active_rules()
+    return (rules.version,) + rules.signature(user_data)
+
+
+class SimilarRecommendations:
+    """Recommendations of earlier profiles, looked up by profile similarity.
+
+    There is one index per model and risk-rule signature; `max_entries` applies to each.
+    """
+
+    def __init__(self, max_distance: float, max_entries: int = 100_000):
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def _index(self, model, user_data):
+        key = (model, rule_signature(user_data))
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is None:
+                index = self._indexes[key] = SimilarityIndex(self.max_distance, max_entries=self.max_entries)
+            return index
+
+    def lookup(self, user_data, model):
+        """Return (recommendations, distance) for the closest earlier profile within max_distance, or None."""
+        return self._index(model, user_data).query(profile_vector(user_data))
+
+    def add(self, user_data, model, recommendations):
+        self._index(model, user_data).add(profile_vector(user_data), recommendations)
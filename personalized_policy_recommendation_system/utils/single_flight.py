@@ -0,0 +1,154 @@
+"""Coalescing of identical concurrent LLM calls.
+
+Callers pass a key (the normalized-profile cache key); while a call for that key is in flight,
+later callers wait for its result instead of starting their own. Keys are released as soon as the
+call finishes, after which the recommendation cache answers repeats.
+
+SingleFlight shares the result of a blocking call between threads. SharedStreams runs a streamed
+call on a background thread and lets every caller replay its chunks from the start, so a reader
+that goes away (e.g. a Streamlit rerun after a double click) does not cancel the call, and the
+rerun picks the stream up where it is. AsyncSingleFlight does the same for coroutines on one loop.
+"""
+import asyncio
+import threading
+from concurrent.futures import Future
+
+from metrics import LLM_COALESCED_REQUESTS
+
+
+class SingleFlight:
+    """Runs func once per key at a time; concurrent callers with the same key share its outcome."""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._calls)
+
+    def in_flight(self, key):
+        """Whether a call for key is running."""
+        return key in self._calls
+
+    def do(self, key, func, *args, **kwargs):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            LLM_COALESCED_REQUESTS.inc(mode="sync")
+            return future.result()
+
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+class _Stream:
+    """Chunks produced so far by one streamed call, readable by any number of consumers."""
+
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.condition = threading.Condition()
+
+    def append(self, chunk):
+        with self.condition:
+            self.chunks.append(chunk)
+            self.condition.notify_all()
+
+    def finish(self, error=None):
+        with self.condition:
+            self.done = True
+            self.error = error
+            self.condition.notify_all()
+
+    def read(self):
+        """Yield every chunk from the first, waiting for new ones until the stream finishes."""
+        index = 0
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: len(self.chunks) > index or self.done)
+                chunks = self.chunks[index:]
+                finished = self.done
+                error = self.error
+            index += len(chunks)
+            yield from chunks
+            if finished and index == len(self.chunks):
+                if error is not None:
+                    raise error
+                return
+
+
+class SharedStreams:
+    """One background producer per key; readers joining mid-stream replay it from the first chunk."""
+
+    def __init__(self):
+        self._streams = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._streams)
+
+    def in_flight(self, key):
+        """Whether a stream for key is running."""
+        return key in self._streams
+
+    def read(self, key, produce):
+        """Iterate the stream for key, starting `produce()` (an iterator factory) if none is running."""
+        with self._lock:
+            stream = self._streams.get(key)
+            leader = stream is None
+            if leader:
+                stream = self._streams[key] = _Stream()
+        if leader:
+            threading.Thread(target=self._run, args=(key, stream, produce), daemon=True, name="llm-stream").start()
+        else:
+            LLM_COALESCED_REQUESTS.inc(mode="stream")
+        return stream.read()
+
+    def _run(self, key, stream, produce):
+        error = None
+        try:
+            for chunk in produce():
+                stream.append(chunk)
+        except BaseException as e:
+            error = e
+        finally:
+            with self._lock:
+                del self._streams[key]
+            stream.finish(error)
+
+
+class AsyncSingleFlight:
+    """SingleFlight for coroutines: concurrent awaits with the same key share one task."""
+
+    def __init__(self):
+        self._tasks = {}
+
+    def __len__(self):
+        return len(self._tasks)
+
+    async def do(self, key, coroutine_factory):
+        task = self._tasks.get(key)
+        if task is None:
+            task = self._tasks[key] = asyncio.ensure_future(coroutine_factory())
+            task.add_done_callback(lambda done: self._release(key, done))
+        else:
+            LLM_COALESCED_REQUESTS.inc(mode="async")
+        # A cancelled caller must not cancel the call the other callers are waiting on
+        return await asyncio.shield(task)
+
+    def _release(self, key, task):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
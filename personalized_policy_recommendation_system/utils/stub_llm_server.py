@@ -0,0 +1,185 @@
+"""Local stand-in for an OpenAI-compatible chat completions provider.
+
+Used to exercise the LLM clients without network access or paid tokens:
+
+    python -m utils.stub_llm_server --port 8001 --latency 0.5
+
+then set LLM_API_BASE_URL=http://127.0.0.1:8001/v1.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_REPLY = (
+    "1. Comprehensive health insurance with chronic condition cover.\n"
+    "2. Term life insurance sized to your dependents.\n"
+    "3. Critical illness rider for family health history."
+)
+
+
+class StubLLMServer:
+    """Threaded HTTP server answering /chat/completions with a canned reply.
+
+    latency: seconds to wait before answering.
+    error_rate: fraction of requests answered with error_status.
+    failures: list of status codes returned, in order, before any successful reply.
+    stream_error_after: streamed replies send an error event after this many chunks instead of finishing.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, reply=DEFAULT_REPLY,
+                 error_rate=0.0, error_status=503, failures=None, seed=None, stream_error_after=None):
+        self.latency = latency
+        self.reply = reply
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.failures = list(failures or [])
+        self.stream_error_after = stream_error_after
+        self.requests = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _next_status(self) -> int:
+        with self._lock:
+            self.requests += 1
+            if self.failures:
+                return self.failures.pop(0)
+            if self.error_rate and self._random.random() < self.error_rate:
+                return self.error_status
+        return 200
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status, payload, headers=None):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                if not self.path.endswith("/chat/completions"):
+                    self._send_json(404, {"error": {"message": "not found"}})
+                    return
+
+                if server.latency:
+                    time.sleep(server.latency)
+
+                status = server._next_status()
+                if status != 200:
+                    headers = {"Retry-After": "0"} if status == 429 else None
+                    self._send_json(status, {"error": {"message": f"stub error {status}"}}, headers)
+                    return
+
+                model = request.get("model", "stub")
+                if request.get("stream"):
+                    self._stream(model)
+                else:
+                    self._send_json(200, server.completion(model, request))
+
+            def _stream(self, model):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                for index, token in enumerate(server.reply.split(" ")):
+                    if index == server.stream_error_after:
+                        error = {"error": {"message": "stub stream error", "type": "server_error"}}
+                        self.wfile.write(f"data: {json.dumps(error)}\n\n".encode("utf-8"))
+                        self.close_connection = True
+                        return
+                    chunk = {
+                        "id": "stub",
+                        "object": "chat.completion.chunk",
+                        "model": model,
+                        "choices": [{"index": 0, "delta": {"content": token + " "}, "finish_reason": None}],
+                    }
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.close_connection = True
+
+        return Handler
+
+    def completion(self, model, request):
+        """Build a chat.completion payload for the canned reply."""
+        prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in request.get("messages", []))
+        completion_tokens = len(self.reply.split())
+        return {
+            "id": "stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": self.reply},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    def start(self):
+        """Serve in a background daemon thread."""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a stub OpenAI-compatible LLM server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    args = parser.parse_args()
+
+    server = StubLLMServer(args.host, args.port, latency=args.latency,
+                           error_rate=args.error_rate, error_status=args.error_status)
+    print(f"Stub LLM server listening on {server.base_url}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""Sensitivity analysis for the hypothetical-scenario sidebar.
+
+The risk rules are additive per field (see risk_rules.py), so each factor's contribution is
+looked up once per rule set. Rescoring a profile with one field changed is then a table lookup,
+and every single-factor change is scored in one vectorized pass. The tables are rebuilt when the
+rule file is reloaded.
+"""
+import functools
+from typing import NamedTuple
+
+import numpy as np
+
+from profile_record import MAX_AGE, MIN_AGE, MaritalStatus, YesNo
+from risk_rules import active_rules
+
+AGES = np.arange(MIN_AGE, MAX_AGE + 1)
+
+
+class FactorPoints(NamedTuple):
+    """Points each value of a what-if factor scores under one rule set."""
+    age: tuple  # indexed by age - MIN_AGE
+    smoking: dict
+    drinking: dict
+    marital: dict
+
+
+@functools.lru_cache(maxsize=4)
+def factor_points(rules):
+    """Per-factor contribution tables for a compiled RuleSet."""
+    return FactorPoints(
+        tuple(rules.field_points("age", int(age)) for age in AGES),
+        {member: rules.field_points("smoking_status", member.value) for member in YesNo},
+        {member: rules.field_points("drinking_status", member.value) for member in YesNo},
+        {member: rules.field_points("marital_status", member.value) for member in MaritalStatus},
+    )
+
+
+def condition_points(count, rules=None):
+    """Points for having `count` chronic conditions."""
+    return (rules or active_rules()).field_points("chronic_conditions", count)
+
+
+class RiskContributions(NamedTuple):
+    """Points each factor adds to a profile's risk score; `other` covers rules on any other field."""
+    age: int
+    smoking: int
+    drinking: int
+    marital: int
+    conditions: int
+    other: int
+
+    @property
+    def total(self):
+        return sum(self)
+
+
+# Column of each factor in RiskContributions
+AGE, SMOKING, DRINKING, MARITAL, CONDITIONS, OTHER = range(len(RiskContributions._fields))
+
+
+class Sensitivity(NamedTuple):
+    """Risk score of a profile and of every single-factor change to it."""
+    base_score: int
+    ages: np.ndarray
+    age_scores: np.ndarray
+    changes: list
+    deltas: np.ndarray
+
+
+def contributions(profile):
+    """Per-factor points for a ProfileRecord; their total equals calculate_risk_score."""
+    rules = active_rules()
+    points = factor_points(rules)
+    factors = (
+        points.age[profile.age - MIN_AGE],
+        points.smoking[profile.smoking_status],
+        points.drinking[profile.drinking_status],
+        points.marital[profile.marital_status],
+        condition_points(len(profile.chronic_condition_list), rules),
+    )
+    return RiskContributions(*factors, rules.evaluate_record(profile)[0] - sum(factors))
+
+
+def rescore(base, age=None, smoking_status=None, drinking_status=None, marital_status=None, condition_count=None):
+    """Risk score after changing the given fields, from precomputed contributions."""
+    points = factor_points(active_rules())
+    score = base.total
+    if age is not None:
+        score += points.age[age - MIN_AGE] - base.age
+    if smoking_status is not None:
+        score += points.smoking[smoking_status] - base.smoking
+    if drinking_status is not None:
+        score += points.drinking[drinking_status] - base.drinking
+    if marital_status is not None:
+        score += points.marital[marital_status] - base.marital
+    if condition_count is not None:
+        score += condition_points(condition_count) - base.conditions
+    return score
+
+
+def _single_factor_changes(profile, points):
+    """(label, factor column, new points) for every change besides age."""
+    other_smoking = YesNo.NO if profile.smoking_status == YesNo.YES else YesNo.YES
+    other_drinking = YesNo.NO if profile.drinking_status == YesNo.YES else YesNo.YES
+    changes = [
+        ("Quit smoking" if other_smoking == YesNo.NO else "Start smoking", SMOKING, points.smoking[other_smoking]),
+        ("Stop drinking" if other_drinking == YesNo.NO else "Start drinking", DRINKING, points.drinking[other_drinking]),
+    ]
+    changes.extend(
+        (f"Marital status: {status}", MARITAL, points.marital[status])
+        for status in MaritalStatus if status != profile.marital_status
+    )
+    count = len(profile.chronic_condition_list)
+    changes.extend(
+        (f"Without {condition}", CONDITIONS, condition_points(count - 1))
+        for condition in profile.chronic_condition_list
+    )
+    changes.append(("Add a chronic condition", CONDITIONS, condition_points(count + 1)))
+    return changes
+
+
+def sensitivity(profile):
+    """Score every age from MIN_AGE to MAX_AGE and every single-factor change in one pass."""
+    base = contributions(profile)
+    points = factor_points(active_rules())
+    changes = _single_factor_changes(profile, points)
+
+    # One row per scenario: the base contributions with a single factor replaced
+    columns = np.concatenate([np.full(len(AGES), AGE), [column for _, column, _ in changes]]).astype(np.int64)
+    new_points = np.concatenate([points.age, [new for _, _, new in changes]])
+    scenarios = np.tile(np.asarray(base), (len(columns), 1))
+    scenarios[np.arange(len(columns)), columns] = new_points
+    scores = scenarios.sum(axis=1)
+
+    return Sensitivity(
+        base_score=base.total,
+        ages=AGES,
+        age_scores=scores[:len(AGES)],
+        changes=[label for label, _, _ in changes],
+        deltas=scores[len(AGES):] - base.total,
+    )